@@ -1,21 +1,32 @@
-from flask import Flask, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
 from .config import Config
-import os
+from .json_provider import make_json_provider
+from .metrics import init_metrics
+from .static_assets import static_manifest, default_static_dir, INDEX
+from .static_responses import static_responses, build_static_responses
 
 def create_app():
-    app = Flask(__name__, static_folder='static', static_url_path='/')
+    # The SPA is served from the static manifest below, not Flask's static route
+    app = Flask(__name__, static_folder=None)
 
     app.config.from_object(Config)
+    app.json = make_json_provider(app)
     CORS(app,
          origins=Config.ALLOWED_ORIGINS.split(',') if Config.ALLOWED_ORIGINS else ['*'],
-         supports_credentials=True)
+         supports_credentials=True,
+         expose_headers=['X-Next-Cursor', 'Idempotent-Replayed', 'ETag', 'X-Questions-Version'])
 
     try:
         from . import firebase_init
     except Exception as e:
         app.logger.warning(f"Firebase initialization warning: {e}")
 
+    try:
+        init_metrics(app)
+    except Exception as e:
+        app.logger.warning(f"Metrics initialization warning: {e}")
+
     try:
         from . import email_service
         email_service.init_email_service(app)
@@ -24,15 +35,21 @@ def create_app():
         
     @app.route('/')
     def root():
-        return {"message": "IBS Care AI API", "status": "running", "version": "1.0.0"}
+        return static_responses.serve('root')
 
-    from .routers import health, auth_verify, logs, chat, assessment, reminders
+    from .routers import health, auth_verify, logs, chat, assessment, reminders, analytics, search, sync, dashboard
     app.register_blueprint(health.bp, url_prefix='/api')
     app.register_blueprint(auth_verify.bp, url_prefix='/api/auth')
     app.register_blueprint(logs.bp, url_prefix='/api')
     app.register_blueprint(chat.bp, url_prefix='/api')
     app.register_blueprint(assessment.bp, url_prefix='/api/assessment')
     app.register_blueprint(reminders.bp, url_prefix='/api/reminders')
+    app.register_blueprint(analytics.bp, url_prefix='/api/analytics')
+    app.register_blueprint(search.bp, url_prefix='/api')
+    app.register_blueprint(sync.bp, url_prefix='/api')
+    app.register_blueprint(dashboard.bp, url_prefix='/api')
+
+    build_static_responses(app)
 
     try:
         from .routers.reminders import start_reminder_service
@@ -40,13 +57,15 @@ def create_app():
     except Exception as e:
         app.logger.warning(f"Reminder service start warning: {e}")
 
+    static_manifest.build(Config.STATIC_DIR or default_static_dir())
+
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve_spa(path):
-        file_path = os.path.join(app.static_folder, path)
-        if path and os.path.exists(file_path):
-            return send_from_directory(app.static_folder, path)
-        return send_from_directory(app.static_folder, 'index.html')
+        asset = static_manifest.lookup(path) or static_manifest.lookup(INDEX)
+        if asset is None:
+            return jsonify({"error": "Not found"}), 404
+        return static_manifest.serve(asset)
 
     return app
 # from flask import Flask, send_from_directory
@@ -0,0 +1,185 @@
+"""
+Table-driven IBS subtype scoring.
+
+SCORING_TABLE maps each (question, answer) pair to the points it adds to the
+IBS-C, IBS-D and IBS-M scores. The table is compiled once into a weight
+matrix with one row per pair (row 0 scores nothing), so a batch of answer
+sets becomes a matrix of row indices and every score is one gather-and-sum.
+Ties go to the first subtype in SUBTYPES (C, then D, then M), and confidence
+is ``min(0.9, score / 10 + 0.3)`` of the winning score.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Mapping
+
+import numpy as np
+
+from .schemas import IBSClassification
+
+SUBTYPES = ('IBS-C', 'IBS-D', 'IBS-M')
+
+# question -> answer -> points for (IBS-C, IBS-D, IBS-M); unlisted answers score nothing
+SCORING_TABLE = {
+    'bowel_frequency': {
+        'Less than 1': (3, 0, 0),
+        '1-2': (3, 0, 0),
+        '5+': (0, 3, 0),
+        'Varies significantly': (0, 0, 2)
+    },
+    'stool_consistency': {
+        'Hard/lumpy': (3, 0, 0),
+        'Soft/mushy': (0, 3, 0),
+        'Watery': (0, 3, 0),
+        'Mixed types': (0, 0, 3)
+    },
+    'pain_relief': {
+        'Always': (2, 1, 0),
+        'Usually': (2, 1, 0)
+    },
+    'urgency': {
+        'Often': (0, 2, 0),
+        'Always': (0, 2, 0)
+    },
+    'incomplete_evacuation': {
+        'Often': (2, 0, 0),
+        'Always': (2, 0, 0)
+    }
+}
+
+MAX_CONFIDENCE = 0.9
+BASE_CONFIDENCE = 0.3
+CONFIDENCE_SCALE = 10
+
+# Changes whenever the scoring rules do, so re-scoring runs can tell which rules they applied
+SCORING_SIGNATURE = hashlib.sha1(
+    json.dumps([SCORING_TABLE, SUBTYPES, MAX_CONFIDENCE, BASE_CONFIDENCE, CONFIDENCE_SCALE], sort_keys=True).encode()
+).hexdigest()[:12]
+
+SUBTYPE_DETAILS = {
+    'IBS-C': {
+        'reasoning': "Your symptoms suggest IBS with constipation (IBS-C). You experience infrequent bowel movements and hard stool consistency.",
+        'recommendations': [
+            "Increase fiber intake gradually",
+            "Stay well hydrated",
+            "Exercise regularly",
+            "Consider probiotics",
+            "Avoid processed foods"
+        ]
+    },
+    'IBS-D': {
+        'reasoning': "Your symptoms suggest IBS with diarrhea (IBS-D). You experience frequent, loose stools and urgency.",
+        'recommendations': [
+            "Follow a low-FODMAP diet",
+            "Avoid caffeine and alcohol",
+            "Eat smaller, more frequent meals",
+            "Consider anti-diarrheal medications",
+            "Manage stress levels"
+        ]
+    },
+    'IBS-M': {
+        'reasoning': "Your symptoms suggest IBS with mixed bowel habits (IBS-M). You experience both constipation and diarrhea.",
+        'recommendations': [
+            "Keep a detailed symptom diary",
+            "Work with a dietitian",
+            "Identify trigger foods",
+            "Maintain regular meal times",
+            "Consider stress management techniques"
+        ]
+    }
+}
+
+BASE_NEXT_STEPS = [
+    "Schedule a follow-up with your healthcare provider",
+    "Start tracking your daily symptoms",
+    "Begin implementing dietary recommendations",
+    "Set up daily reminder notifications"
+]
+
+TYPE_NEXT_STEPS = {
+    "IBS-C": [
+        "Gradually increase fiber intake",
+        "Start a regular exercise routine",
+        "Consider over-the-counter fiber supplements"
+    ],
+    "IBS-D": [
+        "Begin a low-FODMAP elimination diet",
+        "Identify and avoid trigger foods",
+        "Consider anti-diarrheal medications"
+    ],
+    "IBS-M": [
+        "Work with a registered dietitian",
+        "Keep detailed symptom and food logs",
+        "Develop a personalized management plan"
+    ],
+    "IBS-U": [
+        "Continue comprehensive symptom tracking",
+        "Consult with a gastroenterologist",
+        "Consider additional diagnostic testing"
+    ]
+}
+
+# Full next-steps list of every subtype, as served by /api/assessment/next-steps
+NEXT_STEPS = {ibs_type: BASE_NEXT_STEPS + steps for ibs_type, steps in TYPE_NEXT_STEPS.items()}
+
+def get_next_steps(ibs_type: str) -> List[str]:
+    """Get next steps based on IBS type"""
+    return list(NEXT_STEPS.get(ibs_type, BASE_NEXT_STEPS))
+
+class ScoringEngine:
+    """SCORING_TABLE compiled into a (pairs + 1) x subtypes weight matrix"""
+
+    def __init__(self, table: Mapping[str, Mapping[str, tuple]]):
+        self.questions = list(table)
+        self._rows: List[Dict[str, int]] = []
+        weights = [(0,) * len(SUBTYPES)]
+        for question in self.questions:
+            rows = {}
+            for answer, points in table[question].items():
+                rows[answer] = len(weights)
+                weights.append(tuple(points))
+            self._rows.append(rows)
+        self.weights = np.array(weights, dtype=np.int64)
+
+    def encode(self, answer_sets: Iterable[Mapping[str, Any]]) -> np.ndarray:
+        """(n, questions) matrix of weight rows; 0 where a question is unanswered or unscored"""
+        encoded = []
+        for answers in answer_sets:
+            row = []
+            for question, rows in zip(self.questions, self._rows):
+                answer = answers.get(question)
+                # Only string answers can match the table (lists and dicts are unhashable)
+                row.append(rows.get(answer, 0) if isinstance(answer, str) else 0)
+            encoded.append(row)
+        return np.array(encoded, dtype=np.int64).reshape(len(encoded), len(self.questions))
+
+    def scores(self, encoded: np.ndarray) -> np.ndarray:
+        """(n, subtypes) scores of an encoded batch"""
+        return self.weights[encoded].sum(axis=1)
+
+    def classify_many(self, answer_sets: List[Mapping[str, Any]]) -> List[dict]:
+        """Subtype, confidence and per-subtype scores of every answer set"""
+        scores = self.scores(self.encode(answer_sets))
+        # argmax returns the first maximum, which gives the C > D > M tie order
+        winners = scores.argmax(axis=1)
+        best = scores[np.arange(len(scores)), winners]
+        confidence = np.minimum(MAX_CONFIDENCE, best / CONFIDENCE_SCALE + BASE_CONFIDENCE)
+        return [
+            {
+                'ibs_type': SUBTYPES[winner],
+                'confidence': float(value),
+                'scores': dict(zip(SUBTYPES, (int(points) for points in row)))
+            }
+            for winner, value, row in zip(winners, confidence, scores)
+        ]
+
+    def classify(self, answers: Mapping[str, Any]) -> IBSClassification:
+        """Full classification, with reasoning and recommendations, of one answer set"""
+        result = self.classify_many([answers])[0]
+        return IBSClassification(
+            ibs_type=result['ibs_type'],
+            confidence=result['confidence'],
+            **SUBTYPE_DETAILS[result['ibs_type']]
+        )
+
+scoring_engine = ScoringEngine(SCORING_TABLE)
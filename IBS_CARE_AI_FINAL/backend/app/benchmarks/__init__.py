@@ -0,0 +1,44 @@
+"""
+Runnable benchmarks: ``python -m app.benchmarks.<name> --help``.
+
+Benchmarks that go through the API write to Firestore, so they only run
+against the emulator (FIRESTORE_EMULATOR_HOST); the others work on generated
+data in memory.
+"""
+
+import os
+import random
+from datetime import date, datetime, timedelta
+from typing import List
+
+TRIGGERS = ['dairy', 'coffee', 'stress', 'gluten', 'wine', 'onion', 'garlic', 'beans', 'spicy food', 'late meal',
+            'alcohol', 'fried food', 'apples', 'wheat', 'poor sleep', 'travel', 'chocolate', 'soda', 'skipped meal', 'period']
+FOODS = ['oats', 'banana', 'coffee', 'rice', 'chicken', 'salad', 'bread', 'yogurt', 'pasta', 'eggs', 'apple', 'beans']
+
+def synthetic_logs(days: int, seed: int = 0, start: date = date(2020, 1, 1), triggers: int = len(TRIGGERS)) -> List[dict]:
+    """Log documents as stored in Firestore for consecutive days, reproducible for a seed"""
+    rng = random.Random(seed)
+    names = TRIGGERS[:triggers] + [f"trigger {index}" for index in range(len(TRIGGERS), triggers)]
+    now = datetime(2020, 1, 1).isoformat()
+    logs = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        logs.append({
+            'dateISO': day.isoformat(),
+            'mood': rng.randint(1, 10),
+            'pain_level': rng.randint(0, 10),
+            'meals': [
+                {'timeISO': f"{day.isoformat()}T{hour:02d}:00", 'items': rng.sample(FOODS, rng.randint(1, 3))}
+                for hour in (8, 13, 19)
+            ],
+            'notes': rng.choice(['', 'felt ok after lunch', 'bloated in the evening, slept badly']),
+            'triggers': rng.sample(names, rng.randint(0, min(3, len(names)))),
+            'createdAt': now,
+            'updatedAt': now
+        })
+    return logs
+
+def require_emulator():
+    """Refuse to write benchmark data anywhere but the Firestore emulator"""
+    if not os.getenv('FIRESTORE_EMULATOR_HOST'):
+        raise SystemExit("This benchmark writes to Firestore; set FIRESTORE_EMULATOR_HOST to run it against the emulator")
@@ -0,0 +1,66 @@
+"""
+Throughput of the bulk log import and the streaming export.
+
+Usage: FIRESTORE_EMULATOR_HOST=localhost:8080 python -m app.benchmarks.import_export [--rows 1000] [--repeat 3]
+
+Each run imports generated logs as NDJSON for a fresh user, exports them as
+NDJSON and CSV, then imports the CSV export for another user, all through
+the Flask test client with the DEBUG auth bypass. Import times include the
+rollup, food index, flare and search index rebuilds that follow the commit.
+"""
+
+import argparse
+import json
+import logging
+import time
+import uuid
+
+from . import require_emulator, synthetic_logs
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FIELDS = ['dateISO', 'mood', 'pain_level', 'meals', 'notes', 'triggers']
+
+def _timed(client, method: str, path: str, user_uid: str, **kwargs):
+    started = time.perf_counter()
+    response = client.open(path, method=method, headers={'X-Debug-UID': user_uid}, **kwargs)
+    body = response.get_data()
+    elapsed = time.perf_counter() - started
+    if response.status_code >= 300:
+        raise RuntimeError(f"{method} {path} returned {response.status_code}: {body[:200]!r}")
+    return elapsed, body
+
+def run_once(client, rows: int, seed: int) -> dict:
+    ndjson = '\n'.join(json.dumps({field: log[field] for field in IMPORT_FIELDS}) for log in synthetic_logs(rows, seed))
+    user_uid = f"benchmark-{uuid.uuid4().hex[:12]}"
+
+    timings = {}
+    timings['import ndjson'], _ = _timed(client, 'POST', '/api/logs/import', user_uid,
+                                         data=ndjson, content_type='application/x-ndjson')
+    timings['export ndjson'], _ = _timed(client, 'GET', '/api/logs/export?format=ndjson', user_uid)
+    timings['export csv'], exported = _timed(client, 'GET', '/api/logs/export?format=csv', user_uid)
+    timings['import csv'], _ = _timed(client, 'POST', '/api/logs/import', f"{user_uid}-csv",
+                                      data=exported, content_type='text/csv')
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark bulk log import and export throughput")
+    parser.add_argument('--rows', type=int, default=1000, help="Logs per import")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs, each with fresh users")
+    args = parser.parse_args(argv)
+    require_emulator()
+
+    from .. import create_app
+    from ..config import Config
+
+    Config.DEBUG = True
+    client = create_app().test_client()
+
+    runs = [run_once(client, args.rows, seed) for seed in range(args.repeat)]
+    for step in runs[0]:
+        best = min(run[step] for run in runs)
+        logger.info(f"{step:14s} {args.rows} rows: best {best * 1000:8.1f} ms ({args.rows / best:8.0f} rows/s) over {len(runs)} runs")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
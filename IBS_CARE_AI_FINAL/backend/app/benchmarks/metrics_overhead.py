@@ -0,0 +1,81 @@
+"""
+Recording overhead of the Prometheus metrics.
+
+Usage: python -m app.benchmarks.metrics_overhead [--multiprocess] [--number 100000]
+
+Times a histogram observation and a counter increment through ``labels()``
+(what every request, Firestore call and LLM call records), and the per
+request cost of init_metrics on a bare Flask app with one route. The Firestore
+wrappers record one observation and one increment per call. ``--multiprocess``
+measures gunicorn's mode, where values are written to files in a temporary
+PROMETHEUS_MULTIPROC_DIR.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+def per_call_us(function, number: int, repeat: int = 5) -> float:
+    """Best of ``repeat`` timings of ``number`` calls, which filters out scheduling noise"""
+    function()
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, time.perf_counter() - started)
+    return best / number * 1e6
+
+def ping_app(with_metrics: bool) -> Flask:
+    from ..metrics import init_metrics
+
+    app = Flask(__name__)
+    app.add_url_rule('/ping', 'ping', lambda: 'ok')
+    if with_metrics:
+        init_metrics(app)
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Prometheus metrics recording overhead")
+    parser.add_argument('--multiprocess', action='store_true', help="Use multiprocess mode as under gunicorn")
+    parser.add_argument('--number', type=int, default=100000, help="Recordings per timing")
+    args = parser.parse_args(argv)
+
+    if args.multiprocess:
+        # Must be set before the metrics are defined, i.e. before app.metrics is imported
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='metrics-benchmark-')
+    try:
+        run(args)
+    finally:
+        if args.multiprocess:
+            shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+
+def run(args):
+    from .. import metrics
+
+    if metrics.prometheus_client is None:
+        raise SystemExit("prometheus_client is not installed; nothing is recorded")
+
+    mode = 'multiprocess' if args.multiprocess else 'single process'
+    observe = per_call_us(lambda: metrics.HTTP_REQUEST_DURATION.labels('GET', '/api/logs', '200').observe(0.01), args.number)
+    increment = per_call_us(lambda: metrics.FIRESTORE_DOCUMENTS.labels('get', 'logs').inc(), args.number)
+    logger.info(f"{mode}: histogram labels().observe() {observe:.2f} us, counter labels().inc() {increment:.2f} us")
+
+    requests = max(1, args.number // 100)
+    timings = {}
+    for with_metrics in (False, True):
+        client = ping_app(with_metrics).test_client()
+        timings[with_metrics] = per_call_us(lambda: client.get('/ping'), requests)
+    logger.info(f"{mode}: request {timings[False]:.1f} us without metrics, {timings[True]:.1f} us with "
+                f"({timings[True] - timings[False]:+.1f} us per request)")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,87 @@
+"""
+Red-flag matcher: corpus check and microbenchmarks.
+
+Usage: python -m app.benchmarks.red_flags [--corpus FILE] [--check-only] [--number 20000]
+
+Every message of the corpus (red_flag_corpus.json next to this module) must
+produce exactly the listed categories with the configured phrases, including
+RED_FLAG_PHRASES_FILE; any difference is reported and the command exits with
+status 1, so run it after changing the phrase list. Unless ``--check-only``
+is given, it then times the automaton build and scans of corpus-sized and long
+messages, with a regex alternation over the same phrases for reference.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+from ..config import Config
+from ..red_flags import RedFlagMatcher, _fold, load_phrases, red_flag_matcher
+
+logger = logging.getLogger(__name__)
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'red_flag_corpus.json')
+LONG_MESSAGE = ("I've had a rough week with bloating and cramps after dinner and some stress at work, "
+                "pain around 6 today and I slept badly. ") * 16
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)['cases']
+
+def check_corpus(matcher: RedFlagMatcher, cases: list) -> list:
+    """Cases whose matched categories differ from the expected ones, with what was matched"""
+    failures = []
+    for case in cases:
+        matched = sorted({match['category'] for match in matcher.scan(case['message'])})
+        if matched != sorted(case['categories']):
+            failures.append({**case, 'matched': matched})
+    return failures
+
+def per_call_us(function, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        function()
+    return (time.perf_counter() - started) / number * 1e6
+
+def benchmark(matcher: RedFlagMatcher, cases: list, number: int):
+    phrases = load_phrases(Config.RED_FLAG_PHRASES_FILE)
+    started = time.perf_counter()
+    RedFlagMatcher(phrases)
+    logger.info(f"Automaton: {matcher.pattern_count} phrases, {len(matcher._goto)} states, "
+                f"built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    terms = [_fold(term) for languages in phrases.values() for terms in languages.values() for term in terms]
+    alternation = re.compile(r"\b(?:" + '|'.join(re.escape(term) for term in terms) + r")\b")
+    messages = [case['message'] for case in cases]
+
+    for label, texts in (('corpus message', messages), (f"{len(LONG_MESSAGE)}-char message", [LONG_MESSAGE])):
+        rounds = max(1, number // len(texts))
+        automaton = per_call_us(lambda: [matcher.scan(text) for text in texts], rounds) / len(texts)
+        regex = per_call_us(lambda: [alternation.search(_fold(text)) for text in texts], rounds) / len(texts)
+        logger.info(f"{label:18s} automaton {automaton:8.1f} us/scan, regex alternation {regex:8.1f} us/search")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the red-flag corpus and benchmark the matcher")
+    parser.add_argument('--corpus', default=CORPUS_PATH, help="JSON corpus of {message, categories} cases")
+    parser.add_argument('--check-only', action='store_true', help="Only check the corpus")
+    parser.add_argument('--number', type=int, default=20000, help="Scans per timing")
+    args = parser.parse_args(argv)
+
+    cases = load_corpus(args.corpus)
+    failures = check_corpus(red_flag_matcher, cases)
+    for failure in failures:
+        logger.error(f"{failure['message']!r}: expected {sorted(failure['categories'])}, matched {failure['matched']}")
+    logger.info(f"Red-flag corpus: {len(cases) - len(failures)}/{len(cases)} cases pass")
+    if failures:
+        sys.exit(1)
+
+    if not args.check_only:
+        benchmark(red_flag_matcher, cases, args.number)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,77 @@
+"""
+Serialization time and allocations of a page of logs.
+
+Usage: python -m app.benchmarks.serialization [--logs 1000] [--number 50]
+
+Builds the body of GET /api/logs for generated logs the old way (LogResponse
+.dict() per log, then the stdlib or orjson JSON provider) and the current way
+(LOG_LIST TypeAdapter validation and dump_json), and reports the time per
+response and the tracemalloc peak while building it. Encode-only lines time
+the providers on ready-made dicts.
+"""
+
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from . import synthetic_logs
+from ..json_provider import OrjsonProvider, model_json_response, orjson
+from ..routers.logs import LOG_LIST, serialize_log
+
+logger = logging.getLogger(__name__)
+
+def measure(build, number: int) -> tuple:
+    """(ms per call, peak KiB allocated during one call)"""
+    build()
+    started = time.perf_counter()
+    for _ in range(number):
+        build()
+    elapsed = (time.perf_counter() - started) / number * 1000
+    tracemalloc.start()
+    try:
+        build()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak / 1024
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization of a page of logs")
+    parser.add_argument('--logs', type=int, default=1000, help="Logs per response")
+    parser.add_argument('--number', type=int, default=50, help="Responses per timing")
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    logs = synthetic_logs(args.logs)
+    dicts = [serialize_log(log) for log in logs]
+    providers = [('stdlib', DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app)))
+    else:
+        logger.warning("orjson is not installed; only the stdlib provider is measured")
+
+    cases = []
+    for name, provider in providers:
+        cases.append((f".dict() + {name} provider", lambda provider=provider: provider.response([serialize_log(log) for log in logs]).get_data()))
+    cases.append(("TypeAdapter dump_json", lambda: model_json_response(LOG_LIST, LOG_LIST.validate_python(logs)).get_data()))
+    for name, provider in providers:
+        cases.append((f"encode only, {name}", lambda provider=provider: provider.response(dicts).get_data()))
+
+    with app.app_context():
+        body = cases[0][1]()
+        expected = json.loads(body)
+        logger.info(f"{args.logs} logs, {len(body)} byte body")
+        for label, build in cases:
+            if json.loads(build()) != expected:
+                raise RuntimeError(f"{label} produced a different body")
+            elapsed, peak = measure(build, args.number)
+            logger.info(f"{label:28s} {elapsed:7.2f} ms  peak {peak:8.0f} KiB")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
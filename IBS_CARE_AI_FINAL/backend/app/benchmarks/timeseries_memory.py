@@ -0,0 +1,72 @@
+"""
+Memory per user of the columnar time-series cache against dicts and models.
+
+Usage: python -m app.benchmarks.timeseries_memory [--users 200] [--days 365] [--triggers 20]
+
+Generated users are held in memory as the log dicts Firestore returns, as
+LogResponse models, as the projected dicts the cache loads and as LogSeries,
+and tracemalloc reports what each representation keeps alive per user (NumPy
+arrays are traced too). The LogSeries line also shows the size the cache
+accounts for (LogSeries.nbytes) and how many such users fit in
+TIMESERIES_CACHE_BYTES.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import tracemalloc
+
+from . import synthetic_logs
+from ..config import Config
+from ..schemas import LogResponse
+from ..timeseries_cache import LogSeries
+
+logger = logging.getLogger(__name__)
+
+# The fields TimeSeriesCache.get reads from Firestore
+SERIES_FIELDS = ('dateISO', 'mood', 'pain_level', 'triggers')
+
+def retained_bytes(build) -> tuple:
+    """(bytes still allocated after build() returns while its result is alive, the result)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark time-series cache memory per user")
+    parser.add_argument('--users', type=int, default=200, help="Generated users")
+    parser.add_argument('--days', type=int, default=365, help="Logged days per user")
+    parser.add_argument('--triggers', type=int, default=20, help="Distinct triggers across the logs")
+    args = parser.parse_args(argv)
+
+    # Every representation is built from freshly decoded documents, as after a Firestore read
+    encoded = [json.dumps(synthetic_logs(args.days, seed, triggers=args.triggers)) for seed in range(args.users)]
+
+    dict_bytes, _ = retained_bytes(lambda: [json.loads(logs) for logs in encoded])
+    model_bytes, _ = retained_bytes(lambda: [[LogResponse(**log) for log in json.loads(logs)] for logs in encoded])
+    projected_bytes, _ = retained_bytes(
+        lambda: [[{field: log[field] for field in SERIES_FIELDS} for log in json.loads(logs)] for logs in encoded]
+    )
+    series_bytes, series = retained_bytes(lambda: [LogSeries.from_logs(json.loads(logs)) for logs in encoded])
+    accounted = sum(one.nbytes for one in series) // args.users
+
+    per_user = lambda total: total // args.users
+    logger.info(f"{args.users} users x {args.days} days, {args.triggers} triggers; retained bytes per user:")
+    logger.info(f"  stored log dicts      {per_user(dict_bytes):>10,}")
+    logger.info(f"  LogResponse models    {per_user(model_bytes):>10,}")
+    logger.info(f"  projected dicts       {per_user(projected_bytes):>10,}")
+    logger.info(f"  LogSeries             {per_user(series_bytes):>10,} (accounted {accounted:,}, "
+                f"{per_user(dict_bytes) / max(per_user(series_bytes), 1):.0f}x smaller than the dicts)")
+    logger.info(f"TIMESERIES_CACHE_BYTES={Config.TIMESERIES_CACHE_BYTES:,} holds about "
+                f"{Config.TIMESERIES_CACHE_BYTES // max(accounted, 1):,} such users per worker")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,34 @@
+"""
+Small in-process caches shared by the analytics modules.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+class VersionedCache:
+    """Per-worker LRU of per-user results, valid only for a matching data version"""
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_uid: str, version: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(user_uid)
+            if not entry or entry[0] != version:
+                return None
+            self._entries.move_to_end(user_uid)
+            return entry[1]
+
+    def put(self, user_uid: str, version: str, value: Any):
+        with self._lock:
+            self._entries[user_uid] = (version, value)
+            self._entries.move_to_end(user_uid)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_uid: str):
+        with self._lock:
+            self._entries.pop(user_uid, None)
@@ -0,0 +1,131 @@
+"""
+Per-user change feed for delta sync.
+
+Every backend write of a log, assessment or chat message also writes
+``users/{uid}/changes/{kind}:{id}`` in the same batch, and so does the web
+client for the ``timeline`` entries of logs it saves itself (saveTimelineEntry). The feed is compact:
+an entity has one entry however often it changes, holding the ``updatedAt`` of
+its latest write and ``committedAt``, the server timestamp of the commit that
+wrote it. Entries are ordered by ``(committedAt, document id)``, i.e. in commit
+order, so a sync cursor is the position of the last entry a client has seen and
+a sync reads only the entries after it plus the documents they point to.
+
+Entries committed less than SYNC_LAG_SECONDS ago are held back from sync
+reads: a commit still in flight when a page is read can be stamped before the
+newest entry returned, and the lag keeps the cursor from moving past it. An
+entity that changes again moves to the end of the feed, so clients apply
+changes keyed by ``kind:id`` and a later entry replaces an earlier one.
+"""
+
+import base64
+import binascii
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from firebase_admin import firestore
+
+from .config import Config
+from .firebase_init import db
+from .timeline import timeline_ref
+
+logger = logging.getLogger(__name__)
+
+CURSOR_PREFIX = 'v2:'
+DOCUMENT_ID = '__name__'
+
+def changes_ref(user_uid: str):
+    return db.collection('users').document(user_uid).collection('changes')
+
+def change_write(user_uid: str, kind: str, entry_id: str, updated_at: str) -> tuple:
+    """(doc_ref, data) write recording that an entity changed at updated_at"""
+    return changes_ref(user_uid).document(f"{kind}:{entry_id}"), {
+        'kind': kind,
+        'id': entry_id,
+        'updatedAt': updated_at,
+        'committedAt': firestore.SERVER_TIMESTAMP
+    }
+
+def _position(entry: dict) -> str:
+    """``"{committedAt}|{kind}:{id}"``, the place of an entry in commit order"""
+    return f"{entry['committedAt'].isoformat()}|{entry['kind']}:{entry['id']}"
+
+def encode_cursor(position: str) -> str:
+    """Opaque cursor for a position; the empty position is the start of the feed"""
+    return base64.urlsafe_b64encode((CURSOR_PREFIX + position).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    """(committedAt, document id) inside a cursor, (None, '') at the start of the
+    feed; raises ValueError for anything we did not issue"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid sync cursor")
+    if not raw.startswith(CURSOR_PREFIX):
+        raise ValueError("Invalid sync cursor")
+    position = raw[len(CURSOR_PREFIX):]
+    if not position:
+        return None, ''
+    committed_at, _, key = position.partition('|')
+    try:
+        return datetime.fromisoformat(committed_at), key
+    except ValueError:
+        raise ValueError("Invalid sync cursor")
+
+def _settled(user_uid: str):
+    """The user's feed without the entries still inside the lag window"""
+    horizon = datetime.now(timezone.utc) - timedelta(seconds=Config.SYNC_LAG_SECONDS)
+    return changes_ref(user_uid).where('committedAt', '<=', horizon)
+
+def _newest(query) -> str:
+    docs = list(
+        query.order_by('committedAt', direction='DESCENDING')
+        .order_by(DOCUMENT_ID, direction='DESCENDING')
+        .limit(1)
+        .select(['kind', 'id', 'committedAt'])
+        .stream()
+    )
+    return _position(docs[0].to_dict()) if docs else ''
+
+def latest_change(user_uid: str) -> str:
+    """Position of the user's newest committed change, '' without any.
+
+    Commit timestamps grow with commit order, so this changes on every write
+    through the feed and can version caches; unlike sync it has no lag.
+    """
+    return _newest(changes_ref(user_uid))
+
+def head_cursor(user_uid: str) -> str:
+    """Cursor positioned after the user's newest settled change"""
+    return encode_cursor(_newest(_settled(user_uid)))
+
+def changes_since(user_uid: str, cursor: str, limit: int) -> Tuple[List[dict], str, bool]:
+    """(commit-ordered change entries after cursor, cursor after them, whether more remain)"""
+    committed_at, key = decode_cursor(cursor)
+    query = _settled(user_uid).order_by('committedAt').order_by(DOCUMENT_ID)
+    if committed_at is not None:
+        query = query.start_after({'committedAt': committed_at, DOCUMENT_ID: changes_ref(user_uid).document(key)})
+
+    entries = [doc.to_dict() for doc in query.limit(limit + 1).stream()]
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    return entries, (encode_cursor(_position(entries[-1])) if entries else cursor), has_more
+
+def entry_ref(user_uid: str, entry: dict):
+    """Document a change entry points to"""
+    if entry['kind'] == 'log':
+        return db.collection('users').document(user_uid).collection('logs').document(entry['id'])
+    if entry['kind'] == 'assessment':
+        return db.collection('users').document(user_uid).collection('assessments').document(entry['id'])
+    if entry['kind'] == 'timeline':
+        return timeline_ref(user_uid, entry['id'])
+    return db.collection('chat_history').document(entry['id'])
+
+def load_entries(user_uid: str, entries: List[dict]) -> List[Tuple[dict, Optional[dict]]]:
+    """Pair each entry with its current document (None if it no longer exists), in one get_all"""
+    refs = [entry_ref(user_uid, entry) for entry in entries]
+    snapshots = {snapshot.reference.path: snapshot for snapshot in db.get_all(refs)} if refs else {}
+    return [
+        (entry, snapshots[ref.path].to_dict() if ref.path in snapshots and snapshots[ref.path].exists else None)
+        for entry, ref in zip(entries, refs)
+    ]
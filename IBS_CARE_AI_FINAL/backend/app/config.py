@@ -11,6 +11,10 @@ class Config:
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
     GROQ_API_KEY = os.getenv('GROQ_API_KEY', '')
     MODEL_NAME = os.getenv('MODEL_NAME', 'gemini-1.5-flash')
+    LOG_CONTEXT_TOKENS = int(os.getenv('LOG_CONTEXT_TOKENS', '600'))
+    RED_FLAG_PHRASES_FILE = os.getenv('RED_FLAG_PHRASES_FILE', '')
+    MODEL_ROUTING_RULES = os.getenv('MODEL_ROUTING_RULES', '')
+    MODEL_ROUTING_FILE = os.getenv('MODEL_ROUTING_FILE', '')
     
     # Email Configuration
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -19,6 +23,42 @@ class Config:
     MAIL_USERNAME = os.getenv('MAIL_USERNAME', '')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD', '')
     
+    # Logs API
+    LOGS_PAGE_SIZE = int(os.getenv('LOGS_PAGE_SIZE', '100'))
+    LOGS_MAX_PAGE_SIZE = int(os.getenv('LOGS_MAX_PAGE_SIZE', '500'))
+    LOGS_IMPORT_MAX_ROWS = int(os.getenv('LOGS_IMPORT_MAX_ROWS', '5000'))
+    LOGS_BATCH_MAX_ROWS = int(os.getenv('LOGS_BATCH_MAX_ROWS', '100'))
+    ASSESSMENT_BATCH_MAX = int(os.getenv('ASSESSMENT_BATCH_MAX', '10000'))
+    
+    # Delta sync
+    SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', '200'))
+    SYNC_MAX_PAGE_SIZE = int(os.getenv('SYNC_MAX_PAGE_SIZE', '1000'))
+    SYNC_LAG_SECONDS = float(os.getenv('SYNC_LAG_SECONDS', '2'))
+    
+    # Idempotency-Key handling for retried POSTs
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400'))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '60'))
+    
+    # Analytics
+    ANALYTICS_CACHE_USERS = int(os.getenv('ANALYTICS_CACHE_USERS', '1000'))
+    FLARE_EWMA_ALPHA = float(os.getenv('FLARE_EWMA_ALPHA', '0.2'))
+    FLARE_Z_THRESHOLD = float(os.getenv('FLARE_Z_THRESHOLD', '2.5'))
+    TIMESERIES_CACHE_BYTES = int(os.getenv('TIMESERIES_CACHE_BYTES', str(64 * 1024 * 1024)))
+    
+    # Dashboard aggregate: parallel reads and a per-user cache keyed on the data version
+    DASHBOARD_WORKERS = int(os.getenv('DASHBOARD_WORKERS', '8'))
+    DASHBOARD_ROLLUP_WEEKS = int(os.getenv('DASHBOARD_ROLLUP_WEEKS', '12'))
+    
+    # JSON encoding of API responses: 'orjson' (when installed) or 'stdlib'
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    
+    # Prometheus /metrics; when set, scrapers must send "Authorization: Bearer <token>"
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    
+    # SPA static files (default: backend/static, where the Docker build copies the Vite dist)
+    STATIC_DIR = os.getenv('STATIC_DIR', '')
+    STATIC_MAX_AGE_SECONDS = int(os.getenv('STATIC_MAX_AGE_SECONDS', '3600'))
+    
     ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:5173,https://ibs-care-ai.vercel.app')
     
     # Debug
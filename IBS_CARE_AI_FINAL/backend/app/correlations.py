@@ -0,0 +1,177 @@
+"""
+Trigger/symptom correlation engine.
+
+Builds a dense day x trigger indicator matrix from a user's logs and correlates
+every trigger with pain and mood on the same day and up to two days later in a
+handful of NumPy matrix operations.
+"""
+
+import logging
+import math
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+
+from .cache import VersionedCache
+from .config import Config
+from .rollups import normalize_trigger
+from .timeseries_cache import timeseries_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_LAG_DAYS = 2
+MIN_TRIGGER_DAYS = 3
+# Two-sided 95% normal quantile for the Fisher-z confidence interval
+Z_95 = 1.959964
+
+correlation_cache = VersionedCache(Config.ANALYTICS_CACHE_USERS)
+
+def build_matrices(logs: List[dict]):
+    """Return (first day ordinal, logged mask, trigger names, indicator matrix, pain, mood)
+
+    Rows cover every calendar day between the first and last log so that lags
+    are true day offsets; days without a log are masked out.
+    """
+    days = sorted({date.fromisoformat(log['dateISO'][:10]).toordinal() for log in logs if log.get('dateISO')})
+    if not days:
+        return None
+
+    first_day = days[0]
+    n_days = days[-1] - first_day + 1
+    logged = np.zeros(n_days, dtype=bool)
+    pain = np.full(n_days, np.nan)
+    mood = np.full(n_days, np.nan)
+
+    trigger_index = {}
+    rows, cols = [], []
+    for log in logs:
+        if not log.get('dateISO'):
+            continue
+        row = date.fromisoformat(log['dateISO'][:10]).toordinal() - first_day
+        logged[row] = True
+        if log.get('pain_level') is not None:
+            pain[row] = log['pain_level']
+        if log.get('mood') is not None:
+            mood[row] = log['mood']
+        for trigger in log.get('triggers') or []:
+            name = normalize_trigger(trigger)
+            if name:
+                rows.append(row)
+                cols.append(trigger_index.setdefault(name, len(trigger_index)))
+
+    indicators = np.zeros((n_days, len(trigger_index)), dtype=np.float64)
+    if rows:
+        indicators[rows, cols] = 1.0
+
+    triggers = sorted(trigger_index, key=trigger_index.get)
+    return first_day, logged, triggers, indicators, pain, mood
+
+def _correlate(indicators: np.ndarray, exposed: np.ndarray, outcome: np.ndarray, lag: int) -> Dict[str, np.ndarray]:
+    """Pearson correlation of every indicator column with the outcome ``lag`` days later"""
+    n_days = len(outcome)
+    x = indicators[:n_days - lag]
+    y = outcome[lag:]
+    mask = exposed[:n_days - lag] & ~np.isnan(y)
+    x, y = x[mask], y[mask]
+    n = len(y)
+
+    if n < 3:
+        empty = np.full(indicators.shape[1], np.nan)
+        return {'r': empty, 'n': 0, 'with': empty, 'without': empty, 'days': np.zeros(indicators.shape[1])}
+
+    x_centered = x - x.mean(axis=0)
+    y_centered = y - y.mean()
+    denominator = np.sqrt((x_centered ** 2).sum(axis=0) * (y_centered ** 2).sum())
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (x_centered.T @ y_centered) / denominator
+        days_with = x.sum(axis=0)
+        mean_with = (x.T @ y) / days_with
+        mean_without = ((1 - x).T @ y) / (n - days_with)
+
+    return {'r': r, 'n': n, 'with': mean_with, 'without': mean_without, 'days': days_with}
+
+def _confidence(r: float, n: int) -> dict:
+    """Fisher-z 95% interval and two-sided p-value for a correlation"""
+    if n <= 3 or math.isnan(r):
+        return {'low': None, 'high': None, 'p_value': None}
+    clipped = max(min(r, 0.999999), -0.999999)
+    z = math.atanh(clipped)
+    se = 1 / math.sqrt(n - 3)
+    return {
+        'low': round(math.tanh(z - Z_95 * se), 3),
+        'high': round(math.tanh(z + Z_95 * se), 3),
+        'p_value': round(math.erfc(abs(z) / se / math.sqrt(2)), 4)
+    }
+
+def compute_correlations(logs: List[dict]) -> dict:
+    """Correlate each trigger with pain and mood at lags 0..MAX_LAG_DAYS"""
+    return correlate_matrices(build_matrices(logs))
+
+def correlate_matrices(matrices) -> dict:
+    """Correlation report for the output of build_matrices / LogSeries.dense_matrices"""
+    if not matrices:
+        return {'days_analyzed': 0, 'triggers': []}
+
+    first_day, logged, triggers, indicators, pain, mood = matrices
+
+    results = {trigger: {'trigger': trigger, 'days_present': 0, 'pain': [], 'mood': []} for trigger in triggers}
+    for outcome_name, outcome in (('pain', pain), ('mood', mood)):
+        for lag in range(MAX_LAG_DAYS + 1):
+            stats = _correlate(indicators, logged, outcome, lag)
+            for column, trigger in enumerate(triggers):
+                r = float(stats['r'][column])
+                entry = {
+                    'lag_days': lag,
+                    'r': None if math.isnan(r) else round(r, 3),
+                    'n': int(stats['n']),
+                    'mean_with': None if math.isnan(stats['with'][column]) else round(float(stats['with'][column]), 2),
+                    'mean_without': None if math.isnan(stats['without'][column]) else round(float(stats['without'][column]), 2),
+                    **_confidence(r, int(stats['n']))
+                }
+                results[trigger][outcome_name].append(entry)
+
+    day_counts = indicators.sum(axis=0)
+    for column, trigger in enumerate(triggers):
+        results[trigger]['days_present'] = int(day_counts[column])
+
+    ranked = [entry for entry in results.values() if entry['days_present'] >= MIN_TRIGGER_DAYS]
+    ranked.sort(key=lambda entry: -max((abs(lag['r'] or 0) for lag in entry['pain']), default=0))
+
+    return {
+        'first_date': date.fromordinal(first_day).isoformat(),
+        'days_analyzed': int(logged.sum()),
+        'triggers': ranked
+    }
+
+def get_trigger_correlations(user_uid: str) -> dict:
+    """Cached correlation report for a user, recomputed when a newer log exists"""
+    series = timeseries_cache.get(user_uid)
+    cached = correlation_cache.get(user_uid, series.version)
+    if cached is not None:
+        return cached
+
+    result = correlate_matrices(series.dense_matrices())
+    correlation_cache.put(user_uid, series.version, result)
+    return result
+
+def summarize_for_prompt(report: dict, limit: int = 3, max_p_value: float = 0.1) -> List[str]:
+    """Short, human readable lines about triggers that go with worse pain"""
+    lines = []
+    for entry in report.get('triggers', []):
+        best = max(
+            (lag for lag in entry['pain'] if lag['r'] is not None and lag['r'] > 0
+             and lag['p_value'] is not None and lag['p_value'] <= max_p_value),
+            key=lambda lag: lag['r'],
+            default=None
+        )
+        if not best:
+            continue
+        when = "the same day" if best['lag_days'] == 0 else f"{best['lag_days']} day(s) later"
+        lines.append(
+            f"{entry['trigger']}: pain {best['mean_with']} vs {best['mean_without']} {when} "
+            f"(r={best['r']}, {entry['days_present']} days)"
+        )
+        if len(lines) >= limit:
+            break
+    return lines
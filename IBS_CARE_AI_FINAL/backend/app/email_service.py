@@ -1,6 +1,8 @@
 import logging
+import time
 from flask_mail import Mail, Message
 from .config import Config
+from .metrics import record_email
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,16 @@ def init_email_service(app):
     mail.init_app(app)
     logger.info("Email service initialized")
 
+def _send(kind: str, msg: Message):
+    """Send one message, recording its latency and outcome"""
+    started = time.perf_counter()
+    try:
+        mail.send(msg)
+    except Exception:
+        record_email(kind, time.perf_counter() - started, False)
+        raise
+    record_email(kind, time.perf_counter() - started, True)
+
 def send_daily_reminder(user_email: str, user_name: str = None):
     """Send daily symptom logging reminder"""
     try:
@@ -55,7 +67,7 @@ This is an automated reminder. Please do not reply to this email.
         )
         msg.body = body.strip()
         
-        mail.send(msg)
+        _send('daily_reminder', msg)
         logger.info(f"Daily reminder sent to {user_email}")
         return True
         
@@ -115,7 +127,7 @@ Questions? Contact us at support@ibscare.ai
         )
         msg.body = body.strip()
         
-        mail.send(msg)
+        _send('welcome', msg)
         logger.info(f"Welcome email sent to {user_email}")
         return True
         
@@ -174,7 +186,7 @@ This is a weekly summary. You can adjust reminder settings in your profile.
         )
         msg.body = body.strip()
         
-        mail.send(msg)
+        _send('weekly_summary', msg)
         logger.info(f"Weekly summary sent to {user_email}")
         return True
         
@@ -4,8 +4,9 @@ Enhanced LLM Adapter using LangChain for context-aware IBS care assistance
 
 import logging
 import os
+import time
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -18,6 +19,14 @@ from pydantic import BaseModel, Field
 
 from .config import Config
 from .firebase_init import db
+from .correlations import get_trigger_correlations, summarize_for_prompt
+from .flare_detector import active_flare, get_flare_state
+from .food_index import summarize_for_prompt as summarize_foods_for_prompt
+from .knowledge_base import knowledge_index
+from .log_retrieval import retrieve_logs
+from .model_router import model_router
+from .metrics import record_llm_call
+from .timeline import recent_timeline
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +42,11 @@ class HealthContext(BaseModel):
     ibs_type: Optional[str] = Field(default=None, description="IBS subtype from assessment")
     ibs_severity: Optional[str] = Field(default=None, description="IBS severity level")
     last_log_date: Optional[str] = Field(default=None, description="Date of last health log")
+    trigger_insights: List[str] = Field(default_factory=list, description="Triggers correlated with worse pain")
+    suspect_foods: List[str] = Field(default_factory=list, description="Foods often eaten before flares")
+    flare_active: bool = Field(default=False, description="Whether the latest logs are a flare-up for this user")
+    flare_note: Optional[str] = Field(default=None, description="Date and reason of the detected flare-up")
+    relevant_logs: List[str] = Field(default_factory=list, description="Past logs retrieved for the current message")
 
 class ChatResponse(BaseModel):
     """Response model for chat interactions"""
@@ -76,18 +90,11 @@ class EnhancedLLMAdapter:
             except Exception as e:
                 logger.warning(f"Failed to initialize Groq model: {e}")
     
-    def _get_system_prompt(self, health_context: HealthContext) -> str:
+    def _get_system_prompt(self, health_context: HealthContext, knowledge: List[dict] = None) -> str:
         """Generate context-aware system prompt"""
         
         base_prompt = """You are IBSCare AI, a compassionate and knowledgeable health assistant specializing in IBS (Irritable Bowel Syndrome) management. Your role is to provide personalized, evidence-based lifestyle advice and emotional support.
 
-🎯 **Your Capabilities:**
-- Provide personalized dietary recommendations based on user's patterns
-- Suggest stress management and lifestyle modifications
-- Help interpret symptom patterns and triggers
-- Offer encouragement and emotional support
-- Share evidence-based IBS management strategies
-
 ⚠️ **Critical Guidelines:**
 - NEVER provide medical diagnosis or replace professional medical advice
 - If user reports severe symptoms (fever >101°F, blood in stool, severe unrelenting pain), immediately advise seeking emergency medical care
@@ -101,6 +108,12 @@ class EnhancedLLMAdapter:
 - Reference user's health patterns when relevant
 - Always end with encouragement and next steps"""
 
+        # Knowledge base snippets retrieved for this message
+        if knowledge:
+            base_prompt += "\n\n📚 **Relevant IBS guidance (ground your advice in it):**"
+            for snippet in knowledge:
+                base_prompt += f"\n- {snippet['title']}: {snippet['text']}"
+
         # Add personalized context if available
         if health_context.recent_logs_count > 0:
             context_section = f"""
@@ -125,38 +138,50 @@ class EnhancedLLMAdapter:
             if health_context.common_triggers:
                 context_section += f"\n- Common triggers: {', '.join(health_context.common_triggers[:5])}"
             
+            if health_context.flare_active:
+                context_section += f"\n- Possible flare-up detected (unusual for this user): {health_context.flare_note}"
+            
+            if health_context.trigger_insights:
+                context_section += "\n- Triggers linked to higher pain in their logs:"
+                for insight in health_context.trigger_insights:
+                    context_section += f"\n  - {insight}"
+            
+            if health_context.suspect_foods:
+                context_section += "\n- Foods often eaten within 24h before a flare:"
+                for food in health_context.suspect_foods:
+                    context_section += f"\n  - {food}"
+            
             context_section += "\n\n**Use this context to personalize your advice and reference specific patterns when relevant.**"
             
-            return base_prompt + context_section
+            return base_prompt + context_section + self._relevant_logs_section(health_context)
         
-        return base_prompt + "\n\n**Note:** No recent health data available for this user."
+        return base_prompt + self._relevant_logs_section(health_context) + "\n\n**Note:** No recent health data available for this user."
     
-    async def get_health_context(self, user_uid: str) -> HealthContext:
-        """Fetch and analyze user's health context from Firestore"""
+    def _relevant_logs_section(self, health_context: HealthContext) -> str:
+        """Prompt lines for the past logs retrieved for this message"""
+        if not health_context.relevant_logs:
+            return ""
+        section = "\n\n🗓️ **User's logs relevant to this message:**"
+        for line in health_context.relevant_logs:
+            section += f"\n- {line}"
+        return section
+    
+    async def get_health_context(self, user_uid: str, message: Optional[str] = None,
+                                 user_profile: Optional[dict] = None) -> HealthContext:
+        """Fetch and analyze user's health context from Firestore (user_profile if already read)"""
         try:
-            # Get recent health logs (last 14 days)
-            cutoff_date = (datetime.now() - timedelta(days=14)).isoformat()
-            
-            health_logs_ref = (
-                db.collection('health_logs')
-                .where('userId', '==', user_uid)
-                .where('createdAt', '>=', cutoff_date)
-                .order_by('createdAt', direction='DESCENDING')
-                .limit(50)
-            )
-            
-            logs = []
-            for doc in health_logs_ref.stream():
-                logs.append(doc.to_dict())
+            # Get recent health logs (last 14 days) from the unified timeline,
+            # which both the backend and the web client write paths feed
+            logs = recent_timeline(user_uid, days=14, limit=50)
             
             # Get user profile for assessment info
-            user_profile = None
-            try:
-                user_doc = db.collection('users').document(user_uid).get()
-                if user_doc.exists:
-                    user_profile = user_doc.to_dict()
-            except Exception as e:
-                logger.warning(f"Could not fetch user profile: {e}")
+            if user_profile is None:
+                try:
+                    user_doc = db.collection('users').document(user_uid).get()
+                    if user_doc.exists:
+                        user_profile = user_doc.to_dict()
+                except Exception as e:
+                    logger.warning(f"Could not fetch user profile: {e}")
             
             # Get assessment data
             assessment_data = None
@@ -173,9 +198,44 @@ class EnhancedLLMAdapter:
             except Exception as e:
                 logger.warning(f"Could not fetch assessment data: {e}")
             
+            # Correlate the user's triggers with pain (cached per latest log)
+            trigger_insights = []
+            try:
+                trigger_insights = summarize_for_prompt(get_trigger_correlations(user_uid))
+            except Exception as e:
+                logger.warning(f"Could not compute trigger correlations: {e}")
+            
+            # Foods that preceded flares, from the meal index
+            suspect_foods = []
+            try:
+                suspect_foods = summarize_foods_for_prompt(user_uid)
+            except Exception as e:
+                logger.warning(f"Could not query food index: {e}")
+            
+            # Flare-up flag maintained by the streaming detector on each log write
+            flare_note = None
+            try:
+                flare_note = active_flare(get_flare_state(user_uid))
+            except Exception as e:
+                logger.warning(f"Could not read flare state: {e}")
+            
+            # Past logs worth showing for this particular message
+            relevant_logs = []
+            if message:
+                try:
+                    relevant_logs = retrieve_logs(user_uid, message)
+                except Exception as e:
+                    logger.warning(f"Could not retrieve relevant logs: {e}")
+            
             # Process health context
             if not logs:
-                return HealthContext()
+                return HealthContext(
+                    trigger_insights=trigger_insights,
+                    suspect_foods=suspect_foods,
+                    flare_active=flare_note is not None,
+                    flare_note=flare_note,
+                    relevant_logs=relevant_logs
+                )
             
             # Calculate averages
             avg_mood = sum(log.get('mood', 5) for log in logs) / len(logs)
@@ -209,7 +269,12 @@ class EnhancedLLMAdapter:
                 days_tracked=len(unique_dates),
                 common_symptoms=common_symptoms,
                 common_triggers=common_triggers,
-                last_log_date=logs[0].get('date') if logs else None
+                last_log_date=logs[0].get('date') if logs else None,
+                trigger_insights=trigger_insights,
+                suspect_foods=suspect_foods,
+                flare_active=flare_note is not None,
+                flare_note=flare_note,
+                relevant_logs=relevant_logs
             )
             
             # Add assessment data if available
@@ -227,11 +292,24 @@ class EnhancedLLMAdapter:
     async def generate_response(self, user_uid: str, message: str, chat_history: List[Dict] = None) -> ChatResponse:
         """Generate AI response using LangChain with health context"""
         try:
-            # Get user's health context
-            health_context = await self.get_health_context(user_uid)
+            started = time.perf_counter()
+            last_reply = next((msg['content'] for msg in reversed(chat_history or []) if msg.get('role') == 'assistant'), None)
+            route = model_router.classify(message, last_reply)
             
-            # Generate system prompt with context
-            system_prompt = self._get_system_prompt(health_context)
+            # Trivial turns (greetings, thanks) need neither health context nor a model
+            if route['target'] == 'template':
+                reply = model_router.template_reply(route['intent'])
+                model_router.record(route['tier'], 'template', (time.perf_counter() - started) * 1000)
+                return ChatResponse(reply=reply, tokens_used=0, context_used=False)
+            
+            # Get user's health context, unless the turn is a general question
+            if route['needs_context']:
+                health_context = await self.get_health_context(user_uid, message)
+            else:
+                health_context = HealthContext()
+            
+            # Generate system prompt with context and the guidance relevant to this message
+            system_prompt = self._get_system_prompt(health_context, knowledge_index.search(message))
             
             # Build conversation history
             messages = [SystemMessage(content=system_prompt)]
@@ -247,34 +325,32 @@ class EnhancedLLMAdapter:
             # Add current user message
             messages.append(HumanMessage(content=message))
             
-            # Try Gemini first, then Groq as fallback
+            # Try the routed model first, then the other one as fallback
             response_text = None
             tokens_used = 0
+            used_model = 'fallback'
             
-            if self.gemini_model:
-                try:
-                    response = await self.gemini_model.ainvoke(messages)
-                    response_text = response.content
-                    # Gemini doesn't provide token usage in LangChain, estimate
-                    tokens_used = len(message.split()) + len(response_text.split())
-                    logger.info("Generated response using Gemini model")
-                except Exception as e:
-                    logger.warning(f"Gemini model failed: {e}")
-            
-            if not response_text and self.groq_model:
+            for attempt, (name, model) in enumerate(self._models_for(route['target'])):
+                called = time.perf_counter()
                 try:
-                    response = await self.groq_model.ainvoke(messages)
+                    response = await model.ainvoke(messages)
                     response_text = response.content
+                    # LangChain doesn't report token usage for every provider, estimate
                     tokens_used = len(message.split()) + len(response_text.split())
-                    logger.info("Generated response using Groq model")
+                    used_model = name
+                    record_llm_call(name, time.perf_counter() - called, True, attempt > 0, tokens_used)
+                    logger.info(f"Generated response using {name} model")
+                    break
                 except Exception as e:
-                    logger.warning(f"Groq model failed: {e}")
+                    record_llm_call(name, time.perf_counter() - called, False, attempt > 0)
+                    logger.warning(f"{name} model failed: {e}")
             
             # Fallback response if both models fail
             if not response_text:
                 response_text = self._get_fallback_response()
                 tokens_used = 0
             
+            model_router.record(route['tier'], used_model, (time.perf_counter() - started) * 1000, tokens_used)
             return ChatResponse(
                 reply=response_text,
                 tokens_used=tokens_used,
@@ -289,6 +365,13 @@ class EnhancedLLMAdapter:
                 context_used=False
             )
     
+    def _models_for(self, target: str) -> List[tuple]:
+        """(name, model) pairs to try for a routing target, preferred model first"""
+        models = [('gemini', self.gemini_model), ('groq', self.groq_model)]
+        if target == 'groq':
+            models.reverse()
+        return [(name, model) for name, model in models if model]
+    
     def _get_fallback_response(self) -> str:
         """Generate fallback response when AI models are unavailable"""
         return """Hello! I'm your IBS care assistant. I'm here to help you manage your symptoms and provide personalized advice. How are you feeling today?
@@ -0,0 +1,94 @@
+"""
+Weak ETags and conditional GETs for per-user read endpoints.
+
+Each resource has a cheap version marker (the newest write timestamp, read
+with a one-field projection), so a poll with a matching ``If-None-Match`` is
+answered with 304 without reading or serializing the payload. The marker is
+read on every request rather than cached per worker: a write handled by
+another worker, or made directly by the client, must never be answered with a
+304 for the old body.
+"""
+
+import hashlib
+import logging
+from functools import wraps
+from typing import Optional
+
+from flask import make_response, request
+
+from .firebase_init import db
+from .timeseries_cache import latest_log_version
+
+logger = logging.getLogger(__name__)
+
+def _chat_version(user_uid: str) -> str:
+    docs = list(
+        db.collection('chat_history')
+        .where('userId', '==', user_uid)
+        .order_by('timestamp', direction='DESCENDING')
+        .limit(1)
+        .select(['timestamp'])
+        .stream()
+    )
+    return f"{docs[0].id}@{docs[0].to_dict().get('timestamp', '')}" if docs else ''
+
+def _assessment_version(user_uid: str) -> str:
+    # updatedAt also moves when the rescore job rewrites the classification;
+    # assessments saved before it was written only have completed_at
+    doc = db.collection('users').document(user_uid).collection('assessments').document('latest').get(
+        field_paths=['updatedAt', 'completed_at']
+    )
+    data = (doc.to_dict() or {}) if doc.exists else {}
+    return data.get('updatedAt') or data.get('completed_at', '')
+
+def _reminders_version(user_uid: str) -> str:
+    doc = db.collection('users').document(user_uid).collection('settings').document('reminders').get(
+        field_paths=['created_at', 'updated_at']
+    )
+    data = (doc.to_dict() or {}) if doc.exists else {}
+    return f"{data.get('created_at', '')}|{data.get('updated_at', '')}"
+
+# resource -> function returning the user's current version of it
+VERSION_SOURCES = {
+    'logs': latest_log_version,
+    'chat': _chat_version,
+    'assessment': _assessment_version,
+    'reminders': _reminders_version
+}
+
+def current_version(user_uid: str, resource: str) -> str:
+    return VERSION_SOURCES[resource](user_uid)
+
+def make_etag(resource: str, version: str) -> str:
+    """Opaque tag for a version of a resource as seen through this request's query and format"""
+    digest = hashlib.sha1()
+    digest.update(f"{version}\n{request.full_path}\n{request.headers.get('Accept', '')}".encode())
+    return f"{resource}-{digest.hexdigest()[:20]}"
+
+def conditional(resource: str):
+    """Decorator (inside @require_auth) adding a weak ETag and answering If-None-Match with 304"""
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user_uid = kwargs.get('user_uid', '')
+            try:
+                tag: Optional[str] = make_etag(resource, current_version(user_uid, resource))
+            except Exception as e:
+                logger.warning(f"Could not read {resource} version for user {user_uid}: {e}")
+                tag = None
+
+            if tag and request.if_none_match.contains_weak(tag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if not tag or response.status_code != 200:
+                    return response
+            response.set_etag(tag, weak=True)
+            # Let browsers keep the body but always revalidate it
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        return decorated_function
+
+    return decorator
@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+from typing import List
 import firebase_admin
 from firebase_admin import credentials, firestore
 from .config import Config
@@ -41,6 +42,30 @@ def initialize_firebase():
 # Global Firestore client
 db = initialize_firebase()
 
+# Firestore rejects write batches with more than 500 operations
+MAX_BATCH_WRITES = 500
+
+def commit_batch(writes, merge: bool = True):
+    """Commit up to MAX_BATCH_WRITES (doc_ref, data) pairs in a single WriteBatch"""
+    if len(writes) > MAX_BATCH_WRITES:
+        raise ValueError(f"A batch can hold at most {MAX_BATCH_WRITES} writes")
+
+    batch = db.batch()
+    for doc_ref, data in writes:
+        batch.set(doc_ref, data, merge=merge)
+    batch.commit()
+
+def commit_grouped(groups: List[List[tuple]]):
+    """Commit groups of writes in as few batches as possible without splitting a group"""
+    batch = []
+    for group in groups:
+        if batch and len(batch) + len(group) > MAX_BATCH_WRITES:
+            commit_batch(batch)
+            batch = []
+        batch.extend(group)
+    if batch:
+        commit_batch(batch)
+
 
 # """--------------------- DOCKER BUILD-----------------------------------"""
 # import os
@@ -0,0 +1,173 @@
+"""
+Streaming flare-up detector.
+
+Keeps exponentially weighted mean/variance of pain and mood per user in
+``users/{uid}/state/flare`` and updates them in O(1) on every log write. An
+entry that lies far outside the user's own baseline sets the flare flag that
+the chat context and reminders read. Backfilled or edited past days make the
+EWMA order-dependent, so those writes replay the state from the raw series.
+Log saves fold their days in with ``apply_logs`` once the logs are committed;
+the state is read and written in a transaction so concurrent saves never
+fold into a stale state.
+"""
+
+import logging
+import math
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from firebase_admin import firestore
+
+from .config import Config
+from .firebase_init import db
+from .timeseries_cache import timeseries_cache, MISSING
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENTRIES = 5
+# A flagged day keeps the flare "active" for this many days afterwards
+ACTIVE_FLARE_DAYS = 3
+# Floor for the baseline standard deviation so very steady users don't flag on +1
+MIN_STD = 0.75
+BASELINE_FIELDS = ('count', 'pain_mean', 'pain_var', 'mood_mean', 'mood_var', 'last_date')
+
+def flare_state_ref(user_uid: str):
+    return db.collection('users').document(user_uid).collection('state').document('flare')
+
+def _ewma(mean: float, var: float, value: float, alpha: float):
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (var + diff * increment)
+
+def _z_score(value: float, mean: float, var: float) -> float:
+    return (value - mean) / max(math.sqrt(max(var, 0.0)), MIN_STD)
+
+def update_state(state: Optional[dict], log: dict, alpha: float = None, threshold: float = None) -> dict:
+    """Fold one in-order log into the detector state and return the new state.
+
+    The z-scores compare the entry with the baseline *before* it is included.
+    The pre-update baseline is kept under ``previous`` so that re-saving the
+    latest day can be applied again without replaying history.
+    """
+    alpha = alpha or Config.FLARE_EWMA_ALPHA
+    threshold = threshold or Config.FLARE_Z_THRESHOLD
+    state = dict(state or {})
+    baseline = {field: state.get(field) for field in BASELINE_FIELDS}
+    pain = log.get('pain_level')
+    mood = log.get('mood')
+
+    count = state.get('count', 0)
+    if not count:
+        new_state = {
+            'count': 1,
+            'pain_mean': float(pain if pain is not None else 0),
+            'pain_var': 0.0,
+            'mood_mean': float(mood if mood is not None else 5),
+            'mood_var': 0.0,
+            'pain_z': 0.0,
+            'mood_z': 0.0
+        }
+    else:
+        pain_z = _z_score(pain, state['pain_mean'], state['pain_var']) if pain is not None else 0.0
+        mood_z = _z_score(mood, state['mood_mean'], state['mood_var']) if mood is not None else 0.0
+        pain_mean, pain_var = _ewma(state['pain_mean'], state['pain_var'], pain, alpha) if pain is not None else (state['pain_mean'], state['pain_var'])
+        mood_mean, mood_var = _ewma(state['mood_mean'], state['mood_var'], mood, alpha) if mood is not None else (state['mood_mean'], state['mood_var'])
+        new_state = {
+            'count': count + 1,
+            'pain_mean': pain_mean,
+            'pain_var': pain_var,
+            'mood_mean': mood_mean,
+            'mood_var': mood_var,
+            'pain_z': round(pain_z, 3),
+            'mood_z': round(mood_z, 3)
+        }
+
+    flare = count >= WARMUP_ENTRIES and (new_state['pain_z'] >= threshold or new_state['mood_z'] <= -threshold)
+    reasons = []
+    if flare and new_state['pain_z'] >= threshold:
+        reasons.append(f"pain {pain} vs usual {state['pain_mean']:.1f}")
+    if flare and new_state['mood_z'] <= -threshold:
+        reasons.append(f"mood {mood} vs usual {state['mood_mean']:.1f}")
+
+    new_state.update({
+        'last_date': log['dateISO'][:10],
+        'flare': flare,
+        'flare_date': log['dateISO'][:10] if flare else None,
+        'flare_reason': '; '.join(reasons),
+        'previous': baseline if count else None,
+        'updatedAt': datetime.now().isoformat()
+    })
+    return new_state
+
+def flare_writes(user_uid: str, state: Optional[dict], previous_log: Optional[dict], log: dict) -> Optional[list]:
+    """Merge-writes for an in-order log, or None when the state must be replayed.
+
+    ``state`` is the stored detector state and ``previous_log`` the stored
+    version of the same day, if any.
+    """
+    last_date = (state or {}).get('last_date')
+    date_iso = log['dateISO'][:10]
+
+    if last_date and date_iso < last_date:
+        return None
+    if last_date and date_iso == last_date and previous_log:
+        # Re-saving the latest day: rewind to the baseline before it was counted
+        if not state.get('previous'):
+            return None
+        state = {**state, **state['previous']}
+    elif last_date and date_iso == last_date:
+        return None
+
+    return [(flare_state_ref(user_uid), update_state(state, log))]
+
+def apply_logs(user_uid: str, logs: List[Tuple[Optional[dict], dict]]):
+    """Fold committed (previous version, log) pairs into the state, replaying when one is out of order"""
+    if logs and not _fold_logs(db.transaction(), user_uid, sorted(logs, key=lambda pair: pair[1]['dateISO'])):
+        replay_user(user_uid)
+
+@firestore.transactional
+def _fold_logs(transaction, user_uid: str, logs: List[Tuple[Optional[dict], dict]]) -> bool:
+    """Whether every log could be folded in date order; nothing is written otherwise"""
+    state_ref = flare_state_ref(user_uid)
+    snapshot = state_ref.get(transaction=transaction)
+    state = snapshot.to_dict() if snapshot.exists else None
+    for previous, log in logs:
+        writes = flare_writes(user_uid, state, previous, log)
+        if writes is None:
+            return False
+        state = writes[0][1]
+    transaction.set(state_ref, state, merge=True)
+    return True
+
+def replay_series(series) -> Optional[dict]:
+    """Recompute the detector state by folding every day of a LogSeries in date order"""
+    state = None
+    for day, mood, pain in zip(series.days, series.mood, series.pain):
+        state = update_state(state, {
+            'dateISO': date.fromordinal(int(day)).isoformat(),
+            'mood': None if mood == MISSING else int(mood),
+            'pain_level': None if pain == MISSING else int(pain)
+        })
+    return state
+
+def replay_user(user_uid: str) -> Optional[dict]:
+    """Rebuild and store a user's detector state from the raw logs"""
+    state = replay_series(timeseries_cache.get(user_uid))
+    if state:
+        flare_state_ref(user_uid).set(state)
+    else:
+        flare_state_ref(user_uid).delete()
+    return state
+
+def get_flare_state(user_uid: str) -> dict:
+    doc = flare_state_ref(user_uid).get()
+    return doc.to_dict() if doc.exists else {}
+
+def active_flare(state: dict) -> Optional[str]:
+    """Reason text of a flare flagged in the last ACTIVE_FLARE_DAYS days, if any"""
+    if not state.get('flare') or not state.get('flare_date'):
+        return None
+    cutoff = (datetime.now() - timedelta(days=ACTIVE_FLARE_DAYS)).date().isoformat()
+    if state['flare_date'] < cutoff:
+        return None
+    return f"{state['flare_date']}: {state.get('flare_reason') or 'unusual symptoms'}"
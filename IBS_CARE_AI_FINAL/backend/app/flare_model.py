@@ -0,0 +1,169 @@
+"""
+Per-user "tomorrow's flare risk" model.
+
+A logistic regression over one day's log (pain, mood, recent pain, triggers and
+food groups eaten) predicts whether the next day's pain reaches the flare
+threshold. A global model is fitted nightly over every user's logs and then
+fine-tuned per user with an L2 pull towards the global weights, so users with
+little history stay close to the population model. Inference is one dot
+product over a few dozen weights, read fresh with the user's latest logs.
+"""
+
+import hashlib
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .firebase_init import db
+from .flare_training import sigmoid
+from .food_index import CATEGORY_EXCLUSIONS, FOOD_CATEGORIES, FLARE_PAIN_THRESHOLD, normalize_food
+from .rollups import normalize_trigger
+
+logger = logging.getLogger(__name__)
+
+# Triggers with a dedicated weight; free-text triggers are matched by substring
+MODEL_TRIGGERS = ['stress', 'dairy', 'caffeine', 'alcohol', 'spicy', 'fatty', 'gluten',
+                  'sleep', 'travel', 'period', 'exercise', 'skipped meal']
+FEATURE_NAMES = (
+    ['bias', 'pain', 'mood', 'pain_3d', 'flare_today']
+    + [f"trigger:{trigger}" for trigger in MODEL_TRIGGERS]
+    + [f"food:{category}" for category in FOOD_CATEGORIES]
+)
+# Stored with the weights so a changed feature layout never mixes with old weights
+FEATURE_SIGNATURE = hashlib.sha1('|'.join(FEATURE_NAMES).encode()).hexdigest()[:12]
+
+GLOBAL_MODEL_DOC = ('models', 'flare_risk')
+
+_CATEGORY_PATTERNS = {
+    category: (
+        re.compile(r"\b(?:" + '|'.join(re.escape(term) for term in terms) + r")\b"),
+        re.compile(r"\b(?:" + '|'.join(re.escape(term) for term in CATEGORY_EXCLUSIONS[category]) + r")\b")
+        if category in CATEGORY_EXCLUSIONS else None
+    )
+    for category, terms in FOOD_CATEGORIES.items()
+}
+
+def user_model_ref(user_uid: str):
+    return db.collection('users').document(user_uid).collection('state').document('flare_model')
+
+def global_model_ref():
+    return db.collection(GLOBAL_MODEL_DOC[0]).document(GLOBAL_MODEL_DOC[1])
+
+def _food_categories(log: dict) -> set:
+    categories = set()
+    for meal in log.get('meals') or []:
+        for item in meal.get('items') or []:
+            food = normalize_food(item)
+            for category, (pattern, exclusion) in _CATEGORY_PATTERNS.items():
+                if pattern.search(food) and not (exclusion and exclusion.search(food)):
+                    categories.add(category)
+    return categories
+
+def day_features(log: dict, recent_pain: List[float]) -> np.ndarray:
+    """Feature vector of one day's log; ``recent_pain`` holds the pain of up to 3 days ending with it"""
+    pain = log.get('pain_level')
+    pain = float(pain) if pain is not None else 0.0
+    mood = log.get('mood')
+    mood = float(mood) if mood is not None else 5.0
+    triggers = [normalize_trigger(trigger) for trigger in log.get('triggers') or []]
+    categories = _food_categories(log)
+
+    values = [1.0, pain / 10, mood / 10, (sum(recent_pain) / len(recent_pain) if recent_pain else pain) / 10,
+              float(pain >= FLARE_PAIN_THRESHOLD)]
+    values += [float(any(name in trigger for trigger in triggers)) for name in MODEL_TRIGGERS]
+    values += [float(category in categories) for category in FOOD_CATEGORIES]
+    return np.array(values, dtype=np.float32)
+
+def build_dataset(logs: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """(X, y) pairs of a day's features and whether the following calendar day was a flare"""
+    logs = sorted((log for log in logs if log.get('dateISO')), key=lambda log: log['dateISO'])
+    days = [date.fromisoformat(log['dateISO'][:10]) for log in logs]
+
+    rows, labels = [], []
+    for index in range(len(logs) - 1):
+        if days[index + 1] - days[index] != timedelta(days=1):
+            continue
+        recent = [
+            float(logs[back].get('pain_level') or 0)
+            for back in range(max(0, index - 2), index + 1)
+            if days[index] - days[back] <= timedelta(days=2)
+        ]
+        rows.append(day_features(logs[index], recent))
+        labels.append(float((logs[index + 1].get('pain_level') or 0) >= FLARE_PAIN_THRESHOLD))
+
+    if not rows:
+        return np.empty((0, len(FEATURE_NAMES)), dtype=np.float32), np.empty(0, dtype=np.float32)
+    return np.vstack(rows), np.array(labels, dtype=np.float32)
+
+def model_document(weights: np.ndarray, samples: int, **extra) -> dict:
+    return {
+        'signature': FEATURE_SIGNATURE,
+        'weights': [round(float(weight), 6) for weight in weights],
+        'samples': samples,
+        'trainedAt': datetime.now().isoformat(),
+        **extra
+    }
+
+def _weights_from_doc(doc) -> Optional[np.ndarray]:
+    data = doc.to_dict() if doc.exists else None
+    # Weights trained for a different feature layout are ignored until the next run
+    if not data or data.get('signature') != FEATURE_SIGNATURE:
+        return None
+    return np.array(data['weights'], dtype=np.float64)
+
+def load_weights(user_uid: str) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """(weights, 'personal' | 'global') for a user.
+
+    Both documents are read in one get_all on every call: they are a few dozen
+    numbers, and a training run that rewrites them is seen by every worker at once.
+    """
+    user_ref, global_ref = user_model_ref(user_uid), global_model_ref()
+    snapshots = {snapshot.reference.path: snapshot for snapshot in db.get_all([user_ref, global_ref])}
+    weights = _weights_from_doc(snapshots[user_ref.path])
+    if weights is not None:
+        return weights, 'personal'
+    weights = _weights_from_doc(snapshots[global_ref.path])
+    return weights, 'global' if weights is not None else None
+
+def predict_flare_risk(user_uid: str) -> Optional[dict]:
+    """Probability that the day after the user's latest log is a flare day"""
+    weights, source = load_weights(user_uid)
+    if weights is None:
+        return None
+
+    docs = (
+        db.collection('users').document(user_uid).collection('logs')
+        .order_by('dateISO', direction='DESCENDING')
+        .limit(3)
+        .select(['dateISO', 'mood', 'pain_level', 'triggers', 'meals'])
+        .stream()
+    )
+    logs = [doc.to_dict() for doc in docs]
+    if not logs:
+        return {'risk': None, 'model': source, 'based_on': None, 'date': None, 'factors': []}
+
+    latest = logs[0]
+    latest_day = date.fromisoformat(latest['dateISO'][:10])
+    recent = [
+        float(log.get('pain_level') or 0) for log in logs
+        if latest_day - date.fromisoformat(log['dateISO'][:10]) <= timedelta(days=2)
+    ]
+    features = day_features(latest, recent).astype(np.float64)
+    contributions = weights * features
+    risk = float(sigmoid(np.array([contributions.sum()]))[0])
+
+    factors = [
+        {'feature': FEATURE_NAMES[index], 'weight': round(float(contributions[index]), 3)}
+        for index in np.argsort(-contributions)[:3]
+        if index and contributions[index] > 0
+    ]
+    return {
+        'date': (latest_day + timedelta(days=1)).isoformat(),
+        'based_on': latest_day.isoformat(),
+        'risk': round(risk, 3),
+        'model': source,
+        'factors': factors
+    }
@@ -0,0 +1,81 @@
+"""
+Fitting of the flare-risk model.
+
+NumPy only: the training process pool and app.benchmarks.flare_training
+import this module without initializing Firestore. Rows are the day feature
+vectors built by flare_model.build_dataset and labels whether the next day was
+a flare day.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MIN_USER_SAMPLES = 14
+GLOBAL_L2 = 1.0
+# Strength of the pull of personal weights towards the global model
+USER_PRIOR_STRENGTH = 5.0
+NEWTON_ITERATIONS = 8
+USERS_PER_TASK = 500
+# Cap on the rows used for the global fit; personal fits always use every row
+GLOBAL_SAMPLE_ROWS = 2_000_000
+
+def sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-np.clip(z, -30, 30)))
+
+def fit_logistic(X: np.ndarray, y: np.ndarray, prior: Optional[np.ndarray] = None,
+                 l2: float = GLOBAL_L2, iterations: int = NEWTON_ITERATIONS) -> np.ndarray:
+    """L2-regularized logistic regression by Newton's method, shrunk towards ``prior``"""
+    X = X.astype(np.float64, copy=False)
+    n_features = X.shape[1]
+    penalty = np.full(n_features, l2)
+    # The bias is free for the global fit and only lightly tied to the prior otherwise
+    penalty[0] = 0.0 if prior is None else l2 * 0.1
+    prior = np.zeros(n_features) if prior is None else prior.astype(np.float64)
+    weights = prior.copy()
+
+    for _ in range(iterations):
+        p = sigmoid(X @ weights)
+        gradient = X.T @ (p - y) + penalty * (weights - prior)
+        hessian = (X * (p * (1 - p))[:, None]).T @ X + np.diag(penalty + 1e-6)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-6:
+            break
+    return weights
+
+def fine_tune_users(batch: List[tuple], global_weights: np.ndarray) -> List[tuple]:
+    """Personal weights for (uid, X, y) items; runs inside the training process pool"""
+    results = []
+    for user_uid, X, y in batch:
+        if len(y) < MIN_USER_SAMPLES:
+            continue
+        weights = fit_logistic(X, y, prior=global_weights, l2=USER_PRIOR_STRENGTH)
+        results.append((user_uid, weights, len(y)))
+    return results
+
+def log_loss(weights: np.ndarray, X: np.ndarray, y: np.ndarray) -> float:
+    p = np.clip(sigmoid(X.astype(np.float64) @ weights), 1e-9, 1 - 1e-9)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+def fit_global(datasets, seed: int = 0) -> np.ndarray:
+    """Global weights over every user's (uid, X, y), on a sample of GLOBAL_SAMPLE_ROWS at most"""
+    X = np.vstack([X for _, X, _ in datasets])
+    y = np.concatenate([y for _, _, y in datasets])
+    if len(y) > GLOBAL_SAMPLE_ROWS:
+        rows = np.random.default_rng(seed).choice(len(y), GLOBAL_SAMPLE_ROWS, replace=False)
+        X, y = X[rows], y[rows]
+    return fit_logistic(X, y)
+
+def fine_tune_all(datasets, global_weights: np.ndarray, workers: int):
+    """Personal weights for every user with enough examples, trained across processes"""
+    tasks = [datasets[start:start + USERS_PER_TASK] for start in range(0, len(datasets), USERS_PER_TASK)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch_results in pool.map(fine_tune_users, tasks, [global_weights] * len(tasks)):
+            results.extend(batch_results)
+    return results
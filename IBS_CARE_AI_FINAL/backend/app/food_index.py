@@ -0,0 +1,225 @@
+"""
+Per-user inverted index from normalized food item to the meals it was eaten in.
+
+``users/{uid}/food_index/{food}`` holds ``occurrences`` as ``"dateISO|timeISO"``
+strings, maintained with ArrayUnion/ArrayRemove on every log write, so flare
+questions only read flare days plus one small document per distinct food.
+"""
+
+import logging
+import math
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from firebase_admin import firestore
+
+from .cache import VersionedCache
+from .config import Config
+from .firebase_init import db, commit_batch, MAX_BATCH_WRITES
+from .timeseries_cache import latest_log_version
+
+logger = logging.getLogger(__name__)
+
+FLARE_PAIN_THRESHOLD = 7
+
+# Food groups that can be queried by name, matched as whole words in food items
+FOOD_CATEGORIES = {
+    'dairy': ['milk', 'cheese', 'yogurt', 'yoghurt', 'cream', 'butter', 'ice cream', 'latte', 'cappuccino', 'kefir', 'custard'],
+    'gluten': ['bread', 'pasta', 'wheat', 'pizza', 'cereal', 'bagel', 'croissant', 'cracker', 'noodles', 'barley', 'rye'],
+    'caffeine': ['coffee', 'espresso', 'latte', 'cappuccino', 'tea', 'energy drink', 'cola'],
+    'alcohol': ['beer', 'wine', 'vodka', 'whiskey', 'gin', 'rum', 'cocktail', 'cider'],
+    'high-fodmap': ['onion', 'garlic', 'beans', 'lentils', 'chickpeas', 'apple', 'pear', 'mango', 'watermelon',
+                    'cauliflower', 'mushroom', 'honey', 'milk', 'wheat', 'rye'],
+    'spicy': ['chili', 'chilli', 'hot sauce', 'curry', 'jalapeno', 'sriracha', 'pepper flakes'],
+    'fried': ['fried', 'fries', 'chips', 'tempura', 'nuggets']
+}
+
+# Words that take an item out of a category, e.g. "oat milk" is not dairy
+CATEGORY_EXCLUSIONS = {
+    'dairy': ['oat', 'almond', 'soy', 'rice', 'coconut', 'cashew', 'lactose-free', 'vegan'],
+    'gluten': ['gluten-free', 'rice', 'corn']
+}
+
+food_index_cache = VersionedCache(Config.ANALYTICS_CACHE_USERS)
+
+def food_index_ref(user_uid: str):
+    return db.collection('users').document(user_uid).collection('food_index')
+
+def normalize_food(item: str) -> str:
+    item = re.sub(r"[^\w\s'-]", ' ', str(item).lower())
+    return ' '.join(item.split())
+
+def _doc_id(food: str) -> str:
+    # normalize_food strips slashes and dots; ids matching __.*__ are reserved
+    return f"food-{food}" if food.startswith('__') else food
+
+def meal_date(occurrence: str) -> date:
+    """Calendar day of a ``"dateISO|timeISO"`` occurrence, preferring a dated timeISO"""
+    date_iso, _, time_iso = occurrence.partition('|')
+    try:
+        return datetime.fromisoformat(time_iso.replace('Z', '+00:00')).date()
+    except ValueError:
+        return date.fromisoformat(date_iso[:10])
+
+def log_occurrences(log: Optional[dict]) -> Dict[str, set]:
+    """Map each normalized food in a log to its ``"dateISO|timeISO"`` occurrences"""
+    occurrences = defaultdict(set)
+    if not log:
+        return occurrences
+    for meal in log.get('meals') or []:
+        for item in meal.get('items') or []:
+            food = normalize_food(item)
+            if food:
+                occurrences[food].add(f"{log['dateISO']}|{meal.get('timeISO', '')}")
+    return occurrences
+
+def food_index_writes(user_uid: str, previous: Optional[dict], current: dict) -> List[tuple]:
+    """Build the (doc_ref, data) merge-writes that move a day's meals from previous to current"""
+    before = log_occurrences(previous)
+    after = log_occurrences(current)
+    now = datetime.now().isoformat()
+
+    writes = []
+    for food in set(before) | set(after):
+        removed = before[food] - after[food]
+        added = after[food] - before[food]
+        doc_ref = food_index_ref(user_uid).document(_doc_id(food))
+        # A single write cannot both remove from and add to the same array
+        if removed:
+            writes.append((doc_ref, {'food': food, 'occurrences': firestore.ArrayRemove(sorted(removed)), 'updatedAt': now}))
+        if added:
+            writes.append((doc_ref, {'food': food, 'occurrences': firestore.ArrayUnion(sorted(added)), 'updatedAt': now}))
+    return writes
+
+def rebuild_food_index(user_uid: str) -> int:
+    """Recompute the whole food index of a user from the raw logs"""
+    index = defaultdict(set)
+    for doc in food_index_ref(user_uid).parent.collection('logs').select(['dateISO', 'meals']).stream():
+        log = doc.to_dict()
+        if log.get('dateISO'):
+            for food, occurrences in log_occurrences(log).items():
+                index[food] |= occurrences
+
+    for stale in food_index_ref(user_uid).list_documents():
+        stale.delete()
+
+    now = datetime.now().isoformat()
+    writes = [
+        (food_index_ref(user_uid).document(_doc_id(food)), {'food': food, 'occurrences': sorted(occurrences), 'updatedAt': now})
+        for food, occurrences in index.items()
+    ]
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        commit_batch(writes[start:start + MAX_BATCH_WRITES], merge=False)
+
+    logger.info(f"Rebuilt food index with {len(index)} foods for user {user_uid}")
+    return len(index)
+
+def load_food_index(user_uid: str) -> Dict[str, List[str]]:
+    """Read the user's index, cached per worker until a newer log is written"""
+    version = latest_log_version(user_uid)
+    cached = food_index_cache.get(user_uid, version)
+    if cached is not None:
+        return cached
+
+    index = {}
+    for doc in food_index_ref(user_uid).stream():
+        data = doc.to_dict()
+        if data.get('occurrences'):
+            index[data.get('food', doc.id)] = data['occurrences']
+    food_index_cache.put(user_uid, version, index)
+    return index
+
+def flare_dates(user_uid: str, threshold: int = FLARE_PAIN_THRESHOLD) -> set:
+    """Days on which the user logged pain at or above the threshold"""
+    docs = (
+        db.collection('users').document(user_uid).collection('logs')
+        .where('pain_level', '>=', threshold)
+        .select(['dateISO'])
+        .stream()
+    )
+    return {date.fromisoformat(doc.to_dict()['dateISO'][:10]) for doc in docs}
+
+def _followed_by_flare(occurrence: str, flares: set, window_days: int) -> bool:
+    eaten = meal_date(occurrence)
+    return any(eaten + timedelta(days=offset) in flares for offset in range(window_days + 1))
+
+def _window_days(window_hours: int) -> int:
+    # A meal on day D can precede a flare on day D up to ceil(hours / 24) days later
+    return max(1, math.ceil(window_hours / 24))
+
+def foods_matching(index: Dict[str, List[str]], query: str) -> List[str]:
+    """Foods in the index that belong to a category name or contain the query as a word"""
+    query = normalize_food(query)
+    terms = FOOD_CATEGORIES.get(query, [query])
+    patterns = [re.compile(rf"\b{re.escape(term)}\b") for term in terms]
+    exclusions = [re.compile(rf"\b{re.escape(term)}\b") for term in CATEGORY_EXCLUSIONS.get(query, [])]
+    return [
+        food for food in index
+        if any(pattern.search(food) for pattern in patterns)
+        and not any(pattern.search(food) for pattern in exclusions)
+    ]
+
+def foods_preceding_flares(user_uid: str, threshold: int = FLARE_PAIN_THRESHOLD,
+                           window_hours: int = 24, min_occurrences: int = 2) -> dict:
+    """Rank foods by how often they were eaten within window_hours before a flare"""
+    flares = flare_dates(user_uid, threshold)
+    index = load_food_index(user_uid)
+    window_days = _window_days(window_hours)
+
+    foods = []
+    for food, occurrences in index.items():
+        if len(occurrences) < min_occurrences:
+            continue
+        followed = sum(1 for occurrence in occurrences if _followed_by_flare(occurrence, flares, window_days))
+        if followed:
+            foods.append({
+                'food': food,
+                'times_eaten': len(occurrences),
+                'followed_by_flare': followed,
+                'flare_rate': round(followed / len(occurrences), 3)
+            })
+
+    foods.sort(key=lambda entry: (-entry['followed_by_flare'], -entry['flare_rate']))
+    return {
+        'threshold': threshold,
+        'window_hours': window_hours,
+        'flare_days': len(flares),
+        'foods': foods
+    }
+
+def flare_rate_after(user_uid: str, query: str, threshold: int = FLARE_PAIN_THRESHOLD,
+                     window_hours: int = 24) -> dict:
+    """Share of meals with a food (or food category) followed by a flare"""
+    flares = flare_dates(user_uid, threshold)
+    index = load_food_index(user_uid)
+    window_days = _window_days(window_hours)
+
+    matched = foods_matching(index, query)
+    occurrences = {occurrence for food in matched for occurrence in index[food]}
+    followed = sum(1 for occurrence in occurrences if _followed_by_flare(occurrence, flares, window_days))
+
+    # Baseline: share of logged days that were flare days, from the rollup summary
+    summary_doc = db.collection('users').document(user_uid).collection('rollups').document('summary').get()
+    total_days = (summary_doc.to_dict() or {}).get('total_days', 0) if summary_doc.exists else 0
+
+    return {
+        'query': query,
+        'matched_foods': sorted(matched),
+        'times_eaten': len(occurrences),
+        'followed_by_flare': followed,
+        'flare_rate': round(followed / len(occurrences), 3) if occurrences else None,
+        'baseline_flare_rate': round(len(flares) / total_days, 3) if total_days else None,
+        'threshold': threshold,
+        'window_hours': window_hours
+    }
+
+def summarize_for_prompt(user_uid: str, limit: int = 3) -> List[str]:
+    """Foods most often eaten before flares, as short lines for the LLM context"""
+    report = foods_preceding_flares(user_uid, min_occurrences=3)
+    return [
+        f"{entry['food']}: eaten {entry['times_eaten']} times, followed by pain >= {report['threshold']} "
+        f"within {report['window_hours']}h {entry['followed_by_flare']} times"
+        for entry in report['foods'][:limit]
+    ]
@@ -0,0 +1,180 @@
+"""
+Idempotency-Key support for retried POST requests.
+
+The first request with a key claims ``idempotency_keys/{hash of user, endpoint,
+key}`` with a create-only write, runs the view and stores its response in the
+document. Because the claim lives in Firestore, a retry gets the stored
+response back (marked ``Idempotent-Replayed: true``) whichever gunicorn worker
+it lands on, and a retry that arrives while the first request is still running
+waits for it instead of repeating the LLM call or the writes.
+
+Server errors and responses carrying an ``error`` field are not stored, so the
+client's retry runs the request again. Documents carry an ``expiresAt``
+timestamp: a Firestore TTL policy on that field deletes them, and expired
+documents are reclaimed before then.
+"""
+
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from typing import Optional
+
+from flask import Response, jsonify, make_response, request
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition
+
+from .config import Config
+from .firebase_init import db
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Response headers worth replaying besides the body and content type
+REPLAYED_HEADERS = ('X-Next-Cursor', 'ETag', 'Location')
+# Responses larger than this are not stored (Firestore documents are limited to 1 MiB)
+MAX_STORED_BODY_BYTES = 900 * 1024
+POLL_SECONDS = 0.25
+
+PENDING = 'pending'
+DONE = 'done'
+
+class IdempotencyStore:
+    """Claims and stored responses in Firestore, shared by every worker"""
+
+    def __init__(self, ttl_seconds: int, wait_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+
+    def _ref(self, scope: str):
+        return db.collection('idempotency_keys').document(hashlib.sha256(scope.encode()).hexdigest())
+
+    def _pending(self, user_uid: str, fingerprint: str) -> dict:
+        now = datetime.now(timezone.utc)
+        return {
+            'userId': user_uid,
+            'endpoint': request.endpoint,
+            'fingerprint': fingerprint,
+            'state': PENDING,
+            'createdAt': now,
+            'expiresAt': now + timedelta(seconds=self.ttl_seconds)
+        }
+
+    def _reclaimable(self, entry: dict) -> bool:
+        """Expired, or still pending long after its owner should have finished (crashed worker)"""
+        now = datetime.now(timezone.utc)
+        if entry['expiresAt'] <= now:
+            return True
+        return entry['state'] == PENDING and entry['createdAt'] + timedelta(seconds=self.wait_seconds) <= now
+
+    def begin(self, scope: str, user_uid: str, fingerprint: str) -> Optional[dict]:
+        """None when this request claimed the key and must run, else the other request's entry
+
+        The returned entry is either completed or still pending after waiting
+        up to wait_seconds for it.
+        """
+        ref = self._ref(scope)
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            try:
+                ref.create(self._pending(user_uid, fingerprint))
+                return None
+            except AlreadyExists:
+                pass
+
+            snapshot = ref.get()
+            if not snapshot.exists:
+                # The owner failed and released the key; try to claim it
+                continue
+            entry = snapshot.to_dict()
+            if self._reclaimable(entry):
+                try:
+                    ref.update(self._pending(user_uid, fingerprint),
+                               option=db.write_option(last_update_time=snapshot.update_time))
+                    return None
+                except FailedPrecondition:
+                    continue
+            if entry['fingerprint'] != fingerprint or entry['state'] == DONE or time.monotonic() >= deadline:
+                return entry
+            time.sleep(POLL_SECONDS)
+
+    def complete(self, scope: str, response: Optional[dict]):
+        """Store the response, or release the key when it must not be replayed"""
+        ref = self._ref(scope)
+        try:
+            if response is None:
+                ref.delete()
+            else:
+                ref.update({'state': DONE, 'response': response})
+        except Exception as e:
+            logger.error(f"Failed to record idempotent response: {e}")
+
+def _fingerprint(user_uid: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{user_uid}\n{request.method}\n{request.path}\n".encode())
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def _storable(response: Response) -> Optional[dict]:
+    """What to keep of a response for replays, or None when a retry should run again"""
+    # Server errors and error payloads (such as the chat fallback) are not replayed
+    if response.status_code >= 500 or response.is_streamed:
+        return None
+    if response.is_json:
+        payload = response.get_json(silent=True)
+        if isinstance(payload, dict) and 'error' in payload:
+            return None
+    body = response.get_data()
+    if len(body) > MAX_STORED_BODY_BYTES:
+        logger.warning(f"Not storing a {len(body)} byte response of {request.endpoint} for replay")
+        return None
+    return {
+        'status': response.status_code,
+        'body': body,
+        'mimetype': response.mimetype,
+        'headers': {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+    }
+
+def _replay(stored: dict) -> Response:
+    replayed = Response(stored['body'], status=stored['status'], mimetype=stored['mimetype'])
+    for name, value in (stored.get('headers') or {}).items():
+        replayed.headers[name] = value
+    replayed.headers['Idempotent-Replayed'] = 'true'
+    return replayed
+
+def idempotent(f):
+    """Decorator (inside @require_auth) honouring the Idempotency-Key request header"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+        user_uid = kwargs.get('user_uid', '')
+        scope = f"{user_uid}:{request.endpoint}:{key}"
+        fingerprint = _fingerprint(user_uid)
+        entry = idempotency_store.begin(scope, user_uid, fingerprint)
+
+        if entry is not None:
+            if entry['fingerprint'] != fingerprint:
+                return jsonify({"error": f"{IDEMPOTENCY_HEADER} was already used for a different request"}), 422
+            if entry['state'] != DONE:
+                return jsonify({"error": "A request with this Idempotency-Key is still being processed"}), 409
+            logger.info(f"Replaying response for {request.endpoint} (user {user_uid})")
+            return _replay(entry['response'])
+
+        stored = None
+        try:
+            response = make_response(f(*args, **kwargs))
+            stored = _storable(response)
+            return response
+        finally:
+            idempotency_store.complete(scope, stored)
+
+    return decorated_function
+
+idempotency_store = IdempotencyStore(Config.IDEMPOTENCY_TTL_SECONDS, Config.IDEMPOTENCY_WAIT_SECONDS)
@@ -0,0 +1,31 @@
+"""
+Project existing health_logs and users/{uid}/logs documents into log_timeline.
+
+Usage: python -m app.jobs.backfill_timeline [user_uid ...]
+Without arguments both collections are scanned for every user.
+"""
+
+import argparse
+import logging
+
+from ..timeline import backfill_timeline
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill the unified log timeline")
+    parser.add_argument('user_uids', nargs='*', help="Users to backfill (default: all users)")
+    args = parser.parse_args(argv)
+
+    total = 0
+    for user_uid in args.user_uids or [None]:
+        try:
+            total += backfill_timeline(user_uid)
+        except Exception as e:
+            logger.error(f"Failed to backfill timeline for {user_uid or 'all users'}: {e}")
+
+    logger.info(f"Timeline backfill finished: {total} entries written")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,86 @@
+"""
+Write precompressed .gz (and .br, when brotli is installed) siblings of the SPA files.
+
+Usage: python -m app.jobs.precompress_static [--require-brotli] [static_dir]
+Without an argument Config.STATIC_DIR (default backend/static) is used. Run
+after copying the Vite dist; the static manifest picks the variants up at
+startup. A variant is only kept when it saves at least MIN_SAVING of the file.
+The Docker build passes ``--require-brotli`` so an image never ships without
+its .br variants.
+"""
+
+import argparse
+import gzip
+import logging
+import os
+
+from ..config import Config
+from ..static_assets import ENCODINGS, default_static_dir
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE = ('.html', '.js', '.mjs', '.css', '.svg', '.json', '.map', '.txt', '.xml', '.webmanifest', '.ico', '.wasm')
+MIN_SIZE = 1024
+MIN_SAVING = 0.1
+
+COMPRESSORS = {
+    'gzip': lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+    'br': (lambda data: brotli.compress(data, quality=11)) if brotli is not None else None
+}
+
+def precompress(path: str) -> dict:
+    """Compressed size per written encoding of one file"""
+    with open(path, 'rb') as handle:
+        data = handle.read()
+    written = {}
+    for encoding, suffix in ENCODINGS:
+        compress = COMPRESSORS.get(encoding)
+        if compress is None:
+            continue
+        compressed = compress(data)
+        if len(compressed) > len(data) * (1 - MIN_SAVING):
+            continue
+        with open(f"{path}{suffix}", 'wb') as handle:
+            handle.write(compressed)
+        # Same mtime as the original so the variant never looks newer than its source
+        stat = os.stat(path)
+        os.utime(f"{path}{suffix}", (stat.st_atime, stat.st_mtime))
+        written[encoding] = len(compressed)
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompress the SPA static files")
+    parser.add_argument('static_dir', nargs='?', default=Config.STATIC_DIR or default_static_dir())
+    parser.add_argument('--require-brotli', action='store_true', help="Fail instead of writing gzip variants only")
+    args = parser.parse_args(argv)
+
+    if brotli is None:
+        if args.require_brotli:
+            raise SystemExit("brotli is not installed (see requirements.txt); cannot write .br variants")
+        logger.warning("brotli is not installed; writing gzip variants only")
+
+    files = original = 0
+    saved = {encoding: 0 for encoding, _ in ENCODINGS}
+    for directory, _, names in os.walk(args.static_dir):
+        for name in names:
+            path = os.path.join(directory, name)
+            if not name.endswith(COMPRESSIBLE) or os.path.getsize(path) < MIN_SIZE:
+                continue
+            written = precompress(path)
+            if written:
+                files += 1
+                size = os.path.getsize(path)
+                original += size
+                for encoding, compressed in written.items():
+                    saved[encoding] += size - compressed
+
+    logger.info(f"Precompressed {files} files ({original} bytes) in {args.static_dir}; bytes saved {saved}")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
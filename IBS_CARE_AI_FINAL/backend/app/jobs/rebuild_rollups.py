@@ -0,0 +1,36 @@
+"""
+Rebuild materialized log rollups from the raw logs.
+
+Usage: python -m app.jobs.rebuild_rollups [user_uid ...]
+Without arguments every user document is processed.
+"""
+
+import argparse
+import logging
+
+from ..firebase_init import db
+from ..rollups import rebuild_user_rollups
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild weekly/monthly log rollups")
+    parser.add_argument('user_uids', nargs='*', help="Users to rebuild (default: all users)")
+    args = parser.parse_args(argv)
+
+    user_uids = args.user_uids or (doc.id for doc in db.collection('users').list_documents())
+
+    rebuilt = failed = 0
+    for user_uid in user_uids:
+        try:
+            rebuild_user_rollups(user_uid)
+            rebuilt += 1
+        except Exception as e:
+            failed += 1
+            logger.error(f"Failed to rebuild rollups for user {user_uid}: {e}")
+
+    logger.info(f"Rollup rebuild finished: {rebuilt} users rebuilt, {failed} failed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,38 @@
+"""
+Recompute flare detector state from the raw logs.
+
+Usage: python -m app.jobs.replay_flare_state [user_uid ...]
+Without arguments every user document is processed.
+"""
+
+import argparse
+import logging
+
+from ..firebase_init import db
+from ..flare_detector import replay_user
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay flare detector state from logs")
+    parser.add_argument('user_uids', nargs='*', help="Users to replay (default: all users)")
+    args = parser.parse_args(argv)
+
+    user_uids = args.user_uids or (doc.id for doc in db.collection('users').list_documents())
+
+    replayed = flaring = failed = 0
+    for user_uid in user_uids:
+        try:
+            state = replay_user(user_uid)
+            replayed += 1
+            if state and state.get('flare'):
+                flaring += 1
+        except Exception as e:
+            failed += 1
+            logger.error(f"Failed to replay flare state for user {user_uid}: {e}")
+
+    logger.info(f"Flare state replay finished: {replayed} users replayed ({flaring} flaring), {failed} failed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
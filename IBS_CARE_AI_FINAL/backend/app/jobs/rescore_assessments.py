@@ -0,0 +1,201 @@
+"""
+Re-score stored assessments after the scoring table changes.
+
+Usage: python -m app.jobs.rescore_assessments [--report diff.jsonl] [--page-size N]
+       python -m app.jobs.rescore_assessments --apply [--max-writes-per-second N]
+                                              [--checkpoint PATH] [--restart]
+
+Users are paged by document id. Each page's ``assessments/latest`` documents
+are read with one get_all while the previous page is being scored, and the
+whole page is re-scored with one matrix operation. Without ``--apply`` this is
+a dry run that only reports what would change. With ``--apply`` only the
+documents whose result differs are written, in 500-write batches at a
+bounded rate, and the last finished user is checkpointed so an interrupted
+run resumes where it stopped.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from ..assessment_scoring import SCORING_SIGNATURE, SUBTYPE_DETAILS, get_next_steps, scoring_engine
+from ..change_feed import change_write
+from ..firebase_init import db, commit_grouped
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500
+# Firestore's guidance for a new write load is to start at 500 operations per second
+MAX_WRITES_PER_SECOND = 500
+DEFAULT_CHECKPOINT = 'rescore_assessments.checkpoint.json'
+
+class RateLimiter:
+    """Spaces out batches so the average write rate stays under a limit"""
+
+    def __init__(self, per_second: float):
+        self.per_second = per_second
+        self._next = time.monotonic()
+
+    def acquire(self, operations: int):
+        if self.per_second <= 0:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+        self._next = max(now, self._next) + operations / self.per_second
+
+def read_page(after: Optional[str], page_size: int) -> Tuple[List[tuple], Optional[str]]:
+    """([(uid, user ibs_type, stored assessment or None)], last uid) of the next page of users"""
+    query = db.collection('users').order_by('__name__').select(['ibs_type']).limit(page_size)
+    if after:
+        query = query.start_after({'__name__': after})
+    users = list(query.stream())
+    if not users:
+        return [], None
+
+    refs = [db.collection('users').document(user.id).collection('assessments').document('latest') for user in users]
+    snapshots = {snapshot.reference.path: snapshot for snapshot in db.get_all(refs, field_paths=['answers', 'classification'])}
+    rows = []
+    for user, ref in zip(users, refs):
+        snapshot = snapshots.get(ref.path)
+        assessment = snapshot.to_dict() if snapshot is not None and snapshot.exists else None
+        rows.append((user.id, (user.to_dict() or {}).get('ibs_type'), assessment))
+    return rows, users[-1].id
+
+def diff_page(rows: List[tuple]) -> List[dict]:
+    """Re-score every stored assessment of a page and keep the ones whose result differs"""
+    scored = [(user_uid, ibs_type, assessment) for user_uid, ibs_type, assessment in rows
+              if assessment and isinstance(assessment.get('answers'), list)]
+    answer_sets = [
+        {answer.get('question_id'): answer.get('answer') for answer in assessment['answers'] if isinstance(answer, dict)}
+        for _, _, assessment in scored
+    ]
+
+    diffs = []
+    for (user_uid, user_type, assessment), result in zip(scored, scoring_engine.classify_many(answer_sets)):
+        classification = {
+            'ibs_type': result['ibs_type'],
+            'confidence': result['confidence'],
+            **SUBTYPE_DETAILS[result['ibs_type']]
+        }
+        stored = assessment.get('classification') or {}
+        assessment_changed = stored != classification
+        user_changed = user_type != result['ibs_type']
+        if assessment_changed or user_changed:
+            diffs.append({
+                'uid': user_uid,
+                'old_type': stored.get('ibs_type'),
+                'new_type': result['ibs_type'],
+                'old_confidence': stored.get('confidence'),
+                'new_confidence': result['confidence'],
+                'user_type': user_type,
+                'assessment_changed': assessment_changed,
+                'user_changed': user_changed,
+                'classification': classification
+            })
+    return diffs
+
+def diff_writes(diff: dict, now: str) -> List[tuple]:
+    """The merge-writes applying one diff, kept together in one batch"""
+    user_ref = db.collection('users').document(diff['uid'])
+    writes = []
+    if diff['assessment_changed']:
+        writes.append((user_ref.collection('assessments').document('latest'), {
+            'classification': diff['classification'],
+            'next_steps': get_next_steps(diff['new_type']),
+            'scoring_signature': SCORING_SIGNATURE,
+            'updatedAt': now
+        }))
+        writes.append(change_write(diff['uid'], 'assessment', 'latest', now))
+    if diff['user_changed']:
+        writes.append((user_ref, {'ibs_type': diff['new_type']}))
+    return writes
+
+def load_checkpoint(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as handle:
+        checkpoint = json.load(handle)
+    if checkpoint.get('signature') != SCORING_SIGNATURE:
+        logger.warning(f"Ignoring checkpoint {path} written for other scoring rules")
+        return {}
+    return checkpoint
+
+def save_checkpoint(path: str, last_uid: str, stats: Counter):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump({'signature': SCORING_SIGNATURE, 'last_uid': last_uid, 'stats': dict(stats)}, handle)
+    os.replace(tmp_path, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score stored assessments with the current scoring table")
+    parser.add_argument('--apply', action='store_true', help="Write the changes (default: dry run)")
+    parser.add_argument('--report', help="Write one JSON line per changed user to this file")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help="Users read per page")
+    parser.add_argument('--max-writes-per-second', type=float, default=MAX_WRITES_PER_SECOND,
+                        help="Write rate limit (0 disables it)")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="Resume file used with --apply")
+    parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    checkpoint = {} if args.restart or not args.apply else load_checkpoint(args.checkpoint)
+    after = checkpoint.get('last_uid')
+    stats = Counter(checkpoint.get('stats', {}))
+    if after:
+        logger.info(f"Resuming after user {after} ({stats['users']} users already processed)")
+
+    limiter = RateLimiter(args.max_writes_per_second)
+    report = open(args.report, 'a' if after else 'w', encoding='utf-8') if args.report else None
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            page = reader.submit(read_page, after, args.page_size)
+            while True:
+                rows, last_uid = page.result()
+                if not rows:
+                    break
+                # Read the next page while this one is scored and written
+                page = reader.submit(read_page, last_uid, args.page_size)
+
+                diffs = diff_page(rows)
+                stats['users'] += len(rows)
+                stats['assessments'] += sum(1 for _, _, assessment in rows if assessment)
+                stats['changed'] += len(diffs)
+                for diff in diffs:
+                    stats[f"{diff['old_type']}->{diff['new_type']}"] += 1
+                    if report:
+                        report.write(json.dumps({key: value for key, value in diff.items() if key != 'classification'}) + '\n')
+
+                if args.apply and diffs:
+                    now = datetime.now().isoformat()
+                    groups = [diff_writes(diff, now) for diff in diffs]
+                    operations = sum(len(group) for group in groups)
+                    limiter.acquire(operations)
+                    commit_grouped(groups)
+                    stats['writes'] += operations
+                if args.apply:
+                    save_checkpoint(args.checkpoint, last_uid, stats)
+
+                logger.info(f"Processed {stats['users']} users, {stats['changed']} changed "
+                            f"({stats['users'] / max(time.monotonic() - started, 1e-9):.0f} users/s)")
+    finally:
+        if report:
+            report.close()
+
+    transitions = {key: count for key, count in stats.items() if '->' in key}
+    logger.info(f"Assessment re-scoring {'finished' if args.apply else 'dry run finished'} with rules {SCORING_SIGNATURE}: "
+                f"{stats['users']} users, {stats['assessments']} assessments, {stats['changed']} changed, "
+                f"{stats['writes']} writes; transitions {transitions}")
+    if args.apply and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    return stats
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
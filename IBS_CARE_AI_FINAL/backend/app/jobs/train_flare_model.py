@@ -0,0 +1,88 @@
+"""
+Nightly training of the flare-risk model.
+
+Usage: python -m app.jobs.train_flare_model [--workers N] [user_uid ...]
+
+The global model is fitted in this process over every user's examples, then
+personal weights are fine-tuned in a process pool. app.benchmarks.flare_training
+times the same fits on generated users without Firestore.
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+
+from ..firebase_init import db, commit_batch, MAX_BATCH_WRITES
+from ..flare_model import FEATURE_NAMES, MODEL_TRIGGERS, build_dataset, global_model_ref, model_document, user_model_ref
+from ..flare_training import fine_tune_all, fit_global
+
+logger = logging.getLogger(__name__)
+
+def load_user_datasets(user_uids):
+    """Yield (uid, X, y) built from each user's logs"""
+    for user_uid in user_uids:
+        try:
+            logs = [
+                doc.to_dict() for doc in
+                db.collection('users').document(user_uid).collection('logs')
+                .select(['dateISO', 'mood', 'pain_level', 'triggers', 'meals'])
+                .stream()
+            ]
+            X, y = build_dataset(logs)
+            if len(y):
+                yield user_uid, X, y
+        except Exception as e:
+            logger.error(f"Failed to load logs for user {user_uid}: {e}")
+
+def save_models(global_weights: np.ndarray, datasets, personal) -> int:
+    total_samples = sum(len(y) for _, _, y in datasets)
+    global_model_ref().set(model_document(
+        global_weights, total_samples, users=len(datasets),
+        features=FEATURE_NAMES, triggers=MODEL_TRIGGERS
+    ))
+
+    writes = [
+        (user_model_ref(user_uid), model_document(weights, samples))
+        for user_uid, weights, samples in personal
+    ]
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        commit_batch(writes[start:start + MAX_BATCH_WRITES], merge=False)
+    return len(writes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the global and personal flare-risk models")
+    parser.add_argument('user_uids', nargs='*', help="Users to train on (default: all users)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes for personal fine-tuning")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    user_uids = args.user_uids or [doc.id for doc in db.collection('users').list_documents()]
+    datasets = list(load_user_datasets(user_uids))
+    loaded = time.perf_counter()
+
+    if not datasets:
+        logger.info("No training examples found")
+        return
+
+    global_weights = fit_global(datasets)
+    fitted = time.perf_counter()
+    personal = fine_tune_all(datasets, global_weights, args.workers)
+    tuned = time.perf_counter()
+
+    saved = save_models(global_weights, datasets, personal)
+    logger.info(f"Saved global model and {saved} personal models")
+
+    examples = sum(len(y) for _, _, y in datasets)
+    logger.info(
+        f"Flare model training finished: {len(datasets)} users, {examples} examples; "
+        f"load {loaded - started:.1f}s, global fit {fitted - loaded:.1f}s, "
+        f"personal fits {tuned - fitted:.1f}s on {args.workers} workers "
+        f"({len(personal) / max(tuned - fitted, 1e-9):.0f} users/s)"
+    )
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
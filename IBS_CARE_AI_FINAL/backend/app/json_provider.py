@@ -0,0 +1,70 @@
+"""
+JSON encoding for the Flask app.
+
+``make_json_provider`` picks the provider named by ``Config.JSON_PROVIDER``:
+``orjson`` (the default when the package is installed) or Flask's stdlib
+``json`` provider. The orjson provider keeps Flask's output conventions (sorted
+keys, compact outside debug, HTTP dates for datetimes, ``default`` for other
+types) so responses only change in speed. Pydantic list responses can skip
+the provider entirely: ``model_json_response`` serializes validated models
+straight to bytes with a ``TypeAdapter``.
+"""
+
+import logging
+from typing import Any
+
+from flask import Response, current_app
+from flask.json.provider import DefaultJSONProvider
+from pydantic import TypeAdapter
+
+from .config import Config
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib provider is used instead
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding"""
+
+    def _options(self, indent: bool = False) -> int:
+        # Datetimes go through Flask's default (HTTP dates) instead of orjson's ISO format
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumpb(self, obj: Any, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, default=self.default, option=self._options(indent))
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            # json.dumps arguments (cls, separators, ...) have no orjson equivalent
+            return super().dumps(obj, **kwargs)
+        return self.dumpb(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumpb(obj, indent) + b'\n', mimetype=self.mimetype)
+
+def make_json_provider(app) -> DefaultJSONProvider:
+    """The provider selected by Config.JSON_PROVIDER, falling back to stdlib json"""
+    if Config.JSON_PROVIDER == 'orjson':
+        if orjson is not None:
+            return OrjsonProvider(app)
+        logger.warning("JSON_PROVIDER is orjson but orjson is not installed; using the stdlib json provider")
+    return DefaultJSONProvider(app)
+
+def model_json_response(adapter: TypeAdapter, value: Any, status: int = 200) -> Response:
+    """Response of already validated pydantic data dumped by its TypeAdapter, without intermediate dicts"""
+    return current_app.response_class(adapter.dump_json(value) + b'\n', status=status, mimetype=current_app.json.mimetype)
@@ -0,0 +1,316 @@
+"""
+Curated IBS knowledge base with a local retrieval index.
+
+Snippets are indexed as hashed TF-IDF vectors in a NumPy matrix when the
+module is imported (a few milliseconds for the bundled set), and each chat
+turn gets the top-k snippets by cosine similarity so replies stay grounded
+without sending the whole guidance text on every call.
+"""
+
+import logging
+import math
+import time
+import zlib
+from typing import List
+
+import numpy as np
+
+from .search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+HASH_DIMENSIONS = 4096
+TOP_K = 3
+MIN_SIMILARITY = 0.08
+
+KNOWLEDGE_BASE = [
+    {
+        'id': 'fodmap-overview',
+        'tags': 'fodmap diet low-fodmap elimination what to eat',
+        'title': 'What the low-FODMAP diet is',
+        'text': "FODMAPs are fermentable carbohydrates (fructans, GOS, lactose, excess fructose and polyols) that draw "
+                "water into the gut and are fermented by bacteria, causing bloating, pain and altered bowel habits in IBS. "
+                "The low-FODMAP diet has three phases: 2-6 weeks of elimination, then reintroducing one FODMAP group at a "
+                "time over about 3 days each, then a long-term personalised diet that only limits the groups that cause symptoms."
+    },
+    {
+        'id': 'fodmap-reintroduction',
+        'tags': 'reintroduce reintroduction challenge test foods again',
+        'title': 'Reintroducing FODMAP groups',
+        'text': "Reintroduce one FODMAP group at a time while otherwise staying low-FODMAP: e.g. honey or mango for fructose, "
+                "milk or yogurt for lactose, bread or garlic for fructans, lentils for GOS, avocado or mushrooms for polyols. "
+                "Increase the portion over three days, then wait 2-3 symptom-free days before the next group. Logging meals and "
+                "symptoms daily makes the results clear."
+    },
+    {
+        'id': 'low-fodmap-fruit',
+        'tags': 'fruit fruits banana apple snack',
+        'title': 'Fruit choices',
+        'text': "Lower-FODMAP fruits in normal servings: firm banana, blueberries, strawberries, kiwi, orange, mandarin, grapes, "
+                "pineapple, papaya, raspberries. High-FODMAP fruits: apple, pear, mango, watermelon, cherries, peaches, plums, "
+                "dried fruit and fruit juice. Spread fruit across the day, about one serving per meal."
+    },
+    {
+        'id': 'low-fodmap-vegetables',
+        'tags': 'vegetables veggies salad onion garlic',
+        'title': 'Vegetable choices',
+        'text': "Lower-FODMAP vegetables: carrot, zucchini, spinach, kale, lettuce, cucumber, tomato, potato, eggplant, bell pepper, "
+                "green beans, bok choy. High-FODMAP vegetables: onion, garlic, leek bulb, asparagus, artichoke, cauliflower, "
+                "mushrooms, snow peas. Spring onion greens and chives give onion flavour without the fructans."
+    },
+    {
+        'id': 'onion-garlic',
+        'tags': 'onion garlic cook cooking recipe flavour substitute instead',
+        'title': 'Cooking without onion and garlic',
+        'text': "Onion and garlic are among the most common IBS triggers because of their fructans, even in small amounts in "
+                "sauces, stocks and spice mixes. Garlic-infused oil is low-FODMAP because fructans are not oil soluble; use the "
+                "green part of spring onions or leek, chives, asafoetida, ginger and fresh herbs for flavour."
+    },
+    {
+        'id': 'grains-gluten',
+        'tags': 'bread pasta wheat gluten pizza cereal coeliac celiac',
+        'title': 'Wheat, gluten and grains',
+        'text': "In IBS it is usually the fructans in wheat, rye and barley that cause symptoms rather than gluten itself, so "
+                "sourdough spelt bread or small portions may be tolerated. Lower-FODMAP grains: rice, oats, quinoa, corn, "
+                "buckwheat, millet, gluten-free pasta and bread. Coeliac disease should be ruled out by a doctor before cutting "
+                "gluten, because testing needs gluten in the diet."
+    },
+    {
+        'id': 'dairy-lactose',
+        'tags': 'milk cheese yogurt lactose dairy oat almond soy latte ice cream',
+        'title': 'Dairy and lactose',
+        'text': "Lactose is the FODMAP in dairy. Lactose-free milk and yogurt, hard cheeses (cheddar, parmesan, swiss), brie and "
+                "feta are low in lactose. Soft cheeses, regular milk, ice cream and cream are higher. Plant milks: almond and "
+                "rice milk are low-FODMAP; oat milk is fine in small servings (about 100 ml); soy milk made from whole soybeans "
+                "is high-FODMAP while soy-protein milk is low."
+    },
+    {
+        'id': 'legumes',
+        'tags': 'beans lentils chickpeas hummus tofu protein vegetarian',
+        'title': 'Beans and lentils',
+        'text': "Beans, chickpeas and lentils are high in GOS. Canned and well-rinsed lentils or chickpeas are lower in FODMAPs "
+                "and often tolerated in small servings (about a quarter cup). Firm tofu and tempeh are low-FODMAP protein sources."
+    },
+    {
+        'id': 'sweeteners',
+        'tags': 'sugar-free gum sweetener honey sugar diet soda',
+        'title': 'Sweeteners and polyols',
+        'text': "Polyol sweeteners (sorbitol, mannitol, xylitol, maltitol, isomalt) in sugar-free gum, mints and diet products "
+                "commonly cause bloating and diarrhoea. Honey, agave and high-fructose corn syrup are high in excess fructose. "
+                "Table sugar, maple syrup and rice malt syrup are low-FODMAP in moderate amounts."
+    },
+    {
+        'id': 'ibs-d',
+        'tags': 'diarrhoea diarrhea loose stools urgency runny ibs-d',
+        'title': 'IBS with diarrhoea (IBS-D)',
+        'text': "For IBS-D: eat regular smaller meals, limit caffeine, alcohol, fatty and fried food, spicy food and polyol "
+                "sweeteners, and trial the low-FODMAP diet. Soluble fibre such as psyllium can firm stools. Stay hydrated after "
+                "loose stools. Loperamide can help short term; persistent diarrhoea, night-time diarrhoea or weight loss need a "
+                "doctor's review."
+    },
+    {
+        'id': 'ibs-c',
+        'tags': 'constipation constipated hard stools straining blocked ibs-c',
+        'title': 'IBS with constipation (IBS-C)',
+        'text': "For IBS-C: increase soluble fibre gradually (psyllium, oats, kiwi fruit - two green kiwis a day has good evidence), "
+                "drink 1.5-2 litres of water daily, keep active and keep a regular toilet routine with feet raised on a footstool. "
+                "Insoluble fibre like wheat bran can worsen bloating. Osmotic laxatives such as macrogol are an option to discuss "
+                "with a doctor or pharmacist."
+    },
+    {
+        'id': 'ibs-m',
+        'tags': 'mixed alternating constipation diarrhoea ibs-m ibs-u',
+        'title': 'Mixed IBS (IBS-M) and unsubtyped IBS',
+        'text': "IBS-M alternates between constipation and diarrhoea, so treat the current pattern rather than both at once. "
+                "Soluble fibre (psyllium) helps both ends, the low-FODMAP diet reduces bloating and pain, and a symptom diary "
+                "helps spot which triggers precede each pattern."
+    },
+    {
+        'id': 'fibre',
+        'tags': 'fibre fiber psyllium metamucil oats',
+        'title': 'Fibre',
+        'text': "Soluble fibre (psyllium/ispaghula, oats, chia, linseed) is recommended for IBS and is better tolerated than "
+                "insoluble bran. Start with a small dose such as half a teaspoon of psyllium and increase over 2-3 weeks with "
+                "plenty of water to limit gas."
+    },
+    {
+        'id': 'peppermint-antispasmodic',
+        'tags': 'peppermint medication medicine cramps cramping spasms heat pain relief',
+        'title': 'Peppermint oil and antispasmodics',
+        'text': "Enteric-coated peppermint oil capsules have good evidence for reducing IBS pain and bloating; they can worsen "
+                "heartburn. Antispasmodics such as hyoscine or mebeverine can ease cramping. Applying heat (a hot water bottle) "
+                "also helps abdominal cramps."
+    },
+    {
+        'id': 'gut-brain-stress',
+        'tags': 'stress stressed anxiety anxious work worried nervous mental health hurts',
+        'title': 'Stress and the gut-brain axis',
+        'text': "Stress and anxiety increase gut sensitivity and motility, so flares often follow stressful periods. Gut-directed "
+                "hypnotherapy and cognitive behavioural therapy have strong evidence in IBS. Daily relaxation such as diaphragmatic "
+                "breathing (slow breaths into the belly for 5-10 minutes), yoga or mindfulness can reduce symptom severity."
+    },
+    {
+        'id': 'sleep',
+        'tags': 'sleep tired insomnia night bed',
+        'title': 'Sleep',
+        'text': "Poor sleep is followed by worse abdominal pain and mood the next day in people with IBS. Keep a regular sleep "
+                "schedule, avoid large meals, caffeine and alcohol in the evening, and limit screens before bed."
+    },
+    {
+        'id': 'exercise',
+        'tags': 'exercise walking gym sport yoga workout activity',
+        'title': 'Physical activity',
+        'text': "Regular moderate exercise (20-30 minutes of walking, cycling, swimming or yoga most days) improves IBS symptoms, "
+                "especially constipation and bloating. Very intense exercise can trigger diarrhoea in some people."
+    },
+    {
+        'id': 'caffeine-alcohol',
+        'tags': 'coffee tea caffeine alcohol beer wine drink drinks soda',
+        'title': 'Caffeine, alcohol and fizzy drinks',
+        'text': "Caffeine stimulates the colon and can worsen diarrhoea and urgency; limit coffee to 1-2 cups a day or try "
+                "decaf. Alcohol irritates the gut, especially beer, cider, rum and sweet wines; spirits mixed with low-FODMAP "
+                "mixers are better tolerated. Carbonated drinks add gas and bloating."
+    },
+    {
+        'id': 'fatty-spicy',
+        'tags': 'fatty fried greasy spicy chilli curry fast food burger pizza takeaway',
+        'title': 'Fatty, fried and spicy food',
+        'text': "Large fatty or fried meals strengthen the gut's contractions after eating and commonly trigger pain and "
+                "urgency. Chilli (capsaicin) can cause burning pain and diarrhoea. Smaller portions and grilling or baking instead "
+                "of frying usually help."
+    },
+    {
+        'id': 'meal-habits',
+        'tags': 'meals eating habits skip breakfast portion eat slowly',
+        'title': 'Eating habits',
+        'text': "Eat three meals and small snacks at regular times, do not skip meals, eat slowly and chew well, and avoid very "
+                "large meals. Swallowed air from eating quickly, chewing gum and drinking through straws adds to bloating."
+    },
+    {
+        'id': 'bloating',
+        'tags': 'bloating bloated gas wind swollen distended',
+        'title': 'Bloating and gas',
+        'text': "Bloating is usually caused by fermentation of FODMAPs and gut hypersensitivity. Helpful steps: reduce high-FODMAP "
+                "foods, avoid polyol sweeteners and fizzy drinks, eat slowly, try peppermint tea or capsules, and gentle walking "
+                "after meals. Bloating that is persistent, progressive or comes with weight loss should be checked by a doctor."
+    },
+    {
+        'id': 'probiotics',
+        'tags': 'probiotics probiotic supplement kefir yogurt gut bacteria',
+        'title': 'Probiotics',
+        'text': "Evidence for probiotics in IBS is mixed and strain specific. If trying one, take a single product daily for at "
+                "least 4 weeks and stop if there is no benefit. Fermented foods like kefir and kombucha can be high-FODMAP."
+    },
+    {
+        'id': 'food-diary',
+        'tags': 'diary log tracking track patterns triggers',
+        'title': 'Using a symptom diary',
+        'text': "Recording meals, triggers, stress, sleep, mood and pain every day reveals patterns that are hard to notice "
+                "otherwise, since symptoms can follow a trigger by several hours up to two days. Review patterns over at least "
+                "2-4 weeks before drawing conclusions."
+    },
+    {
+        'id': 'menstrual-cycle',
+        'tags': 'period menstrual cycle hormones pms',
+        'title': 'Menstrual cycle',
+        'text': "Many women with IBS have worse pain, bloating and diarrhoea just before and during their period due to hormone "
+                "changes. Tracking the cycle alongside symptoms helps plan a gentler diet and heat or antispasmodics for those days."
+    },
+    {
+        'id': 'travel',
+        'tags': 'travel holiday vacation restaurant eating out trip',
+        'title': 'Travel and eating out',
+        'text': "Travel disrupts routine, sleep and meals. Keep regular meal times, carry safe snacks, stay hydrated, ask for "
+                "sauces on the side and dishes without onion and garlic, and choose simple meals like grilled protein with rice "
+                "or potato."
+    },
+    {
+        'id': 'red-flags',
+        'tags': 'blood bleeding black stool weight loss fever vomiting severe pain emergency doctor',
+        'title': 'Red-flag symptoms needing medical care',
+        'text': "Symptoms that are not typical of IBS and need prompt medical review: blood in the stool or black stools, "
+                "unintended weight loss, fever, persistent vomiting, severe or worsening pain, symptoms that wake you at night, "
+                "new symptoms after age 50, anaemia, or a family history of bowel cancer, coeliac disease or inflammatory bowel "
+                "disease. Severe pain with a rigid abdomen, fainting or heavy bleeding is an emergency."
+    },
+    {
+        'id': 'flare-management',
+        'tags': 'flare flare-up bad day attack pain now relief what to eat',
+        'title': 'Managing a flare-up',
+        'text': "During a flare: eat small plain low-FODMAP meals (rice, potato, eggs, chicken, carrots, banana), sip water or "
+                "peppermint or ginger tea, use a heat pad for cramps, rest and do gentle breathing exercises. Note what was eaten "
+                "and any stress in the previous 1-2 days to find the trigger."
+    },
+    {
+        'id': 'hydration',
+        'tags': 'water hydration dehydrated drink fluids',
+        'title': 'Hydration',
+        'text': "Aim for about 1.5-2 litres of fluid a day, mainly water or herbal tea. Fluid is especially important with "
+                "diarrhoea and when increasing fibre for constipation. Oral rehydration solution helps after heavy diarrhoea."
+    },
+]
+
+# Conversational words that carry no topic on top of the search stopwords
+QUERY_STOPWORDS = {
+    'about', 'after', 'also', 'any', 'can', 'could', 'did', 'do', 'does', 'feel', 'feeling', 'get', 'got', 'how',
+    'im', 'just', 'like', 'much', 'not', 'should', 'some', 'what', 'when', 'which', 'why', 'will', 'would'
+}
+_SUFFIXES = ('ation', 'ated', 'ing', 'ed', 'es', 'ly', 's')
+
+def _stem(token: str) -> str:
+    """Crude repeated suffix stripping so 'stressed' and 'stress' or 'constipated' and 'constipation' share a term"""
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+                token, stripped = token[:-len(suffix)], True
+                break
+    return token
+
+def _hashed_counts(text: str) -> dict:
+    """Bucket -> count of the text's unigrams and bigrams, with a stable hash"""
+    tokens = [_stem(token) for token in tokenize(text) if token not in QUERY_STOPWORDS]
+    terms = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    counts = {}
+    for term in terms:
+        bucket = zlib.crc32(term.encode()) % HASH_DIMENSIONS
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+class KnowledgeIndex:
+    """TF-IDF matrix over the knowledge base with cosine-similarity lookup"""
+
+    def __init__(self, snippets: List[dict]):
+        started = time.perf_counter()
+        self.snippets = snippets
+        counts = np.zeros((len(snippets), HASH_DIMENSIONS), dtype=np.float32)
+        for row, snippet in enumerate(snippets):
+            for bucket, count in _hashed_counts(f"{snippet['title']} {snippet['tags']} {snippet['text']}").items():
+                counts[row, bucket] = count
+
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = np.log((1 + len(snippets)) / (1 + document_frequency)).astype(np.float32) + 1
+        tf = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0)
+        self.matrix = self._normalize(tf * self.idf)
+        self.build_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Knowledge index built with {len(snippets)} snippets in {self.build_ms:.1f} ms")
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def vectorize(self, text: str) -> np.ndarray:
+        vector = np.zeros(HASH_DIMENSIONS, dtype=np.float32)
+        for bucket, count in _hashed_counts(text).items():
+            vector[bucket] = (1 + math.log(count)) * self.idf[bucket]
+        return self._normalize(vector)
+
+    def search(self, query: str, k: int = TOP_K, min_similarity: float = MIN_SIMILARITY) -> List[dict]:
+        """Top-k snippets most similar to the query, best first"""
+        scores = self.matrix @ self.vectorize(query)
+        best = np.argsort(-scores)[:k]
+        return [{**self.snippets[row], 'score': round(float(scores[row]), 3)} for row in best if scores[row] >= min_similarity]
+
+knowledge_index = KnowledgeIndex(KNOWLEDGE_BASE)
@@ -0,0 +1,123 @@
+"""
+Retrieval of the past logs that are relevant to a chat message.
+
+Candidates come from the full-text index (notes, triggers, meal items), the
+food index (foods and food groups named in the message) and the last few days.
+They are ranked, formatted as one line per day and cut at a token budget, and
+the result is cached per user, query signature and day (recency is part of the
+ranking) until a log is written or its search postings move.
+"""
+
+import hashlib
+import logging
+import math
+from datetime import date
+from typing import Dict, List
+
+from .cache import VersionedCache
+from .config import Config
+from .firebase_init import db
+from .food_index import FOOD_CATEGORIES, foods_matching, load_food_index
+from .search_index import index_version, match_counts, parse_key, tokenize
+from .timeseries_cache import latest_log_version
+
+logger = logging.getLogger(__name__)
+
+RECENT_DAYS = 3
+MAX_CANDIDATES = 30
+# Rough tokens per character for budgeting prompt text
+TOKENS_PER_CHAR = 0.25
+GREETINGS = {'hi', 'hey', 'hello', 'hiya', 'morning', 'evening', 'thanks', 'thank', 'ok', 'okay', 'bye', 'good'}
+
+retrieval_cache = VersionedCache(Config.ANALYTICS_CACHE_USERS * 4)
+
+def query_terms(message: str) -> List[str]:
+    return sorted({token for token in tokenize(message) if token not in GREETINGS})
+
+def query_signature(terms: List[str]) -> str:
+    return hashlib.sha1(' '.join(terms).encode()).hexdigest()[:16]
+
+def _food_matches(user_uid: str, terms: List[str]) -> Dict[str, int]:
+    """Log id -> number of matched foods, for foods or food groups named in the message"""
+    index = load_food_index(user_uid)
+    phrases = terms + [f"{first} {second}" for first, second in zip(terms, terms[1:])]
+    matched = set()
+    for phrase in phrases:
+        if phrase in FOOD_CATEGORIES or len(phrase) >= 3:
+            matched.update(foods_matching(index, phrase))
+
+    log_ids = {}
+    for food in matched:
+        for occurrence in index[food]:
+            log_id = occurrence.partition('|')[0]
+            log_ids[log_id] = log_ids.get(log_id, 0) + 1
+    return log_ids
+
+def rank_log_ids(user_uid: str, terms: List[str], today: date = None) -> List[str]:
+    """Log ids (dateISO) ranked by keyword matches, food matches and recency"""
+    today = today or date.today()
+    scores: Dict[str, float] = {}
+
+    if terms:
+        for key, count in match_counts(user_uid, terms, kind='log').items():
+            log_id = parse_key(key)[2]
+            scores[log_id] = scores.get(log_id, 0) + 2 * count
+        for log_id, count in _food_matches(user_uid, terms).items():
+            scores[log_id] = scores.get(log_id, 0) + 2 * min(count, 2)
+
+    for offset in range(RECENT_DAYS):
+        day = date.fromordinal(today.toordinal() - offset).isoformat()
+        scores[day] = scores.get(day, 0) + 1
+
+    # Ties go to the most recent day; older matches decay slowly
+    def rank(log_id: str) -> tuple:
+        day = date.fromisoformat(log_id[:10])
+        age = max(0, (today - day).days)
+        return (-(scores[log_id] + math.exp(-age / 30)), -day.toordinal())
+
+    return sorted(scores, key=rank)[:MAX_CANDIDATES]
+
+def format_log(log: dict) -> str:
+    parts = [f"{log['dateISO'][:10]}: pain {log.get('pain_level')}/10, mood {log.get('mood')}/10"]
+    if log.get('triggers'):
+        parts.append(f"triggers: {', '.join(log['triggers'])}")
+    items = [item for meal in log.get('meals') or [] for item in meal.get('items') or []]
+    if items:
+        parts.append(f"ate: {', '.join(items)}")
+    if log.get('notes'):
+        parts.append(f"notes: {log['notes']}")
+    return '; '.join(parts)
+
+def retrieve_logs(user_uid: str, message: str, max_tokens: int = None) -> List[str]:
+    """Formatted lines for the logs worth showing the model for this message, within a token budget"""
+    max_tokens = max_tokens or Config.LOG_CONTEXT_TOKENS
+    terms = query_terms(message)
+    today = date.today()
+    cache_key = f"{user_uid}|{query_signature(terms)}|{max_tokens}|{today.isoformat()}"
+    # Postings are committed after the log, so the log version alone could
+    # cache a ranking that is missing the newest log's keyword matches
+    version = f"{latest_log_version(user_uid)}|{index_version(user_uid, 'log')}"
+    cached = retrieval_cache.get(cache_key, version)
+    if cached is not None:
+        return cached
+
+    log_ids = rank_log_ids(user_uid, terms, today)
+    logs_ref = db.collection('users').document(user_uid).collection('logs')
+    snapshots = {snapshot.id: snapshot for snapshot in db.get_all([logs_ref.document(log_id) for log_id in log_ids])} if log_ids else {}
+
+    selected, budget = [], max_tokens
+    for log_id in log_ids:
+        snapshot = snapshots.get(log_id)
+        if snapshot is None or not snapshot.exists:
+            continue
+        line = format_log(snapshot.to_dict())
+        cost = math.ceil(len(line) * TOKENS_PER_CHAR)
+        if cost > budget:
+            break
+        selected.append((log_id, line))
+        budget -= cost
+
+    # Best matches are chosen first, then shown newest first
+    lines = [line for _, line in sorted(selected, reverse=True)]
+    retrieval_cache.put(cache_key, version, lines)
+    return lines
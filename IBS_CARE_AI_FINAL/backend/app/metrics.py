@@ -0,0 +1,270 @@
+"""
+Prometheus metrics, exposed at /metrics.
+
+Recorded series:
+- ``http_request_duration_seconds{method, route, status}`` per Flask URL rule
+- ``firestore_operation_duration_seconds{op, collection}`` and
+  ``firestore_documents_total{op, collection}`` for document gets, get_all,
+  queries and batch commits
+- ``llm_request_duration_seconds{provider, outcome}``,
+  ``llm_requests_total{provider, attempt, outcome}`` (attempt is ``primary``
+  or ``fallback``) and ``llm_tokens_total{provider}``
+- ``chat_route_duration_seconds{tier, target}``, ``chat_route_tokens_total{tier, target}``
+  and ``chat_route_cost_usd_total{tier, target}`` for model routing decisions
+- ``unit_of_work_commits_total{endpoint, outcome}``, ``unit_of_work_round_trips_total{endpoint}``
+  and ``unit_of_work_writes_total{endpoint}`` for the batched writes of @atomic views
+- ``reminder_tick_duration_seconds`` and ``reminder_users_scanned_total``
+- ``email_send_duration_seconds{kind}`` and ``email_sends_total{kind, outcome}``
+
+Under gunicorn every worker is a separate process, so gunicorn.conf.py points
+PROMETHEUS_MULTIPROC_DIR at a directory shared by the workers and the endpoint
+aggregates every worker's files. Other processes, such as the jobs, record
+into this process's registry only. ``prometheus_client`` is
+optional: without it every recording call is a no-op and /metrics is not added.
+"""
+
+import logging
+import os
+import time
+from collections import Counter as Tally
+from functools import wraps
+
+from flask import Response, g, jsonify, request
+
+from .config import Config
+
+# Multiprocess values are files created as soon as a metric is defined
+if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+try:
+    import prometheus_client
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+except ImportError:  # optional: metrics are simply not recorded
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+FIRESTORE_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+LLM_BUCKETS = (.1, .25, .5, 1, 2, 4, 8, 16, 32, 64)
+# Template replies take well under a millisecond, model turns seconds
+CHAT_ROUTE_BUCKETS = (.001, .01, .05) + LLM_BUCKETS
+REMINDER_TICK_BUCKETS = (.05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120)
+
+class _NoopMetric:
+    """Stand-in with the prometheus_client recording API when the package is missing"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, amount):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+if prometheus_client is not None:
+    HTTP_REQUEST_DURATION = Histogram(
+        'http_request_duration_seconds', 'Flask request latency', ['method', 'route', 'status']
+    )
+    FIRESTORE_OPERATION_DURATION = Histogram(
+        'firestore_operation_duration_seconds', 'Firestore call latency (streams: until exhausted)',
+        ['op', 'collection'], buckets=FIRESTORE_BUCKETS
+    )
+    FIRESTORE_DOCUMENTS = Counter(
+        'firestore_documents_total', 'Documents read or written', ['op', 'collection']
+    )
+    LLM_REQUEST_DURATION = Histogram(
+        'llm_request_duration_seconds', 'Chat model call latency', ['provider', 'outcome'], buckets=LLM_BUCKETS
+    )
+    LLM_REQUESTS = Counter(
+        'llm_requests_total', 'Chat model calls', ['provider', 'attempt', 'outcome']
+    )
+    LLM_TOKENS = Counter('llm_tokens_total', 'Estimated chat model tokens', ['provider'])
+    CHAT_ROUTE_DURATION = Histogram(
+        'chat_route_duration_seconds', 'Chat turn latency per routing decision', ['tier', 'target'],
+        buckets=CHAT_ROUTE_BUCKETS
+    )
+    CHAT_ROUTE_TOKENS = Counter('chat_route_tokens_total', 'Estimated tokens per routing decision', ['tier', 'target'])
+    CHAT_ROUTE_COST = Counter('chat_route_cost_usd_total', 'Estimated USD cost per routing decision', ['tier', 'target'])
+    UNIT_OF_WORK_COMMITS = Counter(
+        'unit_of_work_commits_total', 'Requests whose queued writes were committed', ['endpoint', 'outcome']
+    )
+    UNIT_OF_WORK_ROUND_TRIPS = Counter('unit_of_work_round_trips_total', 'Write batches committed', ['endpoint'])
+    UNIT_OF_WORK_WRITES = Counter('unit_of_work_writes_total', 'Write operations committed', ['endpoint'])
+    REMINDER_TICK_DURATION = Histogram(
+        'reminder_tick_duration_seconds', 'Duration of one reminder loop pass', buckets=REMINDER_TICK_BUCKETS
+    )
+    REMINDER_USERS_SCANNED = Counter('reminder_users_scanned_total', 'Users checked by the reminder loop')
+    EMAIL_SEND_DURATION = Histogram('email_send_duration_seconds', 'SMTP send latency', ['kind'])
+    EMAIL_SENDS = Counter('email_sends_total', 'Emails sent', ['kind', 'outcome'])
+else:
+    HTTP_REQUEST_DURATION = FIRESTORE_OPERATION_DURATION = FIRESTORE_DOCUMENTS = _NoopMetric()
+    LLM_REQUEST_DURATION = LLM_REQUESTS = LLM_TOKENS = _NoopMetric()
+    CHAT_ROUTE_DURATION = CHAT_ROUTE_TOKENS = CHAT_ROUTE_COST = _NoopMetric()
+    UNIT_OF_WORK_COMMITS = UNIT_OF_WORK_ROUND_TRIPS = UNIT_OF_WORK_WRITES = _NoopMetric()
+    REMINDER_TICK_DURATION = REMINDER_USERS_SCANNED = EMAIL_SEND_DURATION = EMAIL_SENDS = _NoopMetric()
+
+def record_llm_call(provider: str, seconds: float, ok: bool, fallback: bool, tokens: int = 0):
+    """One chat model attempt; ``fallback`` when an earlier provider already failed"""
+    outcome = 'ok' if ok else 'error'
+    LLM_REQUEST_DURATION.labels(provider, outcome).observe(seconds)
+    LLM_REQUESTS.labels(provider, 'fallback' if fallback else 'primary', outcome).inc()
+    if tokens:
+        LLM_TOKENS.labels(provider).inc(tokens)
+
+def record_chat_route(tier: str, target: str, seconds: float, tokens: int, cost_usd: float):
+    """One chat turn answered by the routed target (a template or the model that replied)"""
+    CHAT_ROUTE_DURATION.labels(tier, target).observe(seconds)
+    if tokens:
+        CHAT_ROUTE_TOKENS.labels(tier, target).inc(tokens)
+    if cost_usd:
+        CHAT_ROUTE_COST.labels(tier, target).inc(cost_usd)
+
+def record_unit_of_work(endpoint: str, round_trips: int, operations: int, failed: bool = False):
+    """One request's commit; round trips per request is round_trips_total / commits_total"""
+    UNIT_OF_WORK_COMMITS.labels(endpoint, 'error' if failed else 'ok').inc()
+    UNIT_OF_WORK_ROUND_TRIPS.labels(endpoint).inc(round_trips)
+    UNIT_OF_WORK_WRITES.labels(endpoint).inc(operations)
+
+def record_reminder_tick(seconds: float, users_scanned: int):
+    REMINDER_TICK_DURATION.observe(seconds)
+    REMINDER_USERS_SCANNED.inc(users_scanned)
+
+def record_email(kind: str, seconds: float, ok: bool):
+    EMAIL_SEND_DURATION.labels(kind).observe(seconds)
+    EMAIL_SENDS.labels(kind, 'ok' if ok else 'error').inc()
+
+def _record_firestore(op: str, collection: str, started: float, documents: int):
+    FIRESTORE_OPERATION_DURATION.labels(op, collection).observe(time.perf_counter() - started)
+    if documents:
+        FIRESTORE_DOCUMENTS.labels(op, collection).inc(documents)
+
+def _collection_of(ref) -> str:
+    """Collection id of a document reference ('users/u1/logs/2024-01-01' -> 'logs')"""
+    parts = ref.path.split('/')
+    return parts[-2] if len(parts) >= 2 else 'unknown'
+
+def _common(collections) -> str:
+    collections = set(collections)
+    if len(collections) == 1:
+        return collections.pop()
+    return 'multiple' if collections else 'unknown'
+
+def _written_collections(batch) -> Tally:
+    """Documents per collection in a WriteBatch about to be committed"""
+    tally = Tally()
+    for write in getattr(batch, '_write_pbs', ()):
+        name = write.update.name or write.delete
+        parts = name.split('/')
+        tally[parts[-2] if len(parts) >= 2 else 'unknown'] += 1
+    return tally
+
+def instrument_firestore():
+    """Wrap the Firestore SDK's read and commit calls with latency and document counters"""
+    from firebase_admin import firestore
+
+    if prometheus_client is None or getattr(firestore, '_metrics_instrumented', False):
+        return
+    firestore._metrics_instrumented = True
+
+    document_get = firestore.DocumentReference.get
+
+    @wraps(document_get)
+    def get(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return document_get(self, *args, **kwargs)
+        finally:
+            _record_firestore('get', _collection_of(self), started, 1)
+
+    query_stream = firestore.Query.stream
+
+    @wraps(query_stream)
+    def stream(self, *args, **kwargs):
+        parent = getattr(self, '_parent', None)
+        collection = getattr(parent, 'id', None) or 'unknown'
+        started = time.perf_counter()
+        documents = 0
+        try:
+            for snapshot in query_stream(self, *args, **kwargs):
+                documents += 1
+                yield snapshot
+        finally:
+            _record_firestore('query', collection, started, documents)
+
+    client_get_all = firestore.Client.get_all
+
+    @wraps(client_get_all)
+    def get_all(self, references, *args, **kwargs):
+        references = list(references)
+        collection = _common(_collection_of(ref) for ref in references)
+        started = time.perf_counter()
+        documents = 0
+        try:
+            for snapshot in client_get_all(self, references, *args, **kwargs):
+                documents += 1
+                yield snapshot
+        finally:
+            _record_firestore('get_all', collection, started, documents)
+
+    batch_commit = firestore.WriteBatch.commit
+
+    @wraps(batch_commit)
+    def commit(self, *args, **kwargs):
+        written = _written_collections(self)
+        started = time.perf_counter()
+        try:
+            return batch_commit(self, *args, **kwargs)
+        finally:
+            _record_firestore('commit', _common(written), started, 0)
+            for collection, documents in written.items():
+                FIRESTORE_DOCUMENTS.labels('write', collection).inc(documents)
+
+    firestore.DocumentReference.get = get
+    firestore.Query.stream = stream
+    firestore.Client.get_all = get_all
+    firestore.WriteBatch.commit = commit
+
+def metrics_registry():
+    """Registry to expose: every worker's files in multiprocess mode, this process otherwise"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+def init_metrics(app):
+    """Time every request, instrument Firestore and add the /metrics route"""
+    if prometheus_client is None:
+        logger.warning("prometheus_client is not installed; /metrics is disabled")
+        return
+
+    try:
+        instrument_firestore()
+    except Exception as e:
+        logger.warning(f"Firestore instrumentation warning: {e}")
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def remember_status(response):
+        g.response_status = response.status_code
+        return response
+
+    # Teardown runs for every request, including those that raised before a response existed
+    @app.teardown_request
+    def observe_request(exc):
+        started = g.pop('request_started', None)
+        if started is not None:
+            status = 500 if exc is not None else g.pop('response_status', 500)
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_DURATION.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+    @app.route('/metrics')
+    def metrics():
+        if Config.METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {Config.METRICS_TOKEN}":
+            return jsonify({"error": "Unauthorized"}), 401
+        return Response(generate_latest(metrics_registry()), mimetype=CONTENT_TYPE_LATEST)
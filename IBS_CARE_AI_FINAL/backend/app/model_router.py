@@ -0,0 +1,129 @@
+"""
+Complexity-based routing of chat turns between a template, a fast model and a rich model.
+
+A cheap local classifier looks at length and intent keywords: greetings and
+thanks get a template reply without any Firestore or LLM call, routine
+questions go to the fast Groq model (with the user's health context only when
+they are about the user) and pattern analysis goes to Gemini. The
+rules can be overridden with MODEL_ROUTING_RULES (JSON) or a JSON file named by
+MODEL_ROUTING_FILE, and every decision is recorded in the Prometheus metrics
+with its latency and an estimated cost.
+"""
+
+import json
+import logging
+import re
+from typing import Optional
+
+from .config import Config
+from .metrics import record_chat_route
+
+logger = logging.getLogger(__name__)
+
+TIERS = ('trivial', 'routine', 'complex')
+
+DEFAULT_RULES = {
+    # Messages of at most this many words that match a template intent are trivial
+    'trivial_max_words': 5,
+    'templates': {
+        'greeting': {
+            'patterns': ['hi', 'hey', 'hello', 'hiya', 'good morning', 'good afternoon', 'good evening', 'yo'],
+            'reply': "Hello! 😊 How are your symptoms today? You can tell me how you're feeling, ask about foods, "
+                     "or ask me to look at patterns in your logs."
+        },
+        'thanks': {
+            'patterns': ['thanks', 'thank you', 'thx', 'ty', 'cheers', 'great thanks', 'ok thanks', 'thanks a lot'],
+            'reply': "You're welcome! 💙 I'm here whenever you need help managing your IBS."
+        },
+        'goodbye': {
+            'patterns': ['bye', 'goodbye', 'see you', 'good night', 'night'],
+            'reply': "Take care! 💙 Remember to log how you feel today - it helps spot your patterns."
+        },
+        'acknowledge': {
+            'patterns': ['ok', 'okay', 'cool', 'got it', 'sounds good', 'great', 'nice'],
+            'reply': "Great! 😊 Let me know if there's anything else I can help with."
+        }
+    },
+    # Any of these (as word prefixes), or a long message, needs the richer model
+    'complex_keywords': ['pattern', 'trend', 'correlat', 'analy', 'compare', 'why do', 'why does', 'why am',
+                         'last time', 'history', 'over the past', 'this month', 'last month', 'weeks', 'months',
+                         'cause', 'trigger', 'flare', 'plan', 'diet plan', 'meal plan', 'reintroduc'],
+    'complex_min_words': 40,
+    # Routine turns get the user's health context only when they mention the user or their
+    # recent days; general questions ("is oat milk low FODMAP?") skip the Firestore reads.
+    # Complex turns always get it.
+    'context_words': ['i', "i'm", 'im', "i've", 'ive', "i'd", "i'll", 'me', 'my', 'mine', 'myself', 'we', 'our',
+                      'today', 'tonight', 'yesterday', 'lately', 'recently', 'log', 'logs', 'logged', 'logging'],
+    # Intents that may be answering a question from the assistant, so need the model after one
+    'context_dependent_intents': ['acknowledge'],
+    'routes': {'trivial': 'template', 'routine': 'groq', 'complex': 'gemini'},
+    # Estimated USD per 1k tokens, used only for the recorded cost
+    'cost_per_1k_tokens': {'template': 0.0, 'groq': 0.0001, 'gemini': 0.0004}
+}
+
+def _normalize(message: str) -> str:
+    return ' '.join(re.sub(r"[^\w\s']", ' ', message.lower()).split())
+
+class ModelRouter:
+    """Classifies chat turns and records per-route latency and cost"""
+
+    def __init__(self, rules: Optional[dict] = None):
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self._templates = {
+            _normalize(pattern): intent
+            for intent, template in self.rules['templates'].items()
+            for pattern in template['patterns']
+        }
+        self._complex = re.compile(
+            r"\b(?:" + '|'.join(re.escape(keyword) for keyword in self.rules['complex_keywords']) + r")"
+        ) if self.rules['complex_keywords'] else None
+        self._context_words = {_normalize(word) for word in self.rules['context_words']}
+
+    def classify(self, message: str, last_reply: Optional[str] = None) -> dict:
+        """{'tier', 'target', 'intent', 'needs_context'} for a message, given the assistant's previous reply"""
+        text = _normalize(message)
+        words = text.split()
+        intent = None
+        if len(words) <= self.rules['trivial_max_words']:
+            # A template phrase followed by at most two filler words: "hi there!", "thanks so much"
+            for size in range(len(words), max(len(words) - 2, 1) - 1, -1):
+                intent = self._templates.get(' '.join(words[:size]))
+                if intent:
+                    break
+            if intent in self.rules['context_dependent_intents'] and (last_reply or '').rstrip().endswith('?'):
+                intent = None
+
+        if intent:
+            tier = 'trivial'
+        elif len(words) >= self.rules['complex_min_words'] or (self._complex and self._complex.search(text)):
+            tier = 'complex'
+        else:
+            tier = 'routine'
+        return {
+            'tier': tier,
+            'target': self.rules['routes'][tier],
+            'intent': intent if tier == 'trivial' else None,
+            'needs_context': tier == 'complex' or (tier == 'routine' and not self._context_words.isdisjoint(words))
+        }
+
+    def template_reply(self, intent: str) -> str:
+        return self.rules['templates'][intent]['reply']
+
+    def record(self, tier: str, target: str, latency_ms: float, tokens: int = 0):
+        cost = tokens / 1000 * self.rules['cost_per_1k_tokens'].get(target, 0.0)
+        record_chat_route(tier, target, latency_ms / 1000, tokens, cost)
+        logger.info(f"Routed {tier} turn to {target} in {latency_ms:.0f} ms ({tokens} tokens, ~${cost:.5f})")
+
+def load_rules() -> dict:
+    """Routing rule overrides from MODEL_ROUTING_RULES or MODEL_ROUTING_FILE"""
+    try:
+        if Config.MODEL_ROUTING_RULES:
+            return json.loads(Config.MODEL_ROUTING_RULES)
+        if Config.MODEL_ROUTING_FILE:
+            with open(Config.MODEL_ROUTING_FILE, encoding='utf-8') as handle:
+                return json.load(handle)
+    except Exception as e:
+        logger.warning(f"Invalid model routing rules, using defaults: {e}")
+    return {}
+
+model_router = ModelRouter(load_rules())
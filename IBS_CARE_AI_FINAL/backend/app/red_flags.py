@@ -0,0 +1,212 @@
+"""
+Fast-path detection of red-flag symptoms in chat messages.
+
+All phrases (several languages, optionally extended from a JSON file named by
+RED_FLAG_PHRASES_FILE) are compiled once into an Aho-Corasick automaton, so a
+message is scanned in a single pass regardless of how many phrases there are.
+A match lets the chat endpoint answer with safety advice immediately instead
+of waiting for an LLM round-trip.
+
+A match is dropped when a negation of its language ("no", "sin", "pas",
+"kein", ...) occurs in the few words before it within the same clause, so "no
+blood in my stool" is not flagged while "no pain, but blood in my stool" is.
+Romanized Hindi puts the negation after the noun ("khoon nahi hai"), so there
+the word right after the match is checked too.
+"""
+
+import json
+import logging
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, List, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# category -> language -> phrases; matched on whole words after lowercasing and accent folding
+RED_FLAG_PHRASES = {
+    'bleeding': {
+        'en': ['blood in my stool', 'blood in stool', 'bloody stool', 'bloody stools', 'bloody diarrhea', 'bloody diarrhoea',
+               'blood when i poop', 'blood in the toilet', 'rectal bleeding', 'bleeding from my bottom', 'black stool',
+               'black stools', 'tarry stool', 'pooping blood', 'vomiting blood', 'throwing up blood', 'blood in my vomit'],
+        'es': ['sangre en las heces', 'sangre en heces', 'heces con sangre', 'diarrea con sangre', 'sangrado rectal',
+               'heces negras', 'vomito sangre', 'vomitando sangre'],
+        'fr': ['sang dans les selles', 'selles sanglantes', 'diarrhee sanglante', 'saignement rectal', 'selles noires',
+               'vomi du sang', 'vomir du sang'],
+        'de': ['blut im stuhl', 'blutiger stuhl', 'blutiger durchfall', 'schwarzer stuhl', 'blut erbrochen'],
+        'pt': ['sangue nas fezes', 'fezes com sangue', 'diarreia com sangue', 'fezes pretas', 'vomitando sangue'],
+        'hi': ['potty mein khoon', 'mal mein khoon', 'khoon ki ulti']
+    },
+    'fever': {
+        'en': ['high fever', 'fever of 101', 'fever of 102', 'fever of 103', 'fever over 101', '39 degrees', '40 degrees',
+               'fever and chills', 'burning up with fever'],
+        'es': ['fiebre alta', 'fiebre de 39', 'fiebre de 40'],
+        'fr': ['forte fievre', 'fievre de 39', 'fievre de 40'],
+        'de': ['hohes fieber', 'fieber von 39', 'fieber von 40'],
+        'pt': ['febre alta', 'febre de 39', 'febre de 40'],
+        'hi': ['tez bukhar', 'bahut bukhar']
+    },
+    'severe_pain': {
+        'en': ['severe pain', 'excruciating pain', 'unbearable pain', 'worst pain of my life', 'worst pain ever',
+               'pain is unbearable', 'can not stand up from the pain', 'cannot stand up from the pain', 'pain 10 out of 10',
+               'pain is 10/10', 'stomach is rigid', 'abdomen is rigid', 'hard swollen belly'],
+        'es': ['dolor insoportable', 'dolor muy fuerte', 'dolor severo', 'el peor dolor'],
+        'fr': ['douleur insupportable', 'douleur atroce', 'douleur severe'],
+        'de': ['unertragliche schmerzen', 'starkste schmerzen', 'starke bauchschmerzen'],
+        'pt': ['dor insuportavel', 'dor muito forte', 'dor severa'],
+        'hi': ['bahut tez dard', 'asahniya dard']
+    },
+    'collapse': {
+        'en': ['i fainted', 'passed out', 'fainting', 'can not keep fluids down', "can't keep fluids down",
+               'cannot keep water down', "can't keep water down", 'severely dehydrated'],
+        'es': ['me desmaye', 'desmayo', 'no puedo retener liquidos'],
+        'fr': ["je me suis evanoui", "je me suis evanouie", 'evanouissement'],
+        'de': ['ohnmachtig geworden', 'in ohnmacht gefallen'],
+        'pt': ['desmaiei', 'desmaio'],
+        'hi': ['behosh ho gaya', 'behosh ho gayi']
+    },
+    'weight_loss': {
+        'en': ['losing weight without trying', 'unexplained weight loss', 'lost a lot of weight'],
+        'es': ['perdida de peso sin razon', 'perdiendo peso sin querer'],
+        'fr': ['perte de poids inexpliquee'],
+        'de': ['ungewollter gewichtsverlust'],
+        'pt': ['perda de peso sem motivo'],
+        'hi': ['bina wajah wazan kam']
+    }
+}
+
+# language -> words negating a phrase close to them, already folded like the messages
+NEGATIONS = {
+    'en': {'no', 'not', 'never', 'without', 'nor', "don't", 'dont', "didn't", 'didnt', "haven't", 'havent', "hasn't",
+           'hasnt', "isn't", 'isnt', "wasn't", 'wasnt', "aren't", "doesn't", 'doesnt'},
+    'es': {'no', 'nunca', 'jamas', 'sin', 'ni', 'ningun', 'ninguna'},
+    'fr': {'pas', 'jamais', 'sans', 'aucun', 'aucune', 'ni'},
+    'de': {'kein', 'keine', 'keinen', 'keiner', 'nicht', 'nie', 'niemals', 'ohne'},
+    'pt': {'nao', 'nunca', 'jamais', 'sem', 'nem', 'nenhum', 'nenhuma'},
+    'hi': {'nahi', 'nahin', 'na'}
+}
+# Words before a match searched for a negation, and after it for languages negating after the noun
+NEGATION_WINDOW_WORDS = 3
+NEGATION_WORDS_AFTER = {'hi': 1}
+# A negation does not reach past these into the next clause or list item ("no pain and blood in my stool")
+CLAUSE_BREAK_WORDS = {'but', 'however', 'and', 'pero', 'y', 'mais', 'et', 'aber', 'sondern', 'und', 'mas', 'e',
+                      'lekin', 'magar', 'aur'}
+CLAUSE_BREAK = re.compile(r'[.,;:!?()]')
+WORD = re.compile(r"[\w']+")
+
+# Categories that warrant emergency care rather than a prompt appointment
+EMERGENCY_CATEGORIES = {'bleeding', 'severe_pain', 'collapse'}
+
+SAFETY_MESSAGES = {
+    'bleeding': "Blood in your stool or vomit, or black tarry stools, is not a typical IBS symptom.",
+    'fever': "A high fever is not caused by IBS and can point to an infection.",
+    'severe_pain': "Severe or unbearable abdominal pain, especially with a hard or swollen belly, is not typical of IBS.",
+    'collapse': "Fainting or being unable to keep fluids down can mean you are seriously dehydrated or unwell.",
+    'weight_loss': "Losing weight without trying is a warning sign that should always be checked."
+}
+
+def _fold(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace so 'Fièvre  de 40' matches 'fievre de 40'"""
+    decomposed = unicodedata.normalize('NFKD', text.lower().replace('\u2019', "'"))
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+class RedFlagMatcher:
+    """Aho-Corasick automaton over the phrase list with whole-word matching"""
+
+    def __init__(self, phrases: Dict[str, Dict[str, List[str]]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[tuple]] = [[]]
+
+        for category, languages in phrases.items():
+            for language, terms in languages.items():
+                for term in terms:
+                    self._add(_fold(term).strip(), category, language)
+        self._build_failure_links()
+        self.pattern_count = sum(len(terms) for languages in phrases.values() for terms in languages.values())
+
+    def _add(self, phrase: str, category: str, language: str):
+        if not phrase:
+            return
+        state = 0
+        for char in phrase:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append((len(phrase), category, language, phrase))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def scan(self, message: str) -> List[dict]:
+        """Every whole-word phrase match in the message that is not negated"""
+        text = _fold(message)
+        matches = []
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, category, language, phrase in self._output[state]:
+                start = end - length + 1
+                if ((start == 0 or not text[start - 1].isalnum()) and (end + 1 == len(text) or not text[end + 1].isalnum())
+                        and not _negated(text, start, end + 1, language)):
+                    matches.append({'category': category, 'language': language, 'phrase': phrase})
+        return matches
+
+def _negated(text: str, start: int, end: int, language: str) -> bool:
+    """Whether a negation of the match's language is in the window around text[start:end]"""
+    negations = NEGATIONS.get(language)
+    if not negations:
+        return False
+    before = WORD.findall(CLAUSE_BREAK.split(text[:start])[-1])
+    breaks = [index for index, word in enumerate(before) if word in CLAUSE_BREAK_WORDS]
+    window = (before[breaks[-1] + 1:] if breaks else before)[-NEGATION_WINDOW_WORDS:]
+    after_count = NEGATION_WORDS_AFTER.get(language, 0)
+    if after_count:
+        window += WORD.findall(CLAUSE_BREAK.split(text[end:], 1)[0])[:after_count]
+    return any(word in negations for word in window)
+
+def load_phrases(path: Optional[str] = None) -> Dict[str, Dict[str, List[str]]]:
+    """Bundled phrases merged with the optional JSON file of the same shape"""
+    phrases = {category: {language: list(terms) for language, terms in languages.items()}
+               for category, languages in RED_FLAG_PHRASES.items()}
+    if not path:
+        return phrases
+    try:
+        with open(path, encoding='utf-8') as handle:
+            extra = json.load(handle)
+        for category, languages in extra.items():
+            for language, terms in languages.items():
+                phrases.setdefault(category, {}).setdefault(language, []).extend(terms)
+    except Exception as e:
+        logger.warning(f"Could not load red-flag phrases from {path}: {e}")
+    return phrases
+
+def safety_response(categories: List[str], elaborating: bool = False) -> str:
+    """Immediate reply for the matched red-flag categories"""
+    reasons = ' '.join(SAFETY_MESSAGES.get(category, '') for category in categories).strip()
+    if EMERGENCY_CATEGORIES & set(categories):
+        action = ("Please seek medical care right away: call your local emergency number or go to the nearest emergency "
+                  "department, especially if it is heavy, getting worse, or you feel faint.")
+    else:
+        action = "Please contact your doctor today, or an urgent care service if you cannot reach them."
+    follow_up = " I'll add some more guidance in the chat in a moment." if elaborating else ""
+    return (f"⚠️ {reasons} {action}\n\n"
+            f"I'm an IBS assistant and can't assess this safely, so please don't wait for symptoms to settle.{follow_up} 💙")
+
+red_flag_matcher = RedFlagMatcher(load_phrases(Config.RED_FLAG_PHRASES_FILE))
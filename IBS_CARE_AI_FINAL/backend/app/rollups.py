@@ -0,0 +1,274 @@
+"""
+Materialized weekly/monthly rollups of a user's daily logs.
+
+Each period document under ``users/{uid}/rollups`` keeps value histograms for
+mood and pain instead of running means, so an overwritten day can be removed
+exactly and mean/min/max are derived when the rollup is read. The daily level
+is the log document itself.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from firebase_admin import firestore
+
+from .firebase_init import db, commit_batch, MAX_BATCH_WRITES
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_DOC = 'summary'
+PERIOD_TYPES = ('week', 'month')
+
+def rollups_ref(user_uid: str):
+    return db.collection('users').document(user_uid).collection('rollups')
+
+def normalize_trigger(trigger: str) -> str:
+    return ' '.join(str(trigger).lower().split())
+
+def period_keys(date_iso: str) -> Dict[str, dict]:
+    """Return the week and month rollup ids a day belongs to, with its bit in each"""
+    day = date.fromisoformat(date_iso[:10])
+    iso_year, iso_week, iso_weekday = day.isocalendar()
+    week_start = day - timedelta(days=iso_weekday - 1)
+    return {
+        f"week-{iso_year}-W{iso_week:02d}": {
+            'type': 'week',
+            'start': week_start.isoformat(),
+            'bit': iso_weekday - 1
+        },
+        f"month-{day.year}-{day.month:02d}": {
+            'type': 'month',
+            'start': day.replace(day=1).isoformat(),
+            'bit': day.day - 1
+        }
+    }
+
+def _log_contribution(log: dict, sign: int) -> dict:
+    """Histogram/trigger increments for one log, negated when sign is -1"""
+    triggers = {normalize_trigger(t) for t in log.get('triggers') or [] if str(t).strip()}
+    contribution = {'triggers': {name: sign for name in triggers}}
+    if log.get('mood') is not None:
+        contribution['mood_hist'] = {str(log['mood']): sign}
+    if log.get('pain_level') is not None:
+        contribution['pain_hist'] = {str(log['pain_level']): sign}
+    return contribution
+
+def _merge_deltas(target: dict, delta: dict):
+    for field, values in delta.items():
+        bucket = target.setdefault(field, defaultdict(int))
+        for key, value in values.items():
+            bucket[key] += value
+
+def rollup_writes(user_uid: str, previous: Optional[dict], current: dict) -> List[tuple]:
+    """Build the (doc_ref, data) merge-writes that move a day from previous to current.
+
+    ``previous`` is the stored log before a ``set(..., merge=True)`` overwrite
+    (or None for a new day); its contribution is subtracted before the new
+    values are added, using Firestore increments so concurrent days stay exact.
+    The streak summary is not included: call update_streaks once they are committed.
+    """
+    deltas = defaultdict(dict)
+    periods = period_keys(current['dateISO'])
+
+    if previous:
+        for period_id in period_keys(previous['dateISO']):
+            _merge_deltas(deltas[period_id], _log_contribution(previous, -1))
+    for period_id in periods:
+        _merge_deltas(deltas[period_id], _log_contribution(current, 1))
+
+    now = datetime.now().isoformat()
+    writes = []
+    for period_id, delta in deltas.items():
+        info = periods[period_id]
+        data = {
+            'period': period_id,
+            'type': info['type'],
+            'start': info['start'],
+            'updatedAt': now
+        }
+        for field, values in delta.items():
+            increments = {key: firestore.Increment(value) for key, value in values.items() if value}
+            if increments:
+                data[field] = increments
+        if not previous:
+            data['count'] = firestore.Increment(1)
+            data['days_mask'] = firestore.Increment(1 << info['bit'])
+        writes.append((rollups_ref(user_uid).document(period_id), data))
+
+    return writes
+
+def update_streaks(user_uid: str, date_isos: List[str]):
+    """Fold new (not previously logged) days into the streak summary.
+
+    Call it after the days' rollups are committed. The summary is read and
+    written in a transaction, which Firestore retries when another request
+    changes it in between, so concurrent saves never lose a day.
+    """
+    if date_isos:
+        days = sorted({date.fromisoformat(date_iso[:10]) for date_iso in date_isos})
+        _update_summary(db.transaction(), user_uid, days)
+
+@firestore.transactional
+def _update_summary(transaction, user_uid: str, days: List[date]):
+    summary_ref = rollups_ref(user_uid).document(SUMMARY_DOC)
+    summary_doc = summary_ref.get(transaction=transaction)
+    summary = summary_doc.to_dict() if summary_doc.exists else {}
+    last_date = summary.get('last_date')
+    last_day = date.fromisoformat(last_date) if last_date else None
+
+    if last_day and days[0] <= last_day:
+        # A backfilled day can join two runs together, so recount from the month
+        # masks, which already include the committed new days
+        data = _streaks_from_days(_logged_days(user_uid, transaction))
+    else:
+        # Every day is newer than the summary: extend the running streak day by day
+        current = summary.get('current_streak', 0)
+        longest = summary.get('longest_streak', 0)
+        for day in days:
+            current = current + 1 if last_day and day - last_day == timedelta(days=1) else 1
+            longest = max(longest, current)
+            last_day = day
+        data = {
+            'current_streak': current,
+            'longest_streak': longest,
+            'last_date': last_day.isoformat(),
+            'total_days': summary.get('total_days', 0) + len(days)
+        }
+    transaction.set(summary_ref, {**data, 'updatedAt': datetime.now().isoformat()}, merge=True)
+
+def _logged_days(user_uid: str, transaction=None) -> set:
+    days = set()
+    for doc in rollups_ref(user_uid).where('type', '==', 'month').stream(transaction=transaction):
+        data = doc.to_dict()
+        month_start = date.fromisoformat(data['start'])
+        mask = data.get('days_mask', 0)
+        for bit in range(31):
+            if mask & (1 << bit):
+                days.add(month_start + timedelta(days=bit))
+    return days
+
+def _streaks_from_days(days: set) -> dict:
+    ordered = sorted(days)
+    longest = current = 0
+    previous = None
+    for day in ordered:
+        current = current + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return {
+        'current_streak': current,
+        'longest_streak': longest,
+        'last_date': ordered[-1].isoformat() if ordered else None,
+        'total_days': len(ordered)
+    }
+
+def _histogram_stats(histogram: dict) -> dict:
+    values = {int(value): count for value, count in (histogram or {}).items() if count > 0}
+    total = sum(values.values())
+    if not total:
+        return {'mean': None, 'min': None, 'max': None}
+    return {
+        'mean': round(sum(value * count for value, count in values.items()) / total, 2),
+        'min': min(values),
+        'max': max(values)
+    }
+
+def summarize_rollup(data: dict) -> dict:
+    """Turn a stored rollup document into mean/min/max figures for the dashboard"""
+    triggers = {name: count for name, count in (data.get('triggers') or {}).items() if count > 0}
+    return {
+        'period': data.get('period'),
+        'type': data.get('type'),
+        'start': data.get('start'),
+        'days_logged': data.get('count', 0),
+        'mood': _histogram_stats(data.get('mood_hist')),
+        'pain': _histogram_stats(data.get('pain_hist')),
+        'triggers': dict(sorted(triggers.items(), key=lambda item: -item[1]))
+    }
+
+def get_rollups(user_uid: str, period_type: str = 'week', limit: int = 12) -> dict:
+    """Read the latest rollups of one type plus the streak summary"""
+    docs = (
+        rollups_ref(user_uid)
+        .where('type', '==', period_type)
+        .order_by('start', direction='DESCENDING')
+        .limit(limit)
+        .stream()
+    )
+    rollups = [summarize_rollup(doc.to_dict()) for doc in docs]
+
+    summary_doc = rollups_ref(user_uid).document(SUMMARY_DOC).get()
+    summary = summary_doc.to_dict() if summary_doc.exists else {}
+    last_date = summary.get('last_date')
+
+    # A streak only counts as current if it reaches today or yesterday
+    current_streak = summary.get('current_streak', 0)
+    if not last_date or date.fromisoformat(last_date) < date.today() - timedelta(days=1):
+        current_streak = 0
+
+    return {
+        'rollups': list(reversed(rollups)),
+        'streaks': {
+            'current': current_streak,
+            'longest': summary.get('longest_streak', 0),
+            'last_date': last_date,
+            'total_days': summary.get('total_days', 0)
+        }
+    }
+
+def rebuild_user_rollups(user_uid: str) -> int:
+    """Recompute every rollup of a user from the raw logs and replace the stored ones"""
+    logs = (
+        db.collection('users').document(user_uid).collection('logs')
+        .select(['dateISO', 'mood', 'pain_level', 'triggers'])
+        .stream()
+    )
+
+    periods = {}
+    days = set()
+    for doc in logs:
+        log = doc.to_dict()
+        if not log.get('dateISO'):
+            continue
+        days.add(date.fromisoformat(log['dateISO'][:10]))
+        for period_id, info in period_keys(log['dateISO']).items():
+            rollup = periods.setdefault(period_id, {
+                'period': period_id,
+                'type': info['type'],
+                'start': info['start'],
+                'count': 0,
+                'days_mask': 0,
+                'mood_hist': defaultdict(int),
+                'pain_hist': defaultdict(int),
+                'triggers': defaultdict(int)
+            })
+            if rollup['days_mask'] & (1 << info['bit']):
+                continue
+            rollup['count'] += 1
+            rollup['days_mask'] |= 1 << info['bit']
+            _merge_deltas(rollup, _log_contribution(log, 1))
+
+    now = datetime.now().isoformat()
+    writes = [
+        (rollups_ref(user_uid).document(period_id), {
+            **rollup,
+            'mood_hist': dict(rollup['mood_hist']),
+            'pain_hist': dict(rollup['pain_hist']),
+            'triggers': dict(rollup['triggers']),
+            'updatedAt': now
+        })
+        for period_id, rollup in periods.items()
+    ]
+    writes.append((rollups_ref(user_uid).document(SUMMARY_DOC), {**_streaks_from_days(days), 'updatedAt': now}))
+
+    for stale in rollups_ref(user_uid).list_documents():
+        if stale.id != SUMMARY_DOC and stale.id not in periods:
+            stale.delete()
+
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        commit_batch(writes[start:start + MAX_BATCH_WRITES], merge=False)
+
+    logger.info(f"Rebuilt {len(periods)} rollups for user {user_uid}")
+    return len(periods)
@@ -0,0 +1,80 @@
+from flask import Blueprint, request, jsonify
+import logging
+from ..auth_utils import require_auth
+from ..correlations import get_trigger_correlations
+from ..flare_detector import active_flare, get_flare_state
+from ..flare_model import predict_flare_risk
+from ..food_index import foods_preceding_flares, flare_rate_after, FLARE_PAIN_THRESHOLD
+
+logger = logging.getLogger(__name__)
+bp = Blueprint('analytics', __name__)
+
+@bp.route('/correlations', methods=['GET'])
+@require_auth
+def get_correlations(user_uid: str, user_email: str):
+    """Correlate logged triggers with pain and mood over 0-2 day lags"""
+    try:
+        return jsonify(get_trigger_correlations(user_uid))
+
+    except Exception as e:
+        logger.error(f"Failed to compute trigger correlations: {e}")
+        return jsonify({"error": "Failed to compute trigger correlations"}), 500
+
+@bp.route('/flare-state', methods=['GET'])
+@require_auth
+def get_flare_status(user_uid: str, user_email: str):
+    """Current flare-up flag and EWMA baseline from the streaming detector"""
+    try:
+        state = get_flare_state(user_uid)
+        state.pop('previous', None)
+        return jsonify({**state, 'active': active_flare(state) is not None})
+
+    except Exception as e:
+        logger.error(f"Failed to get flare state: {e}")
+        return jsonify({"error": "Failed to get flare state"}), 500
+
+@bp.route('/flare-risk', methods=['GET'])
+@require_auth
+def get_flare_risk(user_uid: str, user_email: str):
+    """Predicted chance that the day after the latest log is a flare day"""
+    try:
+        prediction = predict_flare_risk(user_uid)
+        if prediction is None:
+            return jsonify({"error": "Flare risk model has not been trained yet"}), 404
+        return jsonify(prediction)
+
+    except Exception as e:
+        logger.error(f"Failed to predict flare risk: {e}")
+        return jsonify({"error": "Failed to predict flare risk"}), 500
+
+@bp.route('/foods/flares', methods=['GET'])
+@require_auth
+def get_foods_preceding_flares(user_uid: str, user_email: str):
+    """Foods eaten within a time window before days with high pain"""
+    try:
+        threshold = request.args.get('threshold', FLARE_PAIN_THRESHOLD, type=int)
+        window_hours = request.args.get('window_hours', 24, type=int)
+        min_occurrences = request.args.get('min_occurrences', 2, type=int)
+
+        return jsonify(foods_preceding_flares(user_uid, threshold, window_hours, min_occurrences))
+
+    except Exception as e:
+        logger.error(f"Failed to query foods preceding flares: {e}")
+        return jsonify({"error": "Failed to query food index"}), 500
+
+@bp.route('/foods/flare-rate', methods=['GET'])
+@require_auth
+def get_food_flare_rate(user_uid: str, user_email: str):
+    """Flare rate after eating a food or food category, e.g. ?food=dairy"""
+    try:
+        food = request.args.get('food', '').strip()
+        if not food:
+            return jsonify({"error": "food is required"}), 400
+        threshold = request.args.get('threshold', FLARE_PAIN_THRESHOLD, type=int)
+        window_hours = request.args.get('window_hours', 24, type=int)
+
+        return jsonify(flare_rate_after(user_uid, food, threshold, window_hours))
+
+    except Exception as e:
+        logger.error(f"Failed to query food flare rate: {e}")
+        return jsonify({"error": "Failed to query food index"}), 500
@@ -3,7 +3,14 @@ import logging
 from datetime import datetime
 from ..schemas import AssessmentSubmission, AssessmentAnswer, IBSClassification, AssessmentResult
 from ..auth_utils import require_auth
+from ..idempotency import idempotent
+from ..etags import conditional
+from ..change_feed import change_write
+from ..assessment_scoring import scoring_engine, get_next_steps
+from ..config import Config
 from ..firebase_init import db
+from ..static_responses import static_responses, IMMUTABLE
+from ..unit_of_work import atomic, unit_of_work
 from typing import List
 
 logger = logging.getLogger(__name__)
@@ -84,17 +91,30 @@ ASSESSMENT_QUESTIONS = [
 ]
 
 @bp.route('/questions', methods=['GET'])
-@require_auth
-def get_assessment_questions(user_uid: str, user_email: str):
-    """Get assessment questions"""
+def get_assessment_questions():
+    """Get assessment questions; cacheable forever when requested as ?v=<X-Questions-Version>"""
     try:
-        return jsonify(ASSESSMENT_QUESTIONS)
+        questions = static_responses.get('assessment_questions')
+        if request.args.get('v') == questions.digest:
+            return questions.serve(IMMUTABLE)
+        return questions.serve()
     except Exception as e:
         logger.error(f"Failed to get assessment questions: {e}")
         return jsonify({"error": "Failed to get assessment questions"}), 500
 
+@bp.route('/next-steps', methods=['GET'])
+def get_all_next_steps():
+    """Next steps of every IBS subtype"""
+    try:
+        return static_responses.serve('assessment_next_steps')
+    except Exception as e:
+        logger.error(f"Failed to get next steps: {e}")
+        return jsonify({"error": "Failed to get next steps"}), 500
+
 @bp.route('/submit', methods=['POST'])
 @require_auth
+@idempotent
+@atomic
 def submit_assessment(user_uid: str, user_email: str):
     """Submit assessment and get IBS classification"""
     try:
@@ -115,18 +135,21 @@ def submit_assessment(user_uid: str, user_email: str):
             next_steps=get_next_steps(classification.ibs_type)
         )
         
-        # Save to Firestore
+        # Save the result, its change feed entry and the profile's IBS type in one batch
+        uow = unit_of_work()
         doc_ref = db.collection('users').document(user_uid).collection('assessments').document('latest')
-        doc_ref.set({
+        updated_at = datetime.now().isoformat()
+        uow.set(doc_ref, {
             'classification': classification.dict(),
             'completed_at': submission.completed_at.isoformat(),
             'next_steps': result.next_steps,
-            'answers': [answer.dict() for answer in submission.answers]
-        })
+            'answers': [answer.dict() for answer in submission.answers],
+            'updatedAt': updated_at
+        }, merge=False)
+        uow.add([change_write(user_uid, 'assessment', doc_ref.id, updated_at)])
         
         # Update user profile with IBS type
-        user_ref = db.collection('users').document(user_uid)
-        user_ref.update({
+        uow.set(db.collection('users').document(user_uid), {
             'ibs_type': classification.ibs_type,
             'assessment_completed': True,
             'assessment_date': submission.completed_at.isoformat()
@@ -140,6 +163,7 @@ def submit_assessment(user_uid: str, user_email: str):
 
 @bp.route('/result', methods=['GET'])
 @require_auth
+@conditional('assessment')
 def get_assessment_result(user_uid: str, user_email: str):
     """Get latest assessment result"""
     try:
@@ -156,135 +180,46 @@ def get_assessment_result(user_uid: str, user_email: str):
         logger.error(f"Failed to get assessment result: {e}")
         return jsonify({"error": "Failed to get assessment result"}), 500
 
+@bp.route('/classify-batch', methods=['POST'])
+@require_auth
+def classify_batch(user_uid: str, user_email: str):
+    """Classify a cohort of answer sets without saving them.
+
+    The body is ``{"assessments": [{"id": ..., "answers": ...}]}`` where answers
+    is either a list of ``{"question_id", "answer"}`` objects or a
+    ``{question_id: answer}`` object.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        assessments = data.get('assessments')
+        if not isinstance(assessments, list) or not assessments:
+            return jsonify({"error": "assessments must be a non-empty list"}), 400
+        if len(assessments) > Config.ASSESSMENT_BATCH_MAX:
+            return jsonify({"error": f"A batch is limited to {Config.ASSESSMENT_BATCH_MAX} assessments"}), 413
+
+        answer_sets = []
+        for index, assessment in enumerate(assessments):
+            answers = assessment.get('answers') if isinstance(assessment, dict) else None
+            if isinstance(answers, list):
+                try:
+                    answers = {answer['question_id']: answer.get('answer') for answer in answers}
+                except (TypeError, KeyError, AttributeError):
+                    answers = None
+            if not isinstance(answers, dict):
+                return jsonify({"error": f"assessments[{index}].answers must be a list of answers or an object"}), 400
+            answer_sets.append(answers)
+
+        results = scoring_engine.classify_many(answer_sets)
+        for assessment, result in zip(assessments, results):
+            result['id'] = assessment.get('id')
+
+        return jsonify({"results": results, "count": len(results)})
+
+    except Exception as e:
+        logger.error(f"Failed to classify assessment batch: {e}")
+        return jsonify({"error": "Failed to classify assessments"}), 500
+
 def classify_ibs_type(answers: List[AssessmentAnswer]) -> IBSClassification:
     """Classify IBS type based on assessment answers"""
-    # Convert answers to a dictionary for easy access
-    answers_dict = {answer.question_id: answer.answer for answer in answers}
-    
-    # Scoring system for different IBS types
-    ibs_c_score = 0  # Constipation
-    ibs_d_score = 0  # Diarrhea
-    ibs_m_score = 0  # Mixed
-    
-    # Analyze bowel frequency
-    frequency = answers_dict.get('bowel_frequency', '')
-    if frequency in ['Less than 1', '1-2']:
-        ibs_c_score += 3
-    elif frequency in ['5+']:
-        ibs_d_score += 3
-    elif frequency == 'Varies significantly':
-        ibs_m_score += 2
-    
-    # Analyze stool consistency
-    consistency = answers_dict.get('stool_consistency', '')
-    if consistency in ['Hard/lumpy']:
-        ibs_c_score += 3
-    elif consistency in ['Soft/mushy', 'Watery']:
-        ibs_d_score += 3
-    elif consistency == 'Mixed types':
-        ibs_m_score += 3
-    
-    # Analyze pain relief
-    pain_relief = answers_dict.get('pain_relief', '')
-    if pain_relief in ['Always', 'Usually']:
-        ibs_c_score += 2
-        ibs_d_score += 1
-    
-    # Analyze urgency
-    urgency = answers_dict.get('urgency', '')
-    if urgency in ['Often', 'Always']:
-        ibs_d_score += 2
-    
-    # Analyze incomplete evacuation
-    incomplete = answers_dict.get('incomplete_evacuation', '')
-    if incomplete in ['Often', 'Always']:
-        ibs_c_score += 2
-    
-    # Determine IBS type based on scores
-    max_score = max(ibs_c_score, ibs_d_score, ibs_m_score)
-    
-    if max_score == ibs_c_score:
-        ibs_type = "IBS-C"
-        confidence = min(0.9, (ibs_c_score / 10) + 0.3)
-        reasoning = "Your symptoms suggest IBS with constipation (IBS-C). You experience infrequent bowel movements and hard stool consistency."
-        recommendations = [
-            "Increase fiber intake gradually",
-            "Stay well hydrated",
-            "Exercise regularly",
-            "Consider probiotics",
-            "Avoid processed foods"
-        ]
-    elif max_score == ibs_d_score:
-        ibs_type = "IBS-D"
-        confidence = min(0.9, (ibs_d_score / 10) + 0.3)
-        reasoning = "Your symptoms suggest IBS with diarrhea (IBS-D). You experience frequent, loose stools and urgency."
-        recommendations = [
-            "Follow a low-FODMAP diet",
-            "Avoid caffeine and alcohol",
-            "Eat smaller, more frequent meals",
-            "Consider anti-diarrheal medications",
-            "Manage stress levels"
-        ]
-    elif max_score == ibs_m_score:
-        ibs_type = "IBS-M"
-        confidence = min(0.9, (ibs_m_score / 10) + 0.3)
-        reasoning = "Your symptoms suggest IBS with mixed bowel habits (IBS-M). You experience both constipation and diarrhea."
-        recommendations = [
-            "Keep a detailed symptom diary",
-            "Work with a dietitian",
-            "Identify trigger foods",
-            "Maintain regular meal times",
-            "Consider stress management techniques"
-        ]
-    else:
-        ibs_type = "IBS-U"
-        confidence = 0.6
-        reasoning = "Your symptoms don't clearly fit into a specific IBS subtype. This is classified as IBS-Unspecified (IBS-U)."
-        recommendations = [
-            "Continue monitoring symptoms",
-            "Keep a detailed food diary",
-            "Consult with a gastroenterologist",
-            "Consider stress management",
-            "Maintain regular exercise"
-        ]
-    
-    return IBSClassification(
-        ibs_type=ibs_type,
-        confidence=confidence,
-        reasoning=reasoning,
-        recommendations=recommendations
-    )
-
-def get_next_steps(ibs_type: str) -> List[str]:
-    """Get next steps based on IBS type"""
-    base_steps = [
-        "Schedule a follow-up with your healthcare provider",
-        "Start tracking your daily symptoms",
-        "Begin implementing dietary recommendations",
-        "Set up daily reminder notifications"
-    ]
-    
-    type_specific_steps = {
-        "IBS-C": [
-            "Gradually increase fiber intake",
-            "Start a regular exercise routine",
-            "Consider over-the-counter fiber supplements"
-        ],
-        "IBS-D": [
-            "Begin a low-FODMAP elimination diet",
-            "Identify and avoid trigger foods",
-            "Consider anti-diarrheal medications"
-        ],
-        "IBS-M": [
-            "Work with a registered dietitian",
-            "Keep detailed symptom and food logs",
-            "Develop a personalized management plan"
-        ],
-        "IBS-U": [
-            "Continue comprehensive symptom tracking",
-            "Consult with a gastroenterologist",
-            "Consider additional diagnostic testing"
-        ]
-    }
-    
-    return base_steps + type_specific_steps.get(ibs_type, [])
+    # Later answers to the same question win, as in a dict built from the list
+    return scoring_engine.classify({answer.question_id: answer.answer for answer in answers})
@@ -1,18 +1,28 @@
 import asyncio
 from flask import Blueprint, request, jsonify
 import logging
+import threading
 from datetime import datetime
 import uuid
+from typing import Optional
 from ..schemas import ChatMessage, ChatResponse
 from ..auth_utils import require_auth
-from ..firebase_init import db
+from ..idempotency import idempotent
+from ..etags import conditional
+from ..firebase_init import db, commit_batch
+from ..search_index import chat_key, index_entry
+from ..change_feed import change_write
 from ..enhanced_llm_adapter import enhanced_llm_adapter
+from ..red_flags import red_flag_matcher, safety_response
+from ..unit_of_work import UnitOfWork, atomic, unit_of_work
 
 logger = logging.getLogger(__name__)
 bp = Blueprint('chat', __name__)
 
 @bp.route('/chat', methods=['POST'])
 @require_auth
+@idempotent
+@atomic
 def chat_endpoint(user_uid: str, user_email: str):
     """Handle chat messages with enhanced AI assistant using LangChain"""
     try:
@@ -25,6 +35,11 @@ def chat_endpoint(user_uid: str, user_email: str):
         if not user_message:
             return jsonify({"error": "Message cannot be empty"}), 400
 
+        # Red-flag symptoms get an immediate safety reply instead of waiting for the LLM
+        red_flags = sorted({match['category'] for match in red_flag_matcher.scan(user_message)})
+        if red_flags:
+            return red_flag_reply(user_uid, user_message, red_flags)
+
         # Get chat history for context
         chat_history = get_recent_chat_history(user_uid, limit=20)
 
@@ -45,7 +60,7 @@ def chat_endpoint(user_uid: str, user_email: str):
 
         # Save conversation to Firestore
         save_chat_message(user_uid, "user", user_message)
-        save_chat_message(user_uid, "assistant", ai_response.reply)
+        save_chat_message(user_uid, "assistant", ai_response.reply, unit_of_work())
 
         return jsonify({
             "reply": ai_response.reply,
@@ -62,8 +77,53 @@ def chat_endpoint(user_uid: str, user_email: str):
             "error": "Temporary service issue"
         }), 200  # Return 200 with fallback message
 
+def red_flag_reply(user_uid: str, user_message: str, red_flags: list):
+    """Answer a red-flag message at once and let the LLM elaborate in the background"""
+    elaborating = bool(enhanced_llm_adapter.gemini_model or enhanced_llm_adapter.groq_model)
+    reply = safety_response(red_flags, elaborating)
+    logger.warning(f"Red-flag message from user {user_uid}: {', '.join(red_flags)}")
+
+    chat_history = get_recent_chat_history(user_uid, limit=20)
+    uow = unit_of_work()
+    save_chat_message(user_uid, "assistant", reply, uow)
+    if elaborating:
+        # Only once the safety reply is saved, so the elaboration always comes after it
+        uow.after_commit(lambda: threading.Thread(
+            target=elaborate_red_flag_reply,
+            args=(user_uid, user_message, chat_history + [{"role": "assistant", "content": reply}]),
+            daemon=True
+        ).start())
+
+    return jsonify({
+        "reply": reply,
+        "tokens_used": 0,
+        "context_used": False,
+        "red_flags": red_flags,
+        "elaboration_pending": elaborating
+    })
+
+def elaborate_red_flag_reply(user_uid: str, user_message: str, chat_history: list):
+    """Generate the full LLM answer after a safety reply and add it to the chat history"""
+    loop = asyncio.new_event_loop()
+    try:
+        ai_response = loop.run_until_complete(
+            enhanced_llm_adapter.generate_response(
+                user_uid=user_uid,
+                message=user_message,
+                chat_history=chat_history
+            )
+        )
+        # tokens_used is 0 only for the canned fallback, which adds nothing here
+        if ai_response.tokens_used:
+            save_chat_message(user_uid, "assistant", ai_response.reply)
+    except Exception as e:
+        logger.error(f"Failed to elaborate red-flag reply: {e}")
+    finally:
+        loop.close()
+
 @bp.route('/chat/history', methods=['GET'])
 @require_auth
+@conditional('chat')
 def get_chat_history_endpoint(user_uid: str, user_email: str):
     """Get user's chat history"""
     try:
@@ -84,37 +144,7 @@ def get_chat_history_endpoint(user_uid: str, user_email: str):
 def get_intro_message(user_uid: str, user_email: str):
     """Get personalized intro message with suggestions"""
     try:
-        # Get user context for personalization
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        try:
-            health_context = loop.run_until_complete(
-                enhanced_llm_adapter.get_health_context(user_uid)
-            )
-        finally:
-            loop.close()
-
-        # Generate intro message
-        intro_message = "Hello! I'm your IBS care assistant. I'm here to help you manage your symptoms and provide personalized advice. How are you feeling today?"
-
-        # Personalize based on context
-        if health_context.recent_logs_count > 0:
-            if health_context.avg_symptom_severity > 6:
-                intro_message = f"Hello! I see you've been tracking your symptoms regularly. With your recent symptom levels, I'm here to help you find relief strategies. How are you feeling today?"
-            elif health_context.avg_mood < 5:
-                intro_message = f"Hello! I've noticed your mood has been a bit lower lately. Let's work together on some strategies to help you feel better. How are you doing today?"
-            else:
-                intro_message = f"Hello! Great to see you've been consistently tracking your health. Based on your {health_context.recent_logs_count} recent logs, let's continue optimizing your IBS management. How are you feeling today?"
-
-        # Generate contextual suggestions
-        suggestions = get_personalized_suggestions(health_context)
-
-        return jsonify({
-            "intro_message": intro_message,
-            "suggestions": suggestions,
-            "context_available": health_context.recent_logs_count > 0
-        })
+        return jsonify(build_intro(user_uid))
 
     except Exception as e:
         logger.error(f"Failed to get intro message: {e}")
@@ -158,27 +188,77 @@ def get_recent_chat_history(user_uid: str, limit: int = 20) -> list:
         logger.error(f"Failed to fetch chat history: {e}")
         return []
 
-def save_chat_message(user_uid: str, role: str, content: str):
-    """Save a chat message to Firestore"""
+def save_chat_message(user_uid: str, role: str, content: str, uow: Optional[UnitOfWork] = None):
+    """Save a chat message to Firestore, or queue it on the request's unit of work"""
     try:
         if role == "user":
             # Store user message temporarily, will be paired with assistant response
             return
         elif role == "assistant":
             # Save as complete conversation turn
+            now = datetime.now().isoformat()
             message_data = {
                 "userId": user_uid,
                 "message": "",  # Will be set by frontend
                 "response": content,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now,
+                "updatedAt": now,
                 "context": {"model": "enhanced-langchain"}
             }
 
-            db.collection('chat_history').add(message_data)
+            doc_ref = db.collection('chat_history').document()
+            writes = [
+                (doc_ref, message_data),
+                change_write(user_uid, 'chat', doc_ref.id, message_data['updatedAt'])
+            ]
+            # Search postings are committed after the turn so an index failure cannot lose it
+            index = lambda: index_entry(user_uid, chat_key(doc_ref.id, message_data['timestamp']), '', content)
+            if uow is not None:
+                uow.add(writes)
+                uow.after_commit(index)
+                return
+            commit_batch(writes)
+            index()
 
     except Exception as e:
         logger.error(f"Failed to save chat message: {e}")
 
+def build_intro(user_uid: str, user_profile: Optional[dict] = None) -> dict:
+    """Personalized intro message and suggestions; user_profile saves re-reading the user doc"""
+    # Get user context for personalization
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        health_context = loop.run_until_complete(
+            enhanced_llm_adapter.get_health_context(user_uid, user_profile=user_profile)
+        )
+    finally:
+        loop.close()
+
+    # Generate intro message
+    intro_message = "Hello! I'm your IBS care assistant. I'm here to help you manage your symptoms and provide personalized advice. How are you feeling today?"
+
+    # Personalize based on context
+    if health_context.flare_active:
+        intro_message = "Hello! Your latest log looks rougher than usual for you, so it may be a flare-up. I'm here to help you get through it and work out what might have set it off. How are you feeling right now?"
+    elif health_context.recent_logs_count > 0:
+        if health_context.avg_symptom_severity > 6:
+            intro_message = f"Hello! I see you've been tracking your symptoms regularly. With your recent symptom levels, I'm here to help you find relief strategies. How are you feeling today?"
+        elif health_context.avg_mood < 5:
+            intro_message = f"Hello! I've noticed your mood has been a bit lower lately. Let's work together on some strategies to help you feel better. How are you doing today?"
+        else:
+            intro_message = f"Hello! Great to see you've been consistently tracking your health. Based on your {health_context.recent_logs_count} recent logs, let's continue optimizing your IBS management. How are you feeling today?"
+
+    # Generate contextual suggestions
+    suggestions = get_personalized_suggestions(health_context)
+
+    return {
+        "intro_message": intro_message,
+        "suggestions": suggestions,
+        "context_available": health_context.recent_logs_count > 0
+    }
+
 def get_personalized_suggestions(health_context) -> list:
     """Generate personalized suggestions based on user's health context"""
     try:
@@ -0,0 +1,79 @@
+from flask import Blueprint, jsonify
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from ..auth_utils import require_auth
+from ..cache import VersionedCache
+from ..change_feed import latest_change
+from ..config import Config
+from ..firebase_init import db
+from ..flare_detector import flare_state_ref
+from ..rollups import SUMMARY_DOC, get_rollups, rollups_ref
+from .chat import build_intro
+
+logger = logging.getLogger(__name__)
+bp = Blueprint('dashboard', __name__)
+
+# Fields of the latest assessment the dashboard shows (the answers are left out)
+ASSESSMENT_FIELDS = ['classification', 'completed_at', 'next_steps', 'updatedAt']
+
+_executor = ThreadPoolExecutor(max_workers=Config.DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+def _read_profile_and_assessment(user_uid: str) -> dict:
+    """The user doc and the latest assessment in one get_all round-trip"""
+    user_ref = db.collection('users').document(user_uid)
+    assessment_ref = user_ref.collection('assessments').document('latest')
+    snapshots = {snapshot.reference.path: snapshot for snapshot in db.get_all([user_ref, assessment_ref])}
+    profile = snapshots[user_ref.path].to_dict() if snapshots[user_ref.path].exists else {}
+    assessment = None
+    if snapshots[assessment_ref.path].exists:
+        data = snapshots[assessment_ref.path].to_dict()
+        assessment = {field: data.get(field) for field in ASSESSMENT_FIELDS if field in data}
+    return {'profile': profile, 'assessment': assessment}
+
+def dashboard_version(user_uid: str) -> str:
+    """Version of everything the dashboard shows, as seen by every worker
+
+    Logs, assessments, chat messages and the timeline entries the web client
+    writes move the newest change of the feed, whose commit timestamps follow
+    commit order. The profile, the flare state and the streak summary (both
+    updated after the log commit) are written outside the feed, so their
+    update times are part of the version too, and so is today's date: the
+    streak and the intro's recent window are counted from it.
+    """
+    refs = [db.collection('users').document(user_uid), flare_state_ref(user_uid), rollups_ref(user_uid).document(SUMMARY_DOC)]
+    snapshots = {snapshot.reference.path: snapshot for snapshot in db.get_all(refs, field_paths=['updatedAt'])}
+    update_times = [str(snapshots[ref.path].update_time) for ref in refs]
+    return '|'.join([date.today().isoformat(), latest_change(user_uid)] + update_times)
+
+def build_dashboard(user_uid: str) -> dict:
+    """Profile, latest assessment, weekly rollups and chat intro, read in parallel"""
+    docs = _executor.submit(_read_profile_and_assessment, user_uid)
+    rollups = _executor.submit(get_rollups, user_uid, 'week', Config.DASHBOARD_ROLLUP_WEEKS)
+    # The intro reuses the profile read above instead of fetching the user doc again
+    intro = _executor.submit(lambda: build_intro(user_uid, user_profile=docs.result()['profile']))
+
+    return {
+        **docs.result(),
+        **rollups.result(),
+        'intro': intro.result()
+    }
+
+@bp.route('/dashboard', methods=['GET'])
+@require_auth
+def get_dashboard(user_uid: str, user_email: str):
+    """Everything the dashboard and profile screens need in one response"""
+    try:
+        version = dashboard_version(user_uid)
+        payload = dashboard_cache.get(user_uid, version)
+        if payload is None:
+            payload = build_dashboard(user_uid)
+            dashboard_cache.put(user_uid, version, payload)
+
+        return jsonify(payload)
+
+    except Exception as e:
+        logger.error(f"Failed to build dashboard: {e}")
+        return jsonify({"error": "Failed to load dashboard"}), 500
+
+dashboard_cache = VersionedCache(Config.ANALYTICS_CACHE_USERS)
@@ -1,10 +1,9 @@
-from flask import Blueprint, jsonify
-from ..schemas import HealthResponse
+from flask import Blueprint
+from ..static_responses import static_responses
 
 bp = Blueprint('health', __name__)
 
 @bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    response = HealthResponse()
-    return jsonify(response.dict())
\ No newline at end of file
+    return static_responses.serve('health')
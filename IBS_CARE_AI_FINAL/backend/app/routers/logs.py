@@ -1,15 +1,37 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+import csv
+import io
+import json
 import logging
-from datetime import datetime
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import TypeAdapter
 from ..schemas import LogCreate, LogResponse
 from ..auth_utils import require_auth
-from ..firebase_init import db
+from ..idempotency import idempotent
+from ..unit_of_work import atomic, unit_of_work
+from ..etags import conditional
+from ..change_feed import change_write
+from ..config import Config
+from ..json_provider import model_json_response
+from ..firebase_init import db, commit_batch, MAX_BATCH_WRITES
+from ..flare_detector import apply_logs, replay_user
+from ..food_index import food_index_writes, rebuild_food_index
+from ..search_index import index_entry, log_key, log_text, rebuild_search_index
+from ..timeline import timeline_write
+from ..timeseries_cache import timeseries_cache, log_counter_write, MISSING
+from ..rollups import get_rollups, rollup_writes, rebuild_user_rollups, update_streaks, PERIOD_TYPES
 
 logger = logging.getLogger(__name__)
 bp = Blueprint('logs', __name__)
 
+# Serializes full log pages straight from the validated models to JSON bytes
+LOG_LIST = TypeAdapter(List[LogResponse])
+
 @bp.route('/logs', methods=['POST'])
 @require_auth
+@idempotent
+@atomic
 def create_log(user_uid: str, user_email: str):
     """Create or update a log entry"""
     try:
@@ -18,14 +40,26 @@ def create_log(user_uid: str, user_email: str):
         log_data = LogCreate(**data)
         
         # Prepare document data
+        now = datetime.now().isoformat()
         doc_data = {
             **log_data.dict(),
-            'createdAt': datetime.now().isoformat()
+            'createdAt': now,
+            'updatedAt': now
         }
         
-        # Save to Firestore (merge to allow updates)
+        # Save to Firestore (merge to allow updates) together with the derived documents,
+        # which need the previous version of the day
         doc_ref = db.collection('users').document(user_uid).collection('logs').document(log_data.dateISO)
-        doc_ref.set(doc_data, merge=True)
+        previous_doc = doc_ref.get()
+        previous = previous_doc.to_dict() if previous_doc.exists else None
+
+        uow = unit_of_work()
+        uow.add(log_writes(user_uid, previous, doc_data))
+        uow.after_commit(lambda: index_log(user_uid, previous, doc_data))
+        uow.after_commit(lambda: timeseries_cache.apply_logs(user_uid, [doc_data]))
+        if previous is None:
+            uow.after_commit(lambda: update_streaks(user_uid, [doc_data['dateISO']]))
+        uow.after_commit(lambda: apply_logs(user_uid, [(previous, doc_data)]))
         
         logger.info(f"Log created for user {user_uid} on {log_data.dateISO}")
         
@@ -36,15 +70,113 @@ def create_log(user_uid: str, user_email: str):
         logger.error(f"Failed to create log: {e}")
         return jsonify({"error": "Failed to save log entry"}), 500
 
+def log_writes(user_uid: str, previous: Optional[dict], doc_data: dict) -> List[tuple]:
+    """The log itself plus its rollup, food index, timeline, change feed and log counter writes
+
+    Search postings and the streak summary are not included; index_log and
+    update_streaks commit them after the log is saved.
+    """
+    doc_ref = db.collection('users').document(user_uid).collection('logs').document(doc_data['dateISO'])
+    return (
+        [(doc_ref, doc_data)]
+        + rollup_writes(user_uid, previous, doc_data)
+        + food_index_writes(user_uid, previous, doc_data)
+        + [timeline_write(user_uid, doc_data)]
+        + [change_write(user_uid, 'log', doc_data['dateISO'], doc_data['updatedAt'])]
+        + [log_counter_write(user_uid)]
+    )
+
+def index_log(user_uid: str, previous: Optional[dict], doc_data: dict):
+    """Move a saved log's search postings from its previous version"""
+    index_entry(user_uid, log_key(doc_data), log_text(previous), log_text(doc_data))
+
+@bp.route('/logs/batch', methods=['POST'])
+@require_auth
+@idempotent
+@atomic
+def create_logs_batch(user_uid: str, user_email: str):
+    """Save several offline-queued log entries in one request"""
+    try:
+        data = request.get_json(silent=True) or {}
+        entries = data.get('logs')
+        if not isinstance(entries, list) or not entries:
+            return jsonify({"error": "logs must be a non-empty list"}), 400
+        if len(entries) > Config.LOGS_BATCH_MAX_ROWS:
+            return jsonify({"error": f"A batch is limited to {Config.LOGS_BATCH_MAX_ROWS} logs"}), 413
+
+        # Validate every entry; later entries for the same day replace earlier ones
+        errors = []
+        valid = {}
+        now = datetime.now().isoformat()
+        for index, entry in enumerate(entries):
+            try:
+                log_data = LogCreate(**entry)
+                valid[log_data.dateISO] = {**log_data.dict(), 'createdAt': now, 'updatedAt': now}
+            except Exception as e:
+                errors.append({"index": index, "error": str(e)})
+
+        if not valid:
+            return jsonify({"saved": [], "errors": errors}), 400
+
+        # Previous versions of every day in one round-trip
+        logs_ref = db.collection('users').document(user_uid).collection('logs')
+        doc_refs = {date_iso: logs_ref.document(date_iso) for date_iso in sorted(valid)}
+        snapshots = {snapshot.reference.path: snapshot for snapshot in db.get_all(list(doc_refs.values()))}
+
+        # Each day's writes are queued as one group so that no batch holds half of a day
+        uow = unit_of_work()
+        previous_versions = {}
+        for date_iso, doc_ref in doc_refs.items():
+            previous = snapshots[doc_ref.path].to_dict() if snapshots[doc_ref.path].exists else None
+            previous_versions[date_iso] = previous
+            uow.add(log_writes(user_uid, previous, valid[date_iso]))
+
+        for date_iso, doc_data in valid.items():
+            uow.after_commit(lambda date_iso=date_iso, doc_data=doc_data: index_log(user_uid, previous_versions[date_iso], doc_data))
+        uow.after_commit(lambda: timeseries_cache.apply_logs(user_uid, list(valid.values())))
+        # One streak summary update for all the batch's new days instead of one per day
+        new_days = [date_iso for date_iso in doc_refs if previous_versions[date_iso] is None]
+        uow.after_commit(lambda: update_streaks(user_uid, new_days))
+        uow.after_commit(lambda: apply_logs(user_uid, [(previous_versions[date_iso], valid[date_iso]) for date_iso in doc_refs]))
+
+        logger.info(f"Saved a batch of {len(valid)} logs for user {user_uid} ({len(errors)} rejected)")
+        return jsonify({
+            "saved": [LogResponse(**valid[date_iso]).dict() for date_iso in doc_refs],
+            "errors": errors
+        }), 201
+
+    except Exception as e:
+        logger.error(f"Failed to save log batch: {e}")
+        return jsonify({"error": "Failed to save log entries"}), 500
+
 @bp.route('/logs', methods=['GET'])
 @require_auth
+@conditional('logs')
 def get_logs(user_uid: str, user_email: str):
-    """Get logs for a user within date range"""
+    """Get logs for a user within date range.
+
+    Results are paged by ``dateISO``: pass the ``X-Next-Cursor`` value from the
+    previous response as ``cursor`` to fetch the next page. ``fields`` limits the
+    returned fields (e.g. ``dateISO,mood,pain_level`` for charts) and
+    ``format=ndjson`` streams one JSON document per line as they are read.
+    """
+    try:
+        fields = parse_log_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         # Get query parameters
         from_date = request.args.get('from')
         to_date = request.args.get('to')
-        
+        cursor = request.args.get('cursor')
+        stream = (request.args.get('format') == 'ndjson'
+                  or 'application/x-ndjson' in request.headers.get('Accept', ''))
+
+        page_size = request.args.get('limit', type=int)
+        if not stream or page_size:
+            page_size = min(max(page_size or Config.LOGS_PAGE_SIZE, 1), Config.LOGS_MAX_PAGE_SIZE)
+
         # Build query
         logs_ref = db.collection('users').document(user_uid).collection('logs')
         
@@ -52,17 +184,268 @@ def get_logs(user_uid: str, user_email: str):
             logs_ref = logs_ref.where('dateISO', '>=', from_date)
         if to_date:
             logs_ref = logs_ref.where('dateISO', '<=', to_date)
+        if fields:
+            logs_ref = logs_ref.select(fields)
         
-        # Execute query and sort by date
-        docs = logs_ref.order_by('dateISO').stream()
+        query = logs_ref.order_by('dateISO')
+        if cursor:
+            query = query.start_after({'dateISO': cursor})
+
+        if stream:
+            if page_size:
+                query = query.limit(page_size)
+            return Response(
+                stream_with_context(_stream_logs_ndjson(query.stream(), fields)),
+                mimetype='application/x-ndjson'
+            )
+
+        # Fetch one extra document to know whether another page exists
+        docs = list(query.limit(page_size + 1).stream())
+        has_more = len(docs) > page_size
+        docs = docs[:page_size]
+
+        if fields:
+            response = jsonify([serialize_log(doc.to_dict(), fields) for doc in docs])
+        else:
+            response = model_json_response(LOG_LIST, LOG_LIST.validate_python([doc.to_dict() for doc in docs]))
+        if has_more:
+            # Log documents are keyed by their dateISO
+            response.headers['X-Next-Cursor'] = docs[-1].id
+        return response
         
-        logs = []
+    except Exception as e:
+        logger.error(f"Failed to fetch logs: {e}")
+        return jsonify({"error": "Failed to fetch logs"}), 500
+
+def parse_log_fields(raw: Optional[str]) -> List[str]:
+    """Parse and validate a comma separated field projection"""
+    if not raw:
+        return []
+
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in LogResponse.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown log fields: {', '.join(unknown)}")
+    return fields
+
+def serialize_log(log_data: dict, fields: List[str] = None) -> dict:
+    """Convert a stored log document into its API representation"""
+    if fields:
+        return {field: log_data.get(field) for field in fields}
+    return LogResponse(**log_data).dict()
+
+def _stream_logs_ndjson(docs, fields: List[str]):
+    """Yield logs as newline-delimited JSON while Firestore streams them"""
+    try:
+        for doc in docs:
+            if fields:
+                yield current_app.json.dumps(serialize_log(doc.to_dict(), fields)) + '\n'
+            else:
+                yield LogResponse(**doc.to_dict()).model_dump_json() + '\n'
+    except Exception as e:
+        logger.error(f"Failed while streaming logs: {e}")
+
+@bp.route('/logs/rollups', methods=['GET'])
+@require_auth
+def get_log_rollups(user_uid: str, user_email: str):
+    """Get weekly or monthly mood/pain/trigger rollups and logging streaks"""
+    try:
+        period = request.args.get('period', 'week')
+        if period not in PERIOD_TYPES:
+            return jsonify({"error": "period must be 'week' or 'month'"}), 400
+        limit = min(max(request.args.get('limit', 12, type=int), 1), 104)
+
+        return jsonify(get_rollups(user_uid, period, limit))
+
+    except Exception as e:
+        logger.error(f"Failed to fetch log rollups: {e}")
+        return jsonify({"error": "Failed to fetch log rollups"}), 500
+
+@bp.route('/logs/series', methods=['GET'])
+@require_auth
+def get_log_series(user_uid: str, user_email: str):
+    """Get mood and pain as parallel arrays for charts, served from the columnar cache"""
+    try:
+        series = timeseries_cache.get(user_uid)
+        window = series.window(request.args.get('from'), request.args.get('to'))
+        days = series.days[window]
+
+        return jsonify({
+            "dates": [date.fromordinal(int(day)).isoformat() for day in days],
+            "mood": [None if value == MISSING else int(value) for value in series.mood[window]],
+            "pain_level": [None if value == MISSING else int(value) for value in series.pain[window]]
+        })
+
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Failed to fetch log series: {e}")
+        return jsonify({"error": "Failed to fetch log series"}), 500
+
+@bp.route('/logs/import', methods=['POST'])
+@require_auth
+def import_logs(user_uid: str, user_email: str):
+    """Bulk import log entries from an NDJSON or CSV upload"""
+    try:
+        upload = request.files.get('file')
+        if upload:
+            raw = upload.read().decode('utf-8-sig')
+            filename = upload.filename or ''
+        else:
+            raw = request.get_data(as_text=True)
+            filename = ''
+
+        fmt = request.args.get('format')
+        if not fmt:
+            content_type = (upload.content_type if upload else request.content_type) or ''
+            fmt = 'csv' if 'csv' in content_type or filename.lower().endswith('.csv') else 'ndjson'
+
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({"error": "Unsupported import format, use csv or ndjson"}), 400
+
+        rows = list(_parse_csv_rows(raw) if fmt == 'csv' else _parse_ndjson_rows(raw))
+        if len(rows) > Config.LOGS_IMPORT_MAX_ROWS:
+            return jsonify({"error": f"Import is limited to {Config.LOGS_IMPORT_MAX_ROWS} rows"}), 413
+
+        # Validate every row; later rows for the same day replace earlier ones
+        errors = []
+        valid = {}
+        created_at = datetime.now().isoformat()
+        for row_number, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                log_data = LogCreate(**row)
+                valid[log_data.dateISO] = (row_number, {**log_data.dict(), 'createdAt': created_at, 'updatedAt': created_at})
+            except Exception as e:
+                errors.append({"row": row_number, "error": str(e)})
+
+        logs_ref = db.collection('users').document(user_uid).collection('logs')
+        entries = sorted(valid.items())
+        imported = 0
+        # Each log is committed together with its timeline entry and change feed entry,
+        # and each batch counts its logs on the log counter
+        rows_per_batch = (MAX_BATCH_WRITES - 1) // 3
+        for start in range(0, len(entries), rows_per_batch):
+            chunk = entries[start:start + rows_per_batch]
+            try:
+                writes = []
+                for date_iso, (_, doc_data) in chunk:
+                    writes.append((logs_ref.document(date_iso), doc_data))
+                    writes.append(timeline_write(user_uid, doc_data))
+                    writes.append(change_write(user_uid, 'log', date_iso, doc_data['updatedAt']))
+                writes.append(log_counter_write(user_uid, len(chunk)))
+                commit_batch(writes)
+                imported += len(chunk)
+            except Exception as e:
+                logger.error(f"Failed to commit log import batch for user {user_uid}: {e}")
+                errors.extend({"row": row_number, "error": "Failed to save log entry"} for _, (row_number, _) in chunk)
+
+        # The logs are already committed, so a failed rebuild is logged (the rebuild_* and
+        # replay_flare_state jobs repair it) instead of turning the import into an error
+        if imported:
+            for step in (timeseries_cache.invalidate, rebuild_user_rollups, rebuild_food_index, replay_user, rebuild_search_index):
+                try:
+                    step(user_uid)
+                except Exception as e:
+                    logger.error(f"{step.__name__} failed after importing logs for user {user_uid}: {e}")
+
+        errors.sort(key=lambda error: error['row'])
+        logger.info(f"Imported {imported} logs for user {user_uid} ({len(errors)} rejected)")
+
+        return jsonify({
+            "imported": imported,
+            "failed": len(errors),
+            "errors": errors
+        }), 201 if imported else 400
+
+    except Exception as e:
+        logger.error(f"Failed to import logs: {e}")
+        return jsonify({"error": "Failed to import logs"}), 500
+
+@bp.route('/logs/export', methods=['GET'])
+@require_auth
+def export_logs(user_uid: str, user_email: str):
+    """Stream every log entry of the user as NDJSON or CSV"""
+    try:
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({"error": "Unsupported export format, use csv or ndjson"}), 400
+
+        docs = (
+            db.collection('users').document(user_uid).collection('logs')
+            .order_by('dateISO')
+            .stream()
+        )
+
+        if fmt == 'csv':
+            body = _stream_logs_csv(docs)
+            mimetype = 'text/csv'
+        else:
+            body = _stream_logs_ndjson(docs, [])
+            mimetype = 'application/x-ndjson'
+
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=ibs-logs.{fmt}'}
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to export logs: {e}")
+        return jsonify({"error": "Failed to export logs"}), 500
+
+CSV_COLUMNS = ['dateISO', 'mood', 'pain_level', 'notes', 'triggers', 'meals']
+
+def _parse_ndjson_rows(raw: str):
+    """Yield (line number, dict or parse error) for each non-empty NDJSON line"""
+    for line_number, line in enumerate(raw.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+
+def _parse_csv_rows(raw: str):
+    """Yield (line number, dict or parse error) for each CSV row.
+
+    ``triggers`` are separated by ``;`` and ``meals`` holds a JSON list of
+    ``{"timeISO", "items"}`` objects, matching what the export produces.
+    """
+    reader = csv.DictReader(io.StringIO(raw))
+    for row in reader:
+        try:
+            triggers = row.get('triggers') or ''
+            meals = row.get('meals') or ''
+            yield reader.line_num, {
+                'dateISO': (row.get('dateISO') or '').strip(),
+                'mood': row.get('mood'),
+                'pain_level': row.get('pain_level'),
+                'notes': row.get('notes') or '',
+                'triggers': [trigger.strip() for trigger in triggers.split(';') if trigger.strip()],
+                'meals': json.loads(meals) if meals.strip() else []
+            }
+        except ValueError as e:
+            yield reader.line_num, ValueError(f"Invalid meals column: {e}")
+
+def _stream_logs_csv(docs):
+    """Yield logs as CSV rows while Firestore streams them"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    try:
         for doc in docs:
             log_data = doc.to_dict()
-            logs.append(LogResponse(**log_data))
-        
-        return jsonify([log.dict() for log in logs])
-        
+            writer.writerow({
+                **log_data,
+                'triggers': ';'.join(log_data.get('triggers', [])),
+                'meals': json.dumps(log_data.get('meals', []))
+            })
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
     except Exception as e:
-        logger.error(f"Failed to fetch logs: {e}")
-        return jsonify({"error": "Failed to fetch logs"}), 500
\ No newline at end of file
+        logger.error(f"Failed while streaming logs: {e}")
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -3,14 +3,18 @@ import logging
 from datetime import datetime, timedelta
 from ..schemas import EmailReminder
 from ..auth_utils import require_auth
+from ..etags import conditional
 from ..firebase_init import db
+from ..unit_of_work import atomic, unit_of_work
 from ..email_service import send_daily_reminder, send_weekly_summary, send_welcome_email
+from ..metrics import record_reminder_tick
 import threading
 import time
 logger = logging.getLogger(__name__)
 bp = Blueprint('reminders', __name__)
 @bp.route('/setup', methods=['POST'])
 @require_auth
+@atomic
 def setup_reminders(user_uid: str, user_email: str):
     """Setup email reminders for user"""
     try:
@@ -24,22 +28,23 @@ def setup_reminders(user_uid: str, user_email: str):
             timezone=data.get('timezone', 'UTC')
         )
         
-        # Save reminder settings to Firestore
+        # Save reminder settings to Firestore when the request completes
+        uow = unit_of_work()
         doc_ref = db.collection('users').document(user_uid).collection('settings').document('reminders')
-        doc_ref.set({
+        uow.set(doc_ref, {
             'reminder_type': reminder.reminder_type,
             'enabled': reminder.enabled,
             'time': reminder.time,
             'timezone': reminder.timezone,
             'created_at': datetime.now().isoformat()
-        })
+        }, merge=False)
         
-        # Send welcome email
+        # Send the welcome email only once the settings are saved
         user_doc = db.collection('users').document(user_uid).get()
         user_data = user_doc.to_dict() if user_doc.exists else {}
         user_name = user_data.get('display_name', user_email.split('@')[0])
         
-        send_welcome_email(user_email, user_name)
+        uow.after_commit(lambda: send_welcome_email(user_email, user_name))
         
         return jsonify({
             "message": "Reminders setup successfully",
@@ -51,6 +56,7 @@ def setup_reminders(user_uid: str, user_email: str):
         return jsonify({"error": "Failed to setup reminders"}), 500
 @bp.route('/settings', methods=['GET'])
 @require_auth
+@conditional('reminders')
 def get_reminder_settings(user_uid: str, user_email: str):
     """Get user's reminder settings"""
     try:
@@ -99,12 +105,15 @@ def start_reminder_service():
 def send_daily_reminders_task():
     """Background task to send daily reminders"""
     while True:
+        tick_started = time.perf_counter()
+        users_scanned = 0
         try:
             current_time = datetime.now()
             users_ref = db.collection('users')
             users = users_ref.stream()
             
             for user_doc in users:
+                users_scanned += 1
                 user_data = user_doc.to_dict()
                 user_uid = user_doc.id
                 
@@ -127,11 +136,13 @@ def send_daily_reminders_task():
                             send_daily_reminder(user_data.get('email', ''), user_name)
                             logger.info(f"Daily reminder sent to {user_data.get('email', '')}")
             
+            record_reminder_tick(time.perf_counter() - tick_started, users_scanned)
             # Sleep for 1 minute before next check
             time.sleep(60)
             
         except Exception as e:
             logger.error(f"Error in daily reminders task: {e}")
+            record_reminder_tick(time.perf_counter() - tick_started, users_scanned)
             time.sleep(60)
 @bp.route('/test', methods=['POST'])
 @require_auth
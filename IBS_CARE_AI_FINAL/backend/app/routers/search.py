@@ -0,0 +1,35 @@
+from flask import Blueprint, request, jsonify
+import logging
+from ..auth_utils import require_auth
+from ..search_index import search, KINDS
+
+logger = logging.getLogger(__name__)
+bp = Blueprint('search', __name__)
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+@bp.route('/search', methods=['GET'])
+@require_auth
+def search_history(user_uid: str, user_email: str):
+    """Search log notes, triggers, meals and chat replies, newest first"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+
+    kind = request.args.get('type')
+    if kind and kind not in KINDS:
+        return jsonify({"error": f"type must be one of: {', '.join(KINDS)}"}), 400
+
+    try:
+        limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), SEARCH_MAX_PAGE_SIZE)
+        results, next_cursor = search(user_uid, query, limit, request.args.get('cursor'), kind)
+
+        response = jsonify({"query": query, "results": results, "count": len(results)})
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+
+    except Exception as e:
+        logger.error(f"Failed to search history: {e}")
+        return jsonify({"error": "Failed to search history"}), 500
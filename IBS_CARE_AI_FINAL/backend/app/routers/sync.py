@@ -0,0 +1,49 @@
+from flask import Blueprint, request, jsonify
+import logging
+from ..auth_utils import require_auth
+from ..change_feed import changes_since, head_cursor, load_entries
+from ..config import Config
+from .logs import serialize_log
+
+logger = logging.getLogger(__name__)
+bp = Blueprint('sync', __name__)
+
+@bp.route('/sync', methods=['GET'])
+@require_auth
+def sync_changes(user_uid: str, user_email: str):
+    """Log, assessment, chat and client timeline changes since an opaque cursor, in commit order.
+
+    Without ``since`` only the current cursor is returned (``reset: true``): the
+    client loads its full state from the regular endpoints once and then syncs
+    from that cursor. While ``has_more`` is true, call again with the returned
+    cursor. Changes are keyed by ``type:id``; a later one replaces an earlier
+    one. Cursors issued before the feed was commit-ordered are rejected with
+    400, and the client resets.
+    """
+    try:
+        since = request.args.get('since')
+        if not since:
+            return jsonify({"changes": [], "cursor": head_cursor(user_uid), "has_more": False, "reset": True})
+
+        limit = min(max(request.args.get('limit', Config.SYNC_PAGE_SIZE, type=int), 1), Config.SYNC_MAX_PAGE_SIZE)
+        try:
+            entries, cursor, has_more = changes_since(user_uid, since, limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        changes = []
+        for entry, data in load_entries(user_uid, entries):
+            change = {"type": entry['kind'], "id": entry['id'], "updatedAt": entry['updatedAt']}
+            if data is None:
+                change["deleted"] = True
+            elif entry['kind'] == 'log':
+                change["data"] = serialize_log(data)
+            else:
+                change["data"] = data
+            changes.append(change)
+
+        return jsonify({"changes": changes, "cursor": cursor, "has_more": has_more, "reset": False})
+
+    except Exception as e:
+        logger.error(f"Failed to sync changes: {e}")
+        return jsonify({"error": "Failed to sync changes"}), 500
@@ -36,6 +36,7 @@ class LogResponse(BaseModel):
     notes: str
     triggers: List[str]
     createdAt: str
+    updatedAt: Optional[str] = None
 
 class ChatResponse(BaseModel):
     reply: str
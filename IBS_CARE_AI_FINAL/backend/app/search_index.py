@@ -0,0 +1,226 @@
+"""
+Per-user full-text index over log notes and chat replies.
+
+Postings live in ``users/{uid}/search_index/{token}|{month}``: one document per
+token and month of the entries it appears in, holding the ``token``, the
+``bucket`` (YYYY-MM) and a ``keys`` array of entry keys. A key is
+``"{timestamp}|{kind}|{id}"`` so sorting keys sorts results by time. Because a
+document only ever holds one token's entries for one month it stays small no
+matter how long the user keeps logging, and ``keys`` is exempt from indexing
+(firestore.indexes.json). A query reads each token's documents with one
+equality query, or a range query on ``token`` for prefixes.
+
+The index is derived data: writers commit it with ``index_entry`` after their
+own batch, so an index failure never fails a log or chat save, and
+``rebuild_search_index`` repairs whatever was missed. Because postings land
+after the entry itself, every commit of them also rewrites
+``users/{uid}/state/search_{kind}``; its update time (``index_version``) tells
+caches of search results that the postings of a kind have moved.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from firebase_admin import firestore
+
+from .firebase_init import db, commit_batch, MAX_BATCH_WRITES
+
+logger = logging.getLogger(__name__)
+
+MIN_TOKEN_LENGTH = 2
+SNIPPET_CHARS = 60
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'had', 'has', 'have', 'i', 'if', 'in',
+    'is', 'it', 'me', 'my', 'of', 'on', 'or', 'so', 'that', 'the', 'this', 'to', 'was', 'we', 'with', 'you', 'your'
+}
+KINDS = ('log', 'chat')
+# Bucket of entries without a usable timestamp
+UNDATED = '0000-00'
+# Upper bound of a prefix range query on token
+PREFIX_END = '\uf8ff'
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+def search_index_ref(user_uid: str):
+    return db.collection('users').document(user_uid).collection('search_index')
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in _TOKEN_RE.findall((text or '').lower())
+        if len(token) >= MIN_TOKEN_LENGTH and token not in STOPWORDS
+    ]
+
+def bucket_for(key: str) -> str:
+    """Month (YYYY-MM) of an entry key"""
+    month = key[:7]
+    return month if re.fullmatch(r"\d{4}-\d{2}", month) else UNDATED
+
+def postings_ref(user_uid: str, token: str, bucket: str):
+    return search_index_ref(user_uid).document(f"{token}|{bucket}")
+
+def entry_key(timestamp: str, kind: str, entry_id: str) -> str:
+    return f"{timestamp}|{kind}|{entry_id}"
+
+def parse_key(key: str) -> Tuple[str, str, str]:
+    timestamp, kind, entry_id = key.split('|', 2)
+    return timestamp, kind, entry_id
+
+def log_text(log: Optional[dict]) -> str:
+    """Searchable text of a log: notes, triggers and meal items"""
+    if not log:
+        return ''
+    items = [item for meal in log.get('meals') or [] for item in meal.get('items') or []]
+    return ' '.join([log.get('notes') or ''] + list(log.get('triggers') or []) + items)
+
+def log_key(log: dict) -> str:
+    return entry_key(log['dateISO'][:10], 'log', log['dateISO'])
+
+def chat_key(chat_id: str, timestamp: str) -> str:
+    return entry_key(timestamp, 'chat', chat_id)
+
+def index_marker_ref(user_uid: str, kind: str):
+    return db.collection('users').document(user_uid).collection('state').document(f"search_{kind}")
+
+def index_version(user_uid: str, kind: str) -> str:
+    """Update time of the kind's postings marker, '' before anything was indexed"""
+    snapshot = index_marker_ref(user_uid, kind).get(field_paths=['updatedAt'])
+    return str(snapshot.update_time) if snapshot.exists else ''
+
+def _marker_write(user_uid: str, kind: str) -> tuple:
+    return index_marker_ref(user_uid, kind), {'updatedAt': firestore.SERVER_TIMESTAMP}
+
+def search_writes(user_uid: str, key: str, previous_text: str, text: str) -> List[tuple]:
+    """(doc_ref, data) merge-writes moving one entry's postings from previous_text to text"""
+    before = set(tokenize(previous_text))
+    after = set(tokenize(text))
+    bucket = bucket_for(key)
+
+    writes = []
+    for token in sorted(before - after):
+        writes.append((postings_ref(user_uid, token, bucket), {'keys': firestore.ArrayRemove([key])}))
+    for token in sorted(after - before):
+        writes.append((postings_ref(user_uid, token, bucket),
+                       {'token': token, 'bucket': bucket, 'keys': firestore.ArrayUnion([key])}))
+    return writes
+
+def index_entry(user_uid: str, key: str, previous_text: str, text: str):
+    """Commit one entry's postings on their own; failures are logged, never raised"""
+    try:
+        writes = search_writes(user_uid, key, previous_text, text)
+        if not writes:
+            return
+        # In the last batch, so the marker only moves once every posting is saved
+        writes.append(_marker_write(user_uid, parse_key(key)[1]))
+        for start in range(0, len(writes), MAX_BATCH_WRITES):
+            commit_batch(writes[start:start + MAX_BATCH_WRITES])
+    except Exception as e:
+        logger.error(f"Failed to index {key} for user {user_uid}: {e}")
+
+def rebuild_search_index(user_uid: str) -> int:
+    """Recompute a user's index from their logs and chat history"""
+    postings: Dict[Tuple[str, str], set] = defaultdict(set)
+
+    def add(key: str, text: str):
+        bucket = bucket_for(key)
+        for token in set(tokenize(text)):
+            postings[(token, bucket)].add(key)
+
+    for doc in db.collection('users').document(user_uid).collection('logs').select(['dateISO', 'notes', 'triggers', 'meals']).stream():
+        log = doc.to_dict()
+        if log.get('dateISO'):
+            add(log_key(log), log_text(log))
+    chats = db.collection('chat_history').where('userId', '==', user_uid).select(['response', 'timestamp']).stream()
+    for doc in chats:
+        chat = doc.to_dict()
+        add(chat_key(doc.id, chat.get('timestamp', '')), chat.get('response', ''))
+
+    for stale in search_index_ref(user_uid).list_documents():
+        stale.delete()
+
+    writes = [
+        (postings_ref(user_uid, token, bucket), {'token': token, 'bucket': bucket, 'keys': sorted(keys)})
+        for (token, bucket), keys in postings.items()
+    ]
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        commit_batch(writes[start:start + MAX_BATCH_WRITES], merge=False)
+    commit_batch([_marker_write(user_uid, kind) for kind in KINDS])
+
+    logger.info(f"Rebuilt search index with {len(writes)} token/month documents for user {user_uid}")
+    return len(writes)
+
+def _matching_keys(user_uid: str, token: str, prefix: bool) -> set:
+    """Entry keys of a token, or of every token starting with it"""
+    query = search_index_ref(user_uid)
+    if prefix:
+        query = query.where('token', '>=', token).where('token', '<', token + PREFIX_END)
+    else:
+        query = query.where('token', '==', token)
+    return {key for doc in query.select(['keys']).stream() for key in (doc.to_dict() or {}).get('keys') or []}
+
+def match_counts(user_uid: str, tokens: List[str], kind: Optional[str] = None) -> Dict[str, int]:
+    """Entry key -> number of distinct query tokens (as prefixes) it contains, for ranked OR queries"""
+    counts = defaultdict(int)
+    for token in sorted(set(tokens)):
+        for key in _matching_keys(user_uid, token, prefix=True):
+            if not kind or parse_key(key)[1] == kind:
+                counts[key] += 1
+    return dict(counts)
+
+def _snippet(text: str, tokens: Iterable[str]) -> str:
+    lowered = text.lower()
+    positions = [lowered.find(token) for token in tokens if lowered.find(token) >= 0]
+    start = max(0, min(positions) - SNIPPET_CHARS // 2) if positions else 0
+    snippet = text[start:start + SNIPPET_CHARS * 2].strip()
+    return ('...' if start else '') + snippet + ('...' if start + SNIPPET_CHARS * 2 < len(text) else '')
+
+def search(user_uid: str, query: str, limit: int = 20, cursor: Optional[str] = None,
+           kind: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Newest-first entries containing every query token (the last one as a prefix)
+
+    Returns the page of results and the cursor of the next page, if any.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return [], None
+
+    matches = None
+    for position, token in enumerate(tokens):
+        keys = _matching_keys(user_uid, token, prefix=position == len(tokens) - 1)
+        matches = keys if matches is None else matches & keys
+        if not matches:
+            return [], None
+
+    keys = sorted(
+        (key for key in matches if (not cursor or key < cursor) and (not kind or parse_key(key)[1] == kind)),
+        reverse=True
+    )
+    page, has_more = keys[:limit], len(keys) > limit
+
+    refs = []
+    for key in page:
+        _, entry_kind, entry_id = parse_key(key)
+        if entry_kind == 'log':
+            refs.append(db.collection('users').document(user_uid).collection('logs').document(entry_id))
+        else:
+            refs.append(db.collection('chat_history').document(entry_id))
+    snapshots = {snapshot.reference.path: snapshot for snapshot in db.get_all(refs)} if refs else {}
+
+    results = []
+    for key, ref in zip(page, refs):
+        snapshot = snapshots.get(ref.path)
+        if snapshot is None or not snapshot.exists:
+            continue
+        timestamp, entry_kind, entry_id = parse_key(key)
+        data = snapshot.to_dict()
+        text = log_text(data) if entry_kind == 'log' else data.get('response', '')
+        results.append({
+            'type': entry_kind,
+            'id': entry_id,
+            'date': timestamp,
+            'snippet': _snippet(text, tokens),
+            **({'mood': data.get('mood'), 'pain_level': data.get('pain_level')} if entry_kind == 'log' else {})
+        })
+
+    return results, (page[-1] if has_more else None)
@@ -0,0 +1,123 @@
+"""
+Manifest-based serving of the built SPA.
+
+The static directory is scanned once at startup into a manifest of URL path ->
+file, size, validators and precompressed ``.br``/``.gz`` siblings (written at
+build time by ``app.jobs.precompress_static``), so a request never touches the
+filesystem to decide what to send. Each response picks the best variant the
+client accepts and goes through ``send_file`` for Range, If-None-Match and
+If-Modified-Since handling; gunicorn then streams the file with sendfile.
+Vite's content-hashed bundles under ``assets/`` are cached as immutable.
+"""
+
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from flask import request, send_file
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Precompressed siblings, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# Vite names bundles assets/<name>-<8 char hash>.<ext>
+HASHED_ASSET = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+INDEX = 'index.html'
+
+def default_static_dir() -> str:
+    """backend/static, where the Docker build copies the Vite dist"""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+@dataclass
+class StaticAsset:
+    path: str
+    mimetype: str
+    size: int
+    mtime: float
+    etag: str
+    cache_control: str
+    # encoding -> precompressed file
+    variants: Dict[str, str] = field(default_factory=dict)
+
+class StaticManifest:
+    """URL path -> StaticAsset of every file in the static directory"""
+
+    def __init__(self):
+        self.root: Optional[str] = None
+        self.assets: Dict[str, StaticAsset] = {}
+
+    def build(self, root: str):
+        assets = {}
+        if os.path.isdir(root):
+            for directory, _, files in os.walk(root):
+                names = set(files)
+                for name in files:
+                    if name.endswith(tuple(suffix for _, suffix in ENCODINGS)) and name.rsplit('.', 1)[0] in names:
+                        continue
+                    path = os.path.join(directory, name)
+                    url_path = os.path.relpath(path, root).replace(os.sep, '/')
+                    assets[url_path] = self._asset(path, url_path, names)
+        else:
+            logger.warning(f"Static directory {root} not found; the SPA will not be served")
+
+        self.root, self.assets = root, assets
+        precompressed = sum(1 for asset in assets.values() if asset.variants)
+        logger.info(f"Static manifest: {len(assets)} files, {precompressed} with precompressed variants")
+
+    def _asset(self, path: str, url_path: str, names: set) -> StaticAsset:
+        stat = os.stat(path)
+        if HASHED_ASSET.match(url_path):
+            cache_control = IMMUTABLE
+        elif url_path == INDEX:
+            # index.html names the current bundles, so it must always be revalidated
+            cache_control = 'no-cache'
+        else:
+            cache_control = f'public, max-age={Config.STATIC_MAX_AGE_SECONDS}'
+
+        name = os.path.basename(path)
+        variants = {
+            encoding: f"{path}{suffix}" for encoding, suffix in ENCODINGS
+            if f"{name}{suffix}" in names
+        }
+        return StaticAsset(
+            path=path,
+            mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            etag=f"{int(stat.st_mtime)}-{stat.st_size}",
+            cache_control=cache_control,
+            variants=variants
+        )
+
+    def lookup(self, url_path: str) -> Optional[StaticAsset]:
+        return self.assets.get(url_path)
+
+    def serve(self, asset: StaticAsset):
+        """send_file of the best accepted variant with the asset's cache headers"""
+        encoding = request.accept_encodings.best_match(list(asset.variants)) if asset.variants else None
+        path = asset.variants[encoding] if encoding else asset.path
+        # Each encoding is a different representation, so it needs its own strong ETag
+        etag = f"{asset.etag}-{encoding}" if encoding else asset.etag
+
+        response = send_file(
+            path,
+            mimetype=asset.mimetype,
+            conditional=True,
+            etag=etag,
+            last_modified=asset.mtime,
+            max_age=None
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = asset.cache_control
+        return response
+
+static_manifest = StaticManifest()
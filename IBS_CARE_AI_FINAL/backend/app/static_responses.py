@@ -0,0 +1,103 @@
+"""
+Pre-serialized responses for endpoints whose body never changes while the app runs.
+
+Each body is serialized once at startup and compressed with gzip (and brotli
+when the ``brotli`` package is installed). Requests get the best encoding the
+client accepts, a strong ETag per encoding and the endpoint's Cache-Control,
+and a matching ``If-None-Match`` gets a 304, all without touching the payload.
+"""
+
+import gzip
+import hashlib
+import logging
+from typing import Dict, Optional
+
+from flask import Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone is still served
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent as they are; compression would not pay off
+MIN_COMPRESS_BYTES = 256
+# For versioned URLs that can never change
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+class StaticResponse:
+    """One JSON body with its compressed variants and validators"""
+
+    def __init__(self, payload, cache_control: str, headers: Optional[Dict[str, str]] = None):
+        self.body = current_app.json.dumps(payload).encode('utf-8') + b'\n'
+        self.digest = hashlib.sha256(self.body).hexdigest()[:20]
+        self.cache_control = cache_control
+        self.headers = headers or {}
+
+        self.variants = {'identity': self.body}
+        if len(self.body) >= MIN_COMPRESS_BYTES:
+            self.variants['gzip'] = gzip.compress(self.body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(self.body, quality=11)
+
+    def etag(self, encoding: str) -> str:
+        # Strong validators must differ between encodings of the same resource
+        return self.digest if encoding == 'identity' else f"{self.digest}-{encoding}"
+
+    def serve(self, cache_control: Optional[str] = None) -> Response:
+        encoding = request.accept_encodings.best_match([name for name in ('br', 'gzip') if name in self.variants]) or 'identity'
+        etag = self.etag(encoding)
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.variants[encoding], mimetype='application/json')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control or self.cache_control
+        response.headers['Vary'] = 'Accept-Encoding'
+        for name, value in self.headers.items():
+            response.headers[name] = value
+        return response
+
+class StaticResponses:
+    """Registry of the pre-serialized bodies, filled by build_static_responses() at startup"""
+
+    def __init__(self):
+        self._responses: Dict[str, StaticResponse] = {}
+
+    def register(self, name: str, payload, cache_control: str, headers: Optional[Dict[str, str]] = None) -> StaticResponse:
+        """Serialize and compress a payload; call inside the app context"""
+        response = StaticResponse(payload, cache_control, headers)
+        self._responses[name] = response
+        return response
+
+    def get(self, name: str) -> StaticResponse:
+        return self._responses[name]
+
+    def serve(self, name: str, cache_control: Optional[str] = None) -> Response:
+        return self._responses[name].serve(cache_control)
+
+static_responses = StaticResponses()
+
+def build_static_responses(app):
+    """Pre-serialize every constant body once the blueprints are registered"""
+    from .assessment_scoring import NEXT_STEPS
+    from .routers.assessment import ASSESSMENT_QUESTIONS
+    from .schemas import HealthResponse
+
+    with app.app_context():
+        static_responses.register(
+            'root', {"message": "IBS Care AI API", "status": "running", "version": "1.0.0"}, 'public, max-age=3600'
+        )
+        # Load balancers must always reach a worker, so health is revalidated every time
+        static_responses.register('health', HealthResponse().dict(), 'no-cache')
+
+        questions = static_responses.register('assessment_questions', ASSESSMENT_QUESTIONS, 'public, no-cache')
+        questions.headers['X-Questions-Version'] = questions.digest
+        static_responses.register('assessment_next_steps', NEXT_STEPS, 'public, max-age=86400')
+
+    brotli_note = '' if brotli is not None else ' (brotli not installed, gzip only)'
+    logger.info(f"Pre-serialized {len(static_responses._responses)} static responses{brotli_note}")
@@ -0,0 +1,140 @@
+"""
+Unified read-model of daily logs across both write paths.
+
+The backend writes ``users/{uid}/logs/{dateISO}`` (``pain_level``) while the web
+client writes top-level ``health_logs`` documents (``symptomSeverity``,
+``energy``). Both are projected into ``log_timeline/{uid}_{date}`` with the
+client's field names, so context building is a single indexed
+``(userId, date)`` range query.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from .firebase_init import db, commit_batch, MAX_BATCH_WRITES
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_COLLECTION = 'log_timeline'
+
+def timeline_ref(user_uid: str, date_iso: str):
+    return db.collection(TIMELINE_COLLECTION).document(f"{user_uid}_{date_iso[:10]}")
+
+def project_backend_log(user_uid: str, log: dict) -> dict:
+    """Project a users/{uid}/logs document onto the timeline fields"""
+    projection = {
+        'userId': user_uid,
+        'date': log['dateISO'][:10],
+        'mood': log.get('mood'),
+        'symptomSeverity': log.get('pain_level'),
+        'triggers': log.get('triggers') or [],
+        'notes': log.get('notes', ''),
+        'foods': sorted({item for meal in log.get('meals') or [] for item in meal.get('items') or []}),
+        'source': 'backend',
+        'createdAt': log.get('createdAt') or datetime.now().isoformat(),
+        'updatedAt': datetime.now().isoformat()
+    }
+    return {key: value for key, value in projection.items() if value is not None}
+
+def project_client_log(log: dict) -> Optional[dict]:
+    """Project a health_logs document written by the web client"""
+    if not log.get('userId') or not log.get('date'):
+        return None
+    projection = {
+        'userId': log['userId'],
+        'date': str(log['date'])[:10],
+        'mood': log.get('mood'),
+        'energy': log.get('energy'),
+        # saveHealthLog's legacy health_logs/{uid} arrays use the form's field name
+        'symptomSeverity': log.get('symptomSeverity', log.get('symptom_severity')),
+        'symptoms': log.get('symptoms') or [],
+        'triggers': log.get('triggers') or [],
+        'notes': log.get('notes', ''),
+        'source': 'client',
+        'createdAt': log.get('createdAt') or datetime.now().isoformat(),
+        'updatedAt': log.get('updatedAt') or datetime.now().isoformat()
+    }
+    return {key: value for key, value in projection.items() if value is not None}
+
+def timeline_write(user_uid: str, log: dict) -> tuple:
+    """(doc_ref, data) merge-write that keeps the timeline in step with a backend log"""
+    return timeline_ref(user_uid, log['dateISO']), project_backend_log(user_uid, log)
+
+def recent_timeline(user_uid: str, days: int = 14, limit: int = 50) -> List[dict]:
+    """Newest-first timeline entries of the last ``days`` days"""
+    cutoff = (datetime.now() - timedelta(days=days)).date().isoformat()
+    query = (
+        db.collection(TIMELINE_COLLECTION)
+        .where('userId', '==', user_uid)
+        .where('date', '>=', cutoff)
+        .order_by('date', direction='DESCENDING')
+        .limit(limit)
+    )
+    return [doc.to_dict() for doc in query.stream()]
+
+def _client_logs(user_uid: Optional[str] = None):
+    """Yield client-written logs, including the legacy health_logs/{uid} ``logs`` arrays"""
+    if user_uid:
+        docs = list(db.collection('health_logs').where('userId', '==', user_uid).stream())
+        docs.append(db.collection('health_logs').document(user_uid).get())
+    else:
+        docs = db.collection('health_logs').stream()
+
+    for doc in docs:
+        data = doc.to_dict()
+        if not data:
+            continue
+        if isinstance(data.get('logs'), list):
+            owner = data.get('userId') or data.get('uid') or doc.id
+            for log in data['logs']:
+                if isinstance(log, dict):
+                    yield {'userId': owner, **log}
+        else:
+            yield data
+
+def _commit_merge_writes(writes) -> int:
+    """Commit an iterable of (doc_ref, data) merge-writes in full-size batches"""
+    pending = []
+    committed = 0
+    for write in writes:
+        pending.append(write)
+        if len(pending) == MAX_BATCH_WRITES:
+            commit_batch(pending)
+            committed += len(pending)
+            pending = []
+    if pending:
+        commit_batch(pending)
+        committed += len(pending)
+    return committed
+
+def backfill_timeline(user_uid: Optional[str] = None) -> int:
+    """Project existing health_logs and users/*/logs documents into the timeline.
+
+    Client logs are merged first so that, for a day present in both sources,
+    the backend fields win exactly as they would for a new write.
+    """
+    client_writes = (
+        (timeline_ref(projection['userId'], projection['date']), projection)
+        for projection in map(project_client_log, _client_logs(user_uid))
+        if projection
+    )
+    committed = _commit_merge_writes(client_writes)
+
+    if user_uid:
+        backend_logs = (
+            (user_uid, doc.to_dict())
+            for doc in db.collection('users').document(user_uid).collection('logs').stream()
+        )
+    else:
+        # Log documents live at users/{uid}/logs/{dateISO}
+        backend_logs = (
+            (doc.reference.parent.parent.id, doc.to_dict())
+            for doc in db.collection_group('logs').stream()
+        )
+    committed += _commit_merge_writes(
+        timeline_write(uid, log) for uid, log in backend_logs if log.get('dateISO')
+    )
+
+    logger.info(f"Backfilled {committed} timeline entries")
+    return committed
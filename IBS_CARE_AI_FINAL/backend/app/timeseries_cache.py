@@ -0,0 +1,239 @@
+"""
+Compact columnar cache of each active user's log series.
+
+Instead of one dict or LogResponse per day, a user's history is held as typed
+NumPy columns (date ordinals, mood, pain and a trigger bitset per day), which
+is a few bytes per logged day. The cache is per worker, evicts the least
+recently used users once a memory budget is exceeded, and checks the user's
+log write counter so writes handled by other workers are never missed.
+
+The counter (``users/{uid}/state/logs``) is incremented in the same batch as
+every log write, so unlike a timestamp taken by the app it moves with commit
+order: a write committed late still changes the version after it lands.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from firebase_admin import firestore
+
+from .config import Config
+from .firebase_init import db
+from .rollups import normalize_trigger
+
+logger = logging.getLogger(__name__)
+
+MISSING = -1
+BITS_PER_WORD = 64
+# Rough per-user cost of the Python objects around the arrays
+ENTRY_OVERHEAD_BYTES = 512
+
+def log_counter_ref(user_uid: str):
+    return db.collection('users').document(user_uid).collection('state').document('logs')
+
+def log_counter_write(user_uid: str, count: int = 1) -> tuple:
+    """(doc_ref, data) write counting ``count`` log writes, committed with the logs themselves"""
+    return log_counter_ref(user_uid), {'writes': firestore.Increment(count)}
+
+def latest_log_version(user_uid: str) -> str:
+    """The user's log write counter, used as the cache version ('' before the first write)"""
+    snapshot = log_counter_ref(user_uid).get(field_paths=['writes'])
+    return str(snapshot.to_dict().get('writes', '')) if snapshot.exists else ''
+
+class LogSeries:
+    """One user's logs as parallel arrays sorted by date"""
+
+    def __init__(self, version: str = ''):
+        self.version = version
+        self.days = np.empty(0, dtype=np.int32)
+        self.mood = np.empty(0, dtype=np.int8)
+        self.pain = np.empty(0, dtype=np.int8)
+        self.trigger_bits = np.empty((0, 0), dtype=np.uint64)
+        self.trigger_names: List[str] = []
+        self._trigger_index: Dict[str, int] = {}
+
+    @classmethod
+    def from_logs(cls, logs: List[dict], version: str = '') -> 'LogSeries':
+        series = cls(version)
+        logs = sorted((log for log in logs if log.get('dateISO')), key=lambda log: log['dateISO'])
+        for log in logs:
+            for trigger in log.get('triggers') or []:
+                series._trigger_column(trigger)
+
+        count = len(logs)
+        series.days = np.fromiter((date.fromisoformat(log['dateISO'][:10]).toordinal() for log in logs), dtype=np.int32, count=count)
+        series.mood = np.fromiter((_small_int(log.get('mood')) for log in logs), dtype=np.int8, count=count)
+        series.pain = np.fromiter((_small_int(log.get('pain_level')) for log in logs), dtype=np.int8, count=count)
+        series.trigger_bits = np.zeros((count, series._words()), dtype=np.uint64)
+        for row, log in enumerate(logs):
+            series.trigger_bits[row] = series._encode_triggers(log.get('triggers'))
+        return series
+
+    def _words(self) -> int:
+        return max(1, -(-len(self.trigger_names) // BITS_PER_WORD))
+
+    def _trigger_column(self, trigger: str) -> Optional[int]:
+        name = normalize_trigger(trigger)
+        if not name:
+            return None
+        if name not in self._trigger_index:
+            self._trigger_index[name] = len(self.trigger_names)
+            self.trigger_names.append(name)
+        return self._trigger_index[name]
+
+    def _encode_triggers(self, triggers) -> np.ndarray:
+        words = np.zeros(self._words(), dtype=np.uint64)
+        for trigger in triggers or []:
+            column = self._trigger_column(trigger)
+            if column is not None:
+                words[column // BITS_PER_WORD] |= np.uint64(1) << np.uint64(column % BITS_PER_WORD)
+        return words
+
+    def copy(self) -> 'LogSeries':
+        clone = LogSeries(self.version)
+        clone.days, clone.mood, clone.pain = self.days.copy(), self.mood.copy(), self.pain.copy()
+        clone.trigger_bits = self.trigger_bits.copy()
+        clone.trigger_names = list(self.trigger_names)
+        clone._trigger_index = dict(self._trigger_index)
+        return clone
+
+    def apply_log(self, log: dict, version: str):
+        """Insert or replace one day in place after a write"""
+        for trigger in log.get('triggers') or []:
+            self._trigger_column(trigger)
+        if self._words() > self.trigger_bits.shape[1]:
+            extra = self._words() - self.trigger_bits.shape[1]
+            self.trigger_bits = np.hstack([self.trigger_bits, np.zeros((len(self.days), extra), dtype=np.uint64)])
+
+        ordinal = date.fromisoformat(log['dateISO'][:10]).toordinal()
+        row = int(np.searchsorted(self.days, ordinal))
+        values = (_small_int(log.get('mood')), _small_int(log.get('pain_level')), self._encode_triggers(log.get('triggers')))
+
+        if row < len(self.days) and self.days[row] == ordinal:
+            self.mood[row], self.pain[row], self.trigger_bits[row] = values
+        else:
+            self.days = np.insert(self.days, row, ordinal)
+            self.mood = np.insert(self.mood, row, values[0])
+            self.pain = np.insert(self.pain, row, values[1])
+            self.trigger_bits = np.insert(self.trigger_bits, row, values[2], axis=0)
+        self.version = version
+
+    def trigger_matrix(self) -> np.ndarray:
+        """Dense (logged day x trigger) 0/1 matrix decoded from the bitsets"""
+        shifts = np.arange(BITS_PER_WORD, dtype=np.uint64)
+        bits = (self.trigger_bits[:, :, None] >> shifts) & np.uint64(1)
+        return bits.reshape(len(self.days), -1)[:, :len(self.trigger_names)].astype(np.float64)
+
+    def window(self, from_date: Optional[str] = None, to_date: Optional[str] = None) -> slice:
+        start = np.searchsorted(self.days, date.fromisoformat(from_date).toordinal()) if from_date else 0
+        end = np.searchsorted(self.days, date.fromisoformat(to_date).toordinal(), side='right') if to_date else len(self.days)
+        return slice(int(start), int(end))
+
+    @property
+    def nbytes(self) -> int:
+        names = sum(len(name) + 64 for name in self.trigger_names)
+        return self.days.nbytes + self.mood.nbytes + self.pain.nbytes + self.trigger_bits.nbytes + names + ENTRY_OVERHEAD_BYTES
+
+    def dense_matrices(self):
+        """(first day ordinal, logged mask, trigger names, indicators, pain, mood) over every calendar day"""
+        if not len(self.days):
+            return None
+        first_day = int(self.days[0])
+        n_days = int(self.days[-1]) - first_day + 1
+        rows = self.days - first_day
+
+        logged = np.zeros(n_days, dtype=bool)
+        logged[rows] = True
+        pain = np.full(n_days, np.nan)
+        pain[rows] = np.where(self.pain == MISSING, np.nan, self.pain)
+        mood = np.full(n_days, np.nan)
+        mood[rows] = np.where(self.mood == MISSING, np.nan, self.mood)
+        indicators = np.zeros((n_days, len(self.trigger_names)), dtype=np.float64)
+        indicators[rows] = self.trigger_matrix()
+
+        return first_day, logged, list(self.trigger_names), indicators, pain, mood
+
+def _small_int(value) -> int:
+    return MISSING if value is None else int(value)
+
+class TimeSeriesCache:
+    """Per-worker LRU of LogSeries bounded by total memory"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: 'OrderedDict[str, LogSeries]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_uid: str) -> LogSeries:
+        """Return the user's series, reloading it if a newer log exists in Firestore"""
+        version = latest_log_version(user_uid)
+        with self._lock:
+            series = self._entries.get(user_uid)
+            if series is not None and series.version == version:
+                self._entries.move_to_end(user_uid)
+                return series
+
+        logs = [
+            doc.to_dict() for doc in
+            db.collection('users').document(user_uid).collection('logs')
+            .select(['dateISO', 'mood', 'pain_level', 'triggers'])
+            .stream()
+        ]
+        series = LogSeries.from_logs(logs, version)
+        with self._lock:
+            self._store(user_uid, series)
+        return series
+
+    def apply_logs(self, user_uid: str, logs: List[dict]):
+        """Update a cached series in place after this worker committed logs
+
+        Only when the counter moved by exactly these writes; if another write
+        landed in between the series is dropped and the next get reloads it.
+        """
+        version = latest_log_version(user_uid)
+        with self._lock:
+            series = self._entries.pop(user_uid, None)
+            if series is None:
+                return
+            self.total_bytes -= series.nbytes
+            if int(series.version or 0) + len(logs) != int(version or 0):
+                return
+            # Copy on write so readers holding the old series never see a partial update
+            series = series.copy()
+            for log in logs:
+                series.apply_log(log, version)
+            self._store(user_uid, series)
+
+    def invalidate(self, user_uid: str):
+        with self._lock:
+            series = self._entries.pop(user_uid, None)
+            if series is not None:
+                self.total_bytes -= series.nbytes
+
+    def _store(self, user_uid: str, series: LogSeries):
+        previous = self._entries.pop(user_uid, None)
+        if previous is not None:
+            self.total_bytes -= previous.nbytes
+        self._entries[user_uid] = series
+        self.total_bytes += series.nbytes
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            users = len(self._entries)
+            return {
+                'users': users,
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'avg_bytes_per_user': self.total_bytes // users if users else 0
+            }
+
+timeseries_cache = TimeSeriesCache(Config.TIMESERIES_CACHE_BYTES)
@@ -0,0 +1,126 @@
+"""
+Request-scoped unit of work for Firestore writes.
+
+A view decorated with ``@atomic`` collects its writes on ``unit_of_work()``
+instead of committing them one by one. They are committed as one WriteBatch
+after the view returns a success response, or dropped if it fails, so a
+request never leaves half of its documents written. Past MAX_BATCH_WRITES the
+writes take several batches, but a group queued with one ``add`` call is never
+split across them. Callbacks registered with ``after_commit`` (cache
+invalidation, emails) run only once the batches are saved. Every commit is
+counted per endpoint in the Prometheus metrics so write round-trips per
+request can be watched.
+"""
+
+import logging
+from functools import wraps
+from typing import Callable, List
+
+from flask import g, jsonify, make_response, request
+
+from .firebase_init import db, MAX_BATCH_WRITES
+from .metrics import record_unit_of_work
+
+logger = logging.getLogger(__name__)
+
+class UnitOfWork:
+    """Writes and post-commit callbacks collected during one request"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.operations: List[tuple] = []
+        # Offsets in operations where a group of writes ends and a batch may be cut
+        self.group_ends: List[int] = []
+        self.callbacks: List[Callable[[], None]] = []
+
+    def set(self, doc_ref, data: dict, merge: bool = True):
+        self.operations.append(('set', doc_ref, data, merge))
+        self.group_ends.append(len(self.operations))
+
+    def update(self, doc_ref, data: dict):
+        self.operations.append(('update', doc_ref, data, None))
+        self.group_ends.append(len(self.operations))
+
+    def add(self, writes: List[tuple], merge: bool = True):
+        """Queue (doc_ref, data) writes as built by the *_writes helpers, kept in one batch"""
+        for doc_ref, data in writes:
+            self.operations.append(('set', doc_ref, data, merge))
+        self.group_ends.append(len(self.operations))
+
+    def after_commit(self, callback: Callable[[], None]):
+        self.callbacks.append(callback)
+
+    def discard(self):
+        self.operations, self.group_ends, self.callbacks = [], [], []
+
+    def _batches(self) -> List[List[tuple]]:
+        """The queued operations packed into as few batches as possible without splitting a group"""
+        batches = []
+        start = 0
+        for end in self.group_ends:
+            group = self.operations[start:end]
+            start = end
+            if batches and len(batches[-1]) + len(group) <= MAX_BATCH_WRITES:
+                batches[-1].extend(group)
+            else:
+                # A group larger than a batch can only be split
+                batches.extend(group[offset:offset + MAX_BATCH_WRITES] for offset in range(0, len(group), MAX_BATCH_WRITES))
+        return batches
+
+    def commit(self):
+        """Commit the queued writes (one batch up to MAX_BATCH_WRITES) and run the callbacks"""
+        operations, batches = self.operations, self._batches()
+        self.operations, self.group_ends = [], []
+        if len(batches) > 1:
+            logger.info(f"{self.endpoint} queued {len(operations)} writes; committing them in {len(batches)} batches")
+
+        round_trips = 0
+        try:
+            for operations_of_batch in batches:
+                batch = db.batch()
+                for kind, doc_ref, data, merge in operations_of_batch:
+                    if kind == 'set':
+                        batch.set(doc_ref, data, merge=merge)
+                    else:
+                        batch.update(doc_ref, data)
+                batch.commit()
+                round_trips += 1
+        except Exception:
+            record_unit_of_work(self.endpoint, round_trips, len(operations), failed=True)
+            raise
+        record_unit_of_work(self.endpoint, round_trips, len(operations))
+
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"After-commit callback of {self.endpoint} failed: {e}")
+
+def unit_of_work() -> UnitOfWork:
+    """The current request's unit of work"""
+    if 'unit_of_work' not in g:
+        g.unit_of_work = UnitOfWork(request.endpoint or request.path)
+    return g.unit_of_work
+
+def atomic(f):
+    """Decorator committing the request's unit of work after a successful (< 400) response"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        uow = unit_of_work()
+        response = make_response(f(*args, **kwargs))
+        if response.status_code >= 400:
+            if uow.operations:
+                logger.info(f"Discarding {len(uow.operations)} queued writes of {uow.endpoint} ({response.status_code})")
+            uow.discard()
+            return response
+
+        try:
+            uow.commit()
+        except Exception as e:
+            logger.error(f"Failed to commit writes of {uow.endpoint}: {e}")
+            return jsonify({"error": "Failed to save changes"}), 500
+        return response
+
+    return decorated_function
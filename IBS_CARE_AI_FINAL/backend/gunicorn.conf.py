@@ -0,0 +1,31 @@
+"""
+Gunicorn hooks for Prometheus multiprocess metrics (see app/metrics.py).
+
+Loaded automatically when gunicorn starts from this directory. Multiprocess
+mode is enabled here rather than in the image environment, so only gunicorn
+and its workers write metric files to PROMETHEUS_MULTIPROC_DIR; other
+processes (``python -m app.jobs.*``) keep prometheus_client's in-memory
+registry. Stale files from a previous run are removed on start and a dead
+worker's live gauges are dropped on exit.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Set before the workers import the app, which defines the metrics
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'prometheus_multiproc'))
+
+def on_starting(server):
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        try:
+            from prometheus_client import multiprocess
+        except ImportError:
+            return
+        multiprocess.mark_process_dead(worker.pid)
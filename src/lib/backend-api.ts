@@ -384,6 +384,12 @@ class BackendAPIService {
    */
   async saveHealthLog(userId: string, logData: any): Promise<void> {
     const isBackendHealthy = await this.checkBackendHealth()
+    const newLog = {
+      id: Date.now().toString(),
+      date: new Date().toISOString().split('T')[0],
+      timestamp: new Date().toISOString(),
+      ...logData
+    }
     
     if (isBackendHealthy) {
       try {
@@ -391,6 +397,7 @@ class BackendAPIService {
           user_id: userId,
           ...logData
         })
+        await this.saveTimelineEntry(userId, newLog)
         return
       } catch (error: any) {
         console.warn('Backend log save failed, using client-side storage')
@@ -406,13 +413,6 @@ class BackendAPIService {
 
       const healthLogsRef = doc(db, 'health_logs', userId)
       const healthLogsDoc = await getDoc(healthLogsRef)
-      
-      const newLog = {
-        id: Date.now().toString(),
-        date: new Date().toISOString().split('T')[0],
-        timestamp: new Date().toISOString(),
-        ...logData
-      }
 
       if (healthLogsDoc.exists()) {
         const currentData = healthLogsDoc.data()
@@ -435,6 +435,31 @@ class BackendAPIService {
       console.error('Error saving health log:', error)
       throw error
     }
+
+    await this.saveTimelineEntry(userId, newLog)
+  }
+
+  /**
+   * Project a saved log into the log_timeline read-model that chat context is built from.
+   * The log is already saved, so a failure is only reported: throwing would make the user save it twice.
+   */
+  private async saveTimelineEntry(userId: string, log: any): Promise<void> {
+    try {
+      const { healthDataService } = await import('./health-data')
+      await healthDataService.saveTimelineEntry(userId, {
+        date: log.date,
+        mood: log.mood,
+        energy: log.energy,
+        symptomSeverity: log.symptom_severity ?? log.symptomSeverity,
+        symptoms: log.symptoms || [],
+        triggers: log.triggers || [],
+        notes: log.notes || '',
+        createdAt: log.timestamp,
+        updatedAt: new Date().toISOString()
+      })
+    } catch (error) {
+      console.warn('Failed to update the log timeline:', error)
+    }
   }
 
   /**
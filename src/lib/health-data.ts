@@ -1,4 +1,4 @@
-import { collection, doc, addDoc, getDocs, getDoc, updateDoc, query, where, orderBy, limit, setDoc } from 'firebase/firestore'
+import { collection, doc, addDoc, getDocs, getDoc, updateDoc, query, where, orderBy, limit, setDoc, writeBatch, serverTimestamp } from 'firebase/firestore'
 import { db, isFirebaseConfigured } from './firebase'
 
 export interface HealthLog {
@@ -51,6 +51,7 @@ class HealthDataService {
       }
 
       const docRef = await addDoc(collection(db, 'health_logs'), log)
+      await this.saveTimelineEntry(userId, log)
 
       // Update user health metrics
       await this.updateUserHealthMetrics(userId)
@@ -63,6 +64,38 @@ class HealthDataService {
     }
   }
 
+  // Keep the unified per-day timeline that the backend reads in step with a client-written log
+  async saveTimelineEntry(userId: string, log: Omit<HealthLog, 'id' | 'userId'>): Promise<void> {
+    if (!db || !isFirebaseConfigured) {
+      throw new Error('Firebase is not configured. Please set up your Firebase credentials.')
+    }
+
+    const date = log.date.slice(0, 10)
+    const batch = writeBatch(db)
+    batch.set(doc(db, 'log_timeline', `${userId}_${date}`), {
+      userId,
+      date,
+      mood: log.mood,
+      energy: log.energy,
+      symptomSeverity: log.symptomSeverity,
+      symptoms: log.symptoms,
+      triggers: log.triggers,
+      notes: log.notes,
+      source: 'client',
+      createdAt: log.createdAt,
+      updatedAt: log.updatedAt
+    }, { merge: true })
+    // Change feed entry, as the backend writes for its own logs: it moves the
+    // dashboard version and reaches the user's other devices through /api/sync
+    batch.set(doc(db, 'users', userId, 'changes', `timeline:${date}`), {
+      kind: 'timeline',
+      id: date,
+      updatedAt: log.updatedAt,
+      committedAt: serverTimestamp()
+    })
+    await batch.commit()
+  }
+
   async getUserHealthLogs(userId: string, limitCount: number = 50): Promise<HealthLog[]> {
     if (!db || !isFirebaseConfigured) {
       console.warn('⚠️ Firebase not configured - returning empty health logs')